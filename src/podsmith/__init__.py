@@ -5,20 +5,48 @@
 
 __version__ = "0.5.1"
 
-from .config_map import ConfigMap
-from .manifest import random_text
-from .pod import Pod
-from .role import ClusterRole, Role
-from .role_binding import ClusterRoleBinding, RoleBinding
-from .service import Service
-from .service_account import ServiceAccount
-from .session import Session
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_map import ConfigMap
+    from .daemon_set import DaemonSet
+    from .manifest import random_text
+    from .pod import Pod, PodFailedError
+    from .pool import PodPool
+    from .role import ClusterRole, Role
+    from .role_binding import ClusterRoleBinding, RoleBinding
+    from .service import Service
+    from .service_account import ServiceAccount
+    from .session import AsyncSession, Session
+
+# Imported on first use, as importing the kubernetes client takes a while.
+_LAZY_ATTRS = {
+    "AsyncSession": ".session",
+    "ClusterRole": ".role",
+    "ClusterRoleBinding": ".role_binding",
+    "ConfigMap": ".config_map",
+    "DaemonSet": ".daemon_set",
+    "Pod": ".pod",
+    "PodFailedError": ".pod",
+    "PodPool": ".pool",
+    "Role": ".role",
+    "RoleBinding": ".role_binding",
+    "Service": ".service",
+    "ServiceAccount": ".service_account",
+    "Session": ".session",
+    "random_text": ".manifest",
+}
 
 __all__ = [
+    "AsyncSession",
     "ClusterRole",
     "ClusterRoleBinding",
     "ConfigMap",
+    "DaemonSet",
     "Pod",
+    "PodFailedError",
+    "PodPool",
     "Role",
     "RoleBinding",
     "Service",
@@ -26,3 +54,14 @@ __all__ = [
     "Session",
     "random_text",
 ]
+
+
+def __getattr__(name: str):
+    if (module := _LAZY_ATTRS.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(import_module(module, __name__), name)
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,183 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+"""Benchmarks of podsmith's own overhead, against a `FakeApiServer` that responds instantly.
+
+Run with `python -m podsmith.benchmark [--sizes 1 10 100] [workflow ...]`, which reports the
+throughput, API calls per resource and latency percentiles of each workflow as N grows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import math
+import time
+from collections import Counter
+from collections.abc import Callable, Sequence
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+
+from kubernetes.client import ApiClient, V1Container
+
+from .config_map import ConfigMap
+from .fake_api import FakeApiServer
+from .informer import INFORMERS
+from .manifest import READY_NAMESPACES, random_text
+from .pod import Pod
+from .service import Service
+from .session import Session
+from .tracing import TRACER, Span
+
+# Runs `n` operations with resources in `namespace`, returning the latency of each in seconds.
+Workflow = Callable[[ApiClient, str, int], list[float]]
+
+
+@dataclass
+class BenchmarkResult:
+    workflow: str
+    n: int
+    elapsed: float
+    latencies: list[float]
+    calls: Counter[tuple[str, str]]
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.n / self.elapsed if self.elapsed else math.inf
+
+    @property
+    def calls_per_resource(self) -> float:
+        return sum(self.calls.values()) / self.n
+
+    def percentile(self, p: float) -> float:
+        """Latency percentile `p` (0-100), by the nearest rank method."""
+        latencies = sorted(self.latencies)
+        return latencies[max(math.ceil(p / 100 * len(latencies)) - 1, 0)]
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+
+def timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def new_pod(client: ApiClient, name: str, namespace: str) -> Pod:
+    return Pod(name, namespace, client=client).with_container(
+        V1Container(name="app", image="busybox"), service=False
+    )
+
+
+def configmap_workflow(client: ApiClient, namespace: str, n: int) -> list[float]:
+    """Create and delete config maps, one at a time."""
+
+    def op(idx: int) -> None:
+        with ConfigMap(f"cm-{idx}", namespace, client=client).with_data({"key": "value"}):
+            pass
+
+    return [timed(lambda: op(idx)) for idx in range(n)]
+
+
+def pod_workflow(client: ApiClient, namespace: str, n: int) -> list[float]:
+    """Create pods, wait for them to be ready and delete them, one at a time."""
+
+    def op(idx: int) -> None:
+        with new_pod(client, f"pod-{idx}", namespace):
+            pass
+
+    return [timed(lambda: op(idx)) for idx in range(n)]
+
+
+def service_workflow(client: ApiClient, namespace: str, n: int) -> list[float]:
+    """Create and delete services, one at a time."""
+    pod = new_pod(client, "pod", namespace)
+
+    def op(idx: int) -> None:
+        with Service(pod, name=f"svc-{idx}", client=client).add_port(80, name="http"):
+            pass
+
+    return [timed(lambda: op(idx)) for idx in range(n)]
+
+
+def session_workflow(client: ApiClient, namespace: str, n: int) -> list[float]:
+    """Load pods as one batch in a session, and unload them.
+
+    The latency is that of creating each pod, as they're created concurrently.
+    """
+    created: list[Span] = []
+
+    def record(span: Span) -> None:
+        if span.name == "provision":
+            created.append(span)
+
+    TRACER.add_hook(record)
+    try:
+        with Session() as session:
+            session.load(*(new_pod(client, f"pod-{idx}", namespace) for idx in range(n)))
+    finally:
+        TRACER.remove_hook(record)
+    return [span.duration for span in created]
+
+
+WORKFLOWS: dict[str, Workflow] = {
+    "configmap": configmap_workflow,
+    "pod": pod_workflow,
+    "service": service_workflow,
+    "session": session_workflow,
+}
+
+
+def run(workflow: str, n: int) -> BenchmarkResult:
+    """Run `workflow` with `n` resources against a new fake API server.
+
+    The namespace is set up beforehand, so neither its time nor API calls are included.
+    """
+    with FakeApiServer() as server, redirect_stdout(io.StringIO()):
+        client = server.api_client()
+        host = client.configuration.host
+        namespace = f"podsmith-bench-{random_text(4)}"
+        try:
+            setup = ConfigMap("setup", namespace, client=client)
+            setup.ensure_namespace(setup.core_api)
+            server.calls.clear()
+            started = time.perf_counter()
+            latencies = WORKFLOWS[workflow](client, namespace, n)
+            elapsed = time.perf_counter() - started
+            calls = Counter(server.calls)
+        finally:
+            INFORMERS.discard(host, namespace)
+            READY_NAMESPACES.discard(host, namespace)
+            client.close()
+    return BenchmarkResult(workflow, n, elapsed, latencies, calls)
+
+
+def report(results: Sequence[BenchmarkResult]) -> list[str]:
+    lines = [f"{'workflow':<10} {'n':>5} {'ops/s':>9} {'calls/res':>9} {'p50 ms':>8} {'p99 ms':>8}"]
+    for result in results:
+        lines.append(
+            f"{result.workflow:<10} {result.n:>5} {result.ops_per_sec:>9.1f} "
+            f"{result.calls_per_resource:>9.2f} {result.p50 * 1000:>8.2f} {result.p99 * 1000:>8.2f}"
+        )
+    return lines
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m podsmith.benchmark", description=__doc__)
+    parser.add_argument("workflows", nargs="*", help=f"any of {', '.join(WORKFLOWS)} (default all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 100])
+    args = parser.parse_args(argv)
+    if unknown := set(args.workflows) - WORKFLOWS.keys():
+        parser.error(f"unknown workflows: {', '.join(sorted(unknown))}")
+    results = [run(workflow, n) for workflow in args.workflows or WORKFLOWS for n in args.sizes]
+    print("\n".join(report(results)))
+
+
+if __name__ == "__main__":
+    main()
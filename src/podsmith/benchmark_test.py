@@ -0,0 +1,58 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import pytest
+
+from .benchmark import WORKFLOWS, BenchmarkResult, report, run
+
+N = 10
+# Most API calls per resource, plus a fixed number per run, by verb and plural. Update these when
+# a change saves round trips, and think twice before raising them.
+CALL_BUDGETS = {
+    "configmap": {
+        ("create", "configmaps"): (1, 0),
+        ("delete", "configmaps"): (1, 0),
+    },
+    "pod": {
+        ("create", "pods"): (1, 0),
+        ("get", "pods"): (1, 0),
+        ("delete", "pods"): (1, 0),
+        # The namespace pod informer.
+        ("list", "pods"): (0, 1),
+        ("watch", "pods"): (0, 1),
+    },
+    "service": {
+        ("create", "services"): (1, 0),
+        ("delete", "services"): (1, 0),
+    },
+    "session": {
+        ("create", "pods"): (1, 0),
+        ("get", "pods"): (1, 0),
+        ("delete", "pods"): (1, 0),
+        ("list", "pods"): (0, 1),
+        ("watch", "pods"): (0, 1),
+    },
+}
+
+
+@pytest.mark.parametrize("workflow", WORKFLOWS)
+def test_api_calls_within_budget(workflow):
+    result = run(workflow, N)
+    budget = CALL_BUDGETS[workflow]
+    over = {
+        call: count
+        for call, count in result.calls.items()
+        if count > budget.get(call, (0, 0))[0] * N + budget.get(call, (0, 0))[1]
+    }
+    assert not over, f"{workflow}: API calls over budget for {N} resources: {over}"
+    assert len(result.latencies) == N
+
+
+def test_report():
+    result = BenchmarkResult("pod", 4, 0.5, [0.1, 0.2, 0.3, 0.4], {("create", "pods"): 4})
+    assert result.ops_per_sec == 8
+    assert result.calls_per_resource == 1
+    assert result.p50 == 0.2 and result.p99 == 0.4
+    header, row = report([result])
+    assert header.split() == ["workflow", "n", "ops/s", "calls/res", "p50", "ms", "p99", "ms"]
+    assert row.split() == ["pod", "4", "8.0", "1.00", "200.00", "400.00"]
@@ -0,0 +1,81 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+"""The `podsmith` command.
+
+Take a snapshot of the resources in a namespace, and apply it to pre-provision an environment:
+
+    podsmith snapshot --namespace test-env --output ./snapshots/
+    podsmith apply ./snapshots/
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Sequence
+from pathlib import Path
+
+from kubernetes import config
+from kubernetes.client import ApiClient
+
+from .clients import CLIENTS, get_api_client
+from .session import DEFAULT_MAX_WORKERS, Session
+from .snapshot import from_documents, load, read_namespace, write
+
+
+def is_yaml_file(path: Path) -> bool:
+    return path.suffix in (".yaml", ".yml")
+
+
+def snapshot(client: ApiClient, namespaces: Sequence[str], output: Path) -> None:
+    for namespace in namespaces:
+        # One file per namespace, unless given a file to write to.
+        path = output if is_yaml_file(output) else output / f"{namespace}.yaml"
+        documents = read_namespace(client, namespace)
+        write(documents, path)
+        print(f"wrote {len(documents)} manifests of namespace {namespace} to {path}")
+
+
+def apply(client: ApiClient, paths: Sequence[Path], max_workers: int) -> None:
+    resources = from_documents(load(paths), client=client)
+    with Session(max_workers) as session:
+        session.apply(*resources)
+    print(f"applied {len(resources)} resources")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="podsmith", description=__doc__)
+    parser.add_argument("--context", help="kubeconfig context to use (default current)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser(
+        "snapshot", help="write the resources of namespaces as manifests"
+    )
+    snapshot_parser.add_argument("--namespace", "-n", action="append", required=True)
+    snapshot_parser.add_argument(
+        "--output",
+        "-o",
+        type=Path,
+        default=Path("."),
+        help="folder to write <namespace>.yaml files to, or a .yaml file (default .)",
+    )
+    apply_parser = commands.add_parser(
+        "apply", help="server-side apply manifests, and wait for all pods to be ready"
+    )
+    apply_parser.add_argument("paths", nargs="+", type=Path, help="manifest files or folders")
+    apply_parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot" and len(args.namespace) > 1 and is_yaml_file(args.output):
+        parser.error("--output must be a folder when taking a snapshot of several namespaces")
+    if args.context is None and CLIENTS.backend is None:
+        config.load_kube_config()
+    client = get_api_client(args.context)
+    match args.command:
+        case "snapshot":
+            snapshot(client, args.namespace, args.output)
+        case "apply":
+            apply(client, args.paths, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
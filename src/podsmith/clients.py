@@ -0,0 +1,124 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import os
+import threading
+from typing import Protocol, TypeVar
+from weakref import WeakKeyDictionary
+
+from kubernetes import config
+from kubernetes.client import ApiClient, Configuration
+
+DEFAULT_POOL_SIZE = int(os.getenv("PODSMITH_CONNECTION_POOL_SIZE", "32"))
+# Where API requests go, "cluster" for the cluster of the kubeconfig, or "memory" for an in-memory
+# fake cluster (see `podsmith.memory`).
+BACKEND = os.getenv("PODSMITH_BACKEND", "cluster")
+A = TypeVar("A")
+
+
+class Backend(Protocol):
+    """Provides the API client for all requests, in place of a kubeconfig context."""
+
+    def api_client(self) -> ApiClient: ...
+
+    def close(self) -> None: ...
+
+
+def create_backend(name: str) -> Backend | None:
+    match name:
+        case "cluster" | "":
+            return None
+        case "memory":
+            from .memory import MemoryBackend
+
+            return MemoryBackend()
+        case _:
+            raise ValueError(f"PODSMITH_BACKEND={name!r} is not supported.")
+
+
+class ClientRegistry:
+    """Long lived API clients, one per kubeconfig context.
+
+    Each client keeps its own pool of keep-alive connections, so reusing them saves a TCP/TLS
+    handshake on every request. API group objects (`CoreV1Api` etc) are cached per client as well.
+
+    With a backend, all requests go to its one client, whatever the context.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, backend: Backend | None = None) -> None:
+        self.pool_size = pool_size
+        self.backend = backend
+        self._backend_client: ApiClient | None = None
+        self._lock = threading.Lock()
+        self._clients: dict[str, ApiClient] = {}
+        self._default: tuple[Configuration | None, ApiClient] | None = None
+        self._apis: WeakKeyDictionary[ApiClient, dict[type, object]] = WeakKeyDictionary()
+
+    def get_client(self, context: str | None = None) -> ApiClient:
+        """Client for `context`, or the default configuration when `context` is None."""
+        with self._lock:
+            if self.backend is not None:
+                if self._backend_client is None:
+                    self._backend_client = self.backend.api_client()
+                return self._backend_client
+            if context is not None:
+                if (client := self._clients.get(context)) is None:
+                    configuration = Configuration()
+                    config.load_kube_config(context=context, client_configuration=configuration)
+                    client = self._clients[context] = self._new_client(configuration)
+                return client
+
+            # `config.load_kube_config()` replaces the default configuration, so pick up on that.
+            default = Configuration._default
+            if self._default is None or self._default[0] is not default:
+                self._default = (default, self._new_client(Configuration.get_default_copy()))
+            return self._default[1]
+
+    def get_api(self, api_type: type[A], client: ApiClient | None = None) -> A:
+        """Cached API group object, using the default client unless one is given."""
+        client = client or self.get_client()
+        with self._lock:
+            apis = self._apis.setdefault(client, {})
+            if (api := apis.get(api_type)) is None:
+                api = apis[api_type] = api_type(client)
+            return api
+
+    def use_backend(self, backend: Backend | None) -> None:
+        """Send all requests to `backend` from now on, or to the kubeconfig clusters if None."""
+        self.reset()
+        if self.backend is not None:
+            self.backend.close()
+        self.backend = backend
+
+    def reset(self) -> None:
+        """Drop all clients, closing their connection pools."""
+        with self._lock:
+            clients = list(self._clients.values())
+            if self._default is not None:
+                clients.append(self._default[1])
+            if self._backend_client is not None:
+                clients.append(self._backend_client)
+            self._clients.clear()
+            self._default = None
+            self._backend_client = None
+            self._apis.clear()
+        for client in clients:
+            client.rest_client.pool_manager.clear()
+            client.close()
+
+    def _new_client(self, configuration: Configuration) -> ApiClient:
+        configuration.connection_pool_maxsize = self.pool_size
+        return ApiClient(configuration)
+
+
+CLIENTS = ClientRegistry(backend=create_backend(BACKEND))
+
+
+def get_api_client(context: str | None = None) -> ApiClient:
+    return CLIENTS.get_client(context)
+
+
+def get_api(api_type: type[A], client: ApiClient | None = None) -> A:
+    return CLIENTS.get_api(api_type, client)
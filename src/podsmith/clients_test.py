@@ -0,0 +1,93 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import pytest
+import yaml
+from kubernetes.client import AppsV1Api, Configuration, CoreV1Api
+from kubernetes.config import kube_config
+
+from .clients import ClientRegistry
+from .fake_api import FakeApiServer
+from .memory import MemoryBackend
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    with FakeApiServer() as first, FakeApiServer() as second:
+        contexts = {"first": first, "second": second}
+        kubeconfig = {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "current-context": "first",
+            "clusters": [
+                {"name": name, "cluster": {"server": server.url}}
+                for name, server in contexts.items()
+            ],
+            "contexts": [
+                {"name": name, "context": {"cluster": name, "user": "test"}} for name in contexts
+            ],
+            "users": [{"name": "test", "user": {"token": "secret"}}],
+        }
+        path = tmp_path / "kubeconfig.yaml"
+        path.write_text(yaml.safe_dump(kubeconfig))
+        monkeypatch.setattr(kube_config, "KUBE_CONFIG_DEFAULT_LOCATION", str(path))
+        yield contexts
+
+
+@pytest.fixture
+def registry():
+    registry = ClientRegistry(pool_size=4)
+    yield registry
+    registry.use_backend(None)
+
+
+def test_client_per_context(servers, registry):
+    first = registry.get_client("first")
+    assert registry.get_client("first") is first
+    second = registry.get_client("second")
+    assert second is not first
+
+    CoreV1Api(second).list_namespaced_pod("default")
+    assert servers["second"].calls["list", "pods"] == 1
+    assert servers["first"].calls["list", "pods"] == 0
+
+
+def test_pool_size(servers, registry):
+    for client in (registry.get_client("first"), registry.get_client()):
+        assert client.configuration.connection_pool_maxsize == 4
+        assert client.rest_client.pool_manager.connection_pool_kw["maxsize"] == 4
+
+
+def test_default_client_follows_default_configuration(servers, registry, monkeypatch):
+    monkeypatch.setattr(Configuration, "_default", None)
+    kube_config.load_kube_config(context="first")
+    client = registry.get_client()
+    assert registry.get_client() is client
+    assert client.configuration.host == servers["first"].url
+
+    kube_config.load_kube_config(context="second")
+    assert registry.get_client() is not client
+    assert registry.get_client().configuration.host == servers["second"].url
+
+
+def test_api_cached_per_client(servers, registry):
+    first, second = registry.get_client("first"), registry.get_client("second")
+    core_api = registry.get_api(CoreV1Api, first)
+    assert registry.get_api(CoreV1Api, first) is core_api
+    assert core_api.api_client is first
+    assert registry.get_api(CoreV1Api, second) is not core_api
+    assert registry.get_api(AppsV1Api, first).api_client is first
+
+
+def test_reset_drops_clients(servers, registry):
+    first = registry.get_client("first")
+    core_api = registry.get_api(CoreV1Api, first)
+    registry.reset()
+    assert registry.get_client("first") is not first
+    assert registry.get_api(CoreV1Api, registry.get_client("first")) is not core_api
+
+
+def test_backend_client_for_all_contexts(registry):
+    registry.use_backend(MemoryBackend())
+    client = registry.get_client()
+    assert registry.get_client("first") is registry.get_client("second") is client
@@ -1,24 +1,28 @@
 # Copyright (c) 2025 Andreas Stenius
 # This software is licensed under the MIT License.
 # See the LICENSE file for details.
-from kubernetes.client import CoreV1Api, V1ConfigMap
+from kubernetes.client import V1ConfigMap
 from typing_extensions import Self
 
-from .manifest import Manifest
+from .manifest import MODEL_CONFIGURATION, Manifest
 
 
 class ConfigMap(Manifest[V1ConfigMap]):
+    api_version = "v1"
+    kind = "ConfigMap"
+    plural = "configmaps"
+
     def _create(self) -> V1ConfigMap:
-        return CoreV1Api(self.client).create_namespaced_config_map(self.namespace, self.manifest)
+        return self.core_api.create_namespaced_config_map(self.namespace, self.manifest)
 
     def _delete(self) -> None:
-        CoreV1Api(self.client).delete_namespaced_config_map(self.name, self.namespace)
+        self.core_api.delete_namespaced_config_map(self.name, self.namespace)
 
     def _new_manifest(self) -> V1ConfigMap:
-        return V1ConfigMap(metadata=self.metadata)
+        return V1ConfigMap(metadata=self.metadata, local_vars_configuration=MODEL_CONFIGURATION)
 
     def _get_manifest(self) -> V1ConfigMap:
-        return CoreV1Api(self.client).read_namespaced_config_map(self.name, self.namespace)
+        return self.core_api.read_namespaced_config_map(self.name, self.namespace)
 
     def with_data(self, data: dict[str, str]) -> Self:
         assert not self.live
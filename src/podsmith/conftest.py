@@ -1,4 +1,18 @@
 # Copyright (c) 2025 Andreas Stenius
 # This software is licensed under the MIT License.
 # See the LICENSE file for details.
+import pytest
+
+from .clients import CLIENTS
+from .memory import MemoryBackend
+
 pytest_plugins = ["podsmith.pytest_plugin"]
+
+
+@pytest.fixture
+def memory_backend():
+    """Send all API requests to an in-memory fake cluster for the duration of the test."""
+    backend = MemoryBackend()
+    CLIENTS.use_backend(backend)
+    yield backend
+    CLIENTS.use_backend(None)
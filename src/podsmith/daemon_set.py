@@ -0,0 +1,72 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from kubernetes.client import (
+    V1Container,
+    V1DaemonSet,
+    V1DaemonSetSpec,
+    V1LabelSelector,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodSpec,
+    V1PodTemplateSpec,
+)
+from typing_extensions import Self
+
+from .manifest import MODEL_CONFIGURATION, Manifest
+from .service import APP_LABEL
+
+
+class DaemonSet(Manifest[V1DaemonSet]):
+    api_version = "apps/v1"
+    kind = "DaemonSet"
+    plural = "daemonsets"
+
+    def _create(self) -> V1DaemonSet:
+        return self.apps_api.create_namespaced_daemon_set(self.namespace, self.manifest)
+
+    def _delete(self) -> None:
+        self.apps_api.delete_namespaced_daemon_set(self.name, self.namespace)
+
+    def _new_manifest(self) -> V1DaemonSet:
+        labels = {APP_LABEL: self.name}
+        return V1DaemonSet(
+            metadata=self.metadata,
+            spec=V1DaemonSetSpec(
+                selector=V1LabelSelector(
+                    match_labels=labels, local_vars_configuration=MODEL_CONFIGURATION
+                ),
+                template=V1PodTemplateSpec(
+                    metadata=V1ObjectMeta(
+                        labels=labels, local_vars_configuration=MODEL_CONFIGURATION
+                    ),
+                    spec=V1PodSpec(containers=[], local_vars_configuration=MODEL_CONFIGURATION),
+                    local_vars_configuration=MODEL_CONFIGURATION,
+                ),
+                local_vars_configuration=MODEL_CONFIGURATION,
+            ),
+            local_vars_configuration=MODEL_CONFIGURATION,
+        )
+
+    def _get_manifest(self) -> V1DaemonSet:
+        return self.apps_api.read_namespaced_daemon_set(self.name, self.namespace)
+
+    @property
+    def pod_spec(self) -> V1PodSpec:
+        return self.manifest.spec.template.spec
+
+    def with_containers(self, *containers: V1Container) -> Self:
+        assert not self.live
+        self.pod_spec.containers.extend(containers)
+        return self
+
+    def with_pod_spec(self, **kwargs) -> Self:
+        assert not self.live
+        for attr, value in kwargs.items():
+            setattr(self.pod_spec, attr, value)
+        return self
+
+    def get_pods(self) -> list[V1Pod]:
+        """Pods currently run by this daemon set."""
+        selector = ",".join(f"{k}={v}" for k, v in self.manifest.spec.selector.match_labels.items())
+        return self.core_api.list_namespaced_pod(self.namespace, label_selector=selector).items
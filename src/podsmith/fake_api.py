@@ -0,0 +1,429 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+"""Stand-in Kubernetes API, keeping all objects in memory and responding instantly.
+
+`FakeCluster` implements the API requests podsmith makes: get, list, watch, create, server-side
+apply and delete, with field selectors on `metadata.name` and equality based label selectors. It
+is served over HTTP by `FakeApiServer`, e.g. for measuring podsmith's own overhead (see
+`podsmith.benchmark`), or used in-process by the memory backend (see `podsmith.memory`).
+
+There is no validation, admission or garbage collection, except that deleting a namespace deletes
+everything in it. New namespaces get a default service account, services a cluster IP, and new
+pods go through the usual conditions to become ready after `pod_ready_delay` seconds.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from urllib.parse import parse_qs, urlparse
+
+from kubernetes.client import ApiClient, Configuration
+
+# Plural resource name to API version and kind.
+KINDS = {
+    "configmaps": ("v1", "ConfigMap"),
+    "events": ("v1", "Event"),
+    "namespaces": ("v1", "Namespace"),
+    "nodes": ("v1", "Node"),
+    "pods": ("v1", "Pod"),
+    "serviceaccounts": ("v1", "ServiceAccount"),
+    "services": ("v1", "Service"),
+    "daemonsets": ("apps/v1", "DaemonSet"),
+    "leases": ("coordination.k8s.io/v1", "Lease"),
+    "clusterrolebindings": ("rbac.authorization.k8s.io/v1", "ClusterRoleBinding"),
+    "clusterroles": ("rbac.authorization.k8s.io/v1", "ClusterRole"),
+    "rolebindings": ("rbac.authorization.k8s.io/v1", "RoleBinding"),
+    "roles": ("rbac.authorization.k8s.io/v1", "Role"),
+}
+TIMESTAMP = "1970-01-01T00:00:00Z"
+Key = tuple[str, "str | None", str]
+
+
+@dataclass
+class Response:
+    """Response to an API request, with a body of lines to stream for watches."""
+
+    status: int
+    body: bytes | Iterator[bytes]
+    content_type: str = "application/json"
+    # Ends a streaming response early.
+    close: Callable[[], None] | None = None
+
+
+class FakeCluster:
+    """In memory Kubernetes API.
+
+    `calls` counts the requests by verb and plural, e.g. `("create", "pods")`.
+    """
+
+    def __init__(self, pod_ready_delay: float | None = 0.0) -> None:
+        self.pod_ready_delay = pod_ready_delay
+        self.calls: Counter[tuple[str, str]] = Counter()
+        self._objects: dict[Key, dict] = {}
+        # Every change, the resource version of each is its index + 1.
+        self._changes: list[tuple[str, str, str | None, dict]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._cluster_ips = count(1)
+
+    def close(self) -> None:
+        """End all watches."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get(self, plural: str, namespace: str | None, name: str) -> dict | None:
+        with self._cond:
+            obj = self._objects.get((plural, namespace, name))
+            return _copy(obj) if obj is not None else None
+
+    def objects(self, plural: str, namespace: str | None = None) -> list[dict]:
+        with self._cond:
+            return [
+                _copy(obj)
+                for (p, ns, _), obj in self._objects.items()
+                if p == plural and (namespace is None or ns == namespace)
+            ]
+
+    def put(self, plural: str, namespace: str | None, obj: dict, event: str = "MODIFIED") -> dict:
+        """Store `obj` and notify watches, with `event` being ADDED, MODIFIED or DELETED."""
+        with self._cond:
+            api_version, kind = KINDS[plural]
+            obj = {**obj, "apiVersion": api_version, "kind": kind}
+            metadata = obj["metadata"] = dict(obj.get("metadata") or {})
+            metadata.setdefault("uid", f"uid-{len(self._changes) + 1}")
+            metadata.setdefault("creationTimestamp", TIMESTAMP)
+            metadata["resourceVersion"] = str(len(self._changes) + 1)
+            if namespace:
+                metadata["namespace"] = namespace
+            key = (plural, namespace, metadata["name"])
+            if event == "DELETED":
+                self._objects.pop(key, None)
+            else:
+                self._objects[key] = obj
+            self._changes.append((event, plural, namespace, obj))
+            self._cond.notify_all()
+            return _copy(obj)
+
+    def handle(self, method: str, path: str, body: bytes | None = None) -> Response:
+        """Respond to an API request for `path`, including any query string."""
+        url = urlparse(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        # /api/v1/... or /apis/<group>/<version>/...
+        parts = url.path.strip("/").split("/")
+        parts = parts[2:] if parts[0] == "api" else parts[3:]
+        namespace = None
+        if parts and parts[0] == "namespaces" and len(parts) > 2:
+            namespace, parts = parts[1], parts[2:]
+        plural, name, subresource = (parts + [None, None, None])[:3]
+        if plural not in KINDS:
+            return _status(404, "NotFound", "the server could not find the requested resource")
+
+        match method:
+            case "GET" if subresource == "log":
+                self.calls["log", plural] += 1
+                return Response(200, b"", "text/plain")
+            case "GET" if name is not None:
+                self.calls["get", plural] += 1
+                if (obj := self.get(plural, namespace, name)) is None:
+                    return _not_found(plural, name)
+                return _ok(obj)
+            case "GET" if query.get("watch") in ("true", "True", "1"):
+                self.calls["watch", plural] += 1
+                stopped = threading.Event()
+
+                def stop() -> None:
+                    with self._cond:
+                        stopped.set()
+                        self._cond.notify_all()
+
+                return Response(200, self._watch(plural, namespace, query, stopped), close=stop)
+            case "GET":
+                self.calls["list", plural] += 1
+                return _ok(self._list(plural, namespace, query))
+            case "POST":
+                self.calls["create", plural] += 1
+                obj = json.loads(body or b"{}")
+                name = obj["metadata"]["name"]
+                with self._cond:
+                    if self.get(plural, namespace, name) is not None:
+                        return _status(409, "AlreadyExists", f'{plural} "{name}" already exists')
+                    return _ok(self._created(plural, namespace, obj), 201)
+            case "PATCH":
+                self.calls["apply", plural] += 1
+                return self._apply(plural, namespace, name, json.loads(body or b"{}"))
+            case "DELETE":
+                self.calls["delete", plural] += 1
+                if (obj := self._delete(plural, namespace, name)) is None:
+                    return _not_found(plural, name)
+                return _ok(obj)
+        return _status(405, "MethodNotAllowed", f"{method} is not supported")
+
+    def _created(self, plural: str, namespace: str | None, obj: dict) -> dict:
+        if plural == "pods":
+            obj["status"] = {"phase": "Pending"}
+        elif plural == "services":
+            self._assign_addresses(obj)
+        obj = self.put(plural, namespace, obj, "ADDED")
+        if plural == "namespaces":
+            default = {"metadata": {"name": "default"}}
+            self.put("serviceaccounts", obj["metadata"]["name"], default, "ADDED")
+        elif plural == "pods" and self.pod_ready_delay is not None:
+            self._start_pod(namespace, obj["metadata"]["name"], obj["metadata"]["uid"])
+        return obj
+
+    def _apply(self, plural: str, namespace: str | None, name: str, obj: dict) -> Response:
+        with self._cond:
+            if (live := self.get(plural, namespace, name)) is None:
+                return _ok(self._created(plural, namespace, obj), 201)
+            merged = {**live, **{k: v for k, v in obj.items() if k != "status"}}
+            merged["metadata"] = {**live["metadata"], **obj.get("metadata", {})}
+            merged["metadata"]["resourceVersion"] = live["metadata"]["resourceVersion"]
+            if merged != live:
+                live = self.put(plural, namespace, merged)
+            return _ok(live)
+
+    def _assign_addresses(self, service: dict) -> None:
+        spec = service.setdefault("spec", {})
+        if spec.get("type") == "ExternalName":
+            return
+        ip = next(self._cluster_ips)
+        spec.setdefault("clusterIP", f"10.96.{ip // 250}.{ip % 250 + 1}")
+        if spec.get("type") in ("NodePort", "LoadBalancer"):
+            for idx, port in enumerate(spec.get("ports") or []):
+                port.setdefault("nodePort", 30000 + (ip * 10 + idx) % 2768)
+
+    def _start_pod(self, namespace: str | None, name: str, uid: str) -> None:
+        """Schedule the pod right away, and have it ready after `pod_ready_delay` seconds."""
+
+        def transition(phase: str, *conditions: str) -> None:
+            with self._cond:
+                pod = self._objects.get(("pods", namespace, name))
+                if pod is None or pod["metadata"]["uid"] != uid:
+                    return
+                status = dict(pod.get("status") or {}, phase=phase)
+                status["conditions"] = [
+                    *status.get("conditions", []),
+                    *(
+                        {"type": condition, "status": "True", "lastTransitionTime": TIMESTAMP}
+                        for condition in conditions
+                    ),
+                ]
+                if phase == "Running":
+                    status["containerStatuses"] = [
+                        {
+                            "name": container["name"],
+                            "image": container.get("image", ""),
+                            "imageID": "",
+                            "ready": True,
+                            "restartCount": 0,
+                            "state": {"running": {"startedAt": TIMESTAMP}},
+                        }
+                        for container in pod["spec"].get("containers", [])
+                    ]
+                self.put("pods", namespace, {**pod, "status": status})
+
+        def ready() -> None:
+            transition("Pending", "Initialized")
+            transition("Running", "ContainersReady", "Ready")
+
+        transition("Pending", "PodScheduled")
+        if self.pod_ready_delay:
+            timer = threading.Timer(self.pod_ready_delay, ready)
+            timer.daemon = True
+            timer.start()
+        else:
+            ready()
+
+    def _delete(self, plural: str, namespace: str | None, name: str) -> dict | None:
+        with self._cond:
+            obj = self._objects.get((plural, namespace, name))
+            if obj is None:
+                return None
+            if plural == "namespaces":
+                for key in [key for key in self._objects if key[1] == name]:
+                    self.put(key[0], key[1], self._objects[key], "DELETED")
+            return self.put(plural, namespace, obj, "DELETED")
+
+    def _list(self, plural: str, namespace: str | None, query: dict) -> dict:
+        match = _matcher(namespace, query)
+        api_version, kind = KINDS[plural]
+        with self._cond:
+            return {
+                "apiVersion": api_version,
+                "kind": f"{kind}List",
+                "metadata": {"resourceVersion": str(len(self._changes))},
+                "items": [
+                    _copy(obj)
+                    for (p, ns, _), obj in self._objects.items()
+                    if p == plural and match(ns, obj)
+                ],
+            }
+
+    def _watch(
+        self, plural: str, namespace: str | None, query: dict, stopped: threading.Event
+    ) -> Iterator[bytes]:
+        match = _matcher(namespace, query)
+        deadline = time.monotonic() + float(query.get("timeoutSeconds") or 300)
+        with self._cond:
+            if position := int(query.get("resourceVersion") or 0):
+                changes = []
+            else:
+                position = len(self._changes)
+                changes = [("ADDED", p, ns, obj) for (p, ns, _), obj in self._objects.items()]
+        while True:
+            for event, p, ns, obj in changes:
+                if p == plural and match(ns, obj):
+                    yield json.dumps({"type": event, "object": obj}).encode() + b"\n"
+            with self._cond:
+                while position >= len(self._changes):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed or stopped.is_set():
+                        return
+                    self._cond.wait(remaining)
+                changes = self._changes[position:]
+                position = len(self._changes)
+
+
+class FakeApiServer:
+    """Serves a `FakeCluster` over HTTP, on a random local port."""
+
+    def __init__(self, cluster: FakeCluster | None = None, pod_ready_delay: float = 0.0) -> None:
+        self.cluster = cluster or FakeCluster(pod_ready_delay)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self.cluster))
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def calls(self) -> Counter[tuple[str, str]]:
+        return self.cluster.calls
+
+    def start(self) -> FakeApiServer:
+        threading.Thread(
+            target=self._server.serve_forever,
+            # Poll often, for `stop` to be quick.
+            kwargs=dict(poll_interval=0.01),
+            name="podsmith-fake-api",
+            daemon=True,
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        self.cluster.close()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> FakeApiServer:
+        return self.start()
+
+    def __exit__(self, *exc_details) -> None:
+        self.stop()
+
+    def api_client(self, **kwargs) -> ApiClient:
+        """New client for this server."""
+        configuration = Configuration()
+        configuration.host = self.url
+        for attr, value in kwargs.items():
+            setattr(configuration, attr, value)
+        return ApiClient(configuration)
+
+
+def _copy(obj: dict) -> dict:
+    return json.loads(json.dumps(obj))
+
+
+def _ok(obj: dict, status: int = 200) -> Response:
+    return Response(status, json.dumps(obj).encode())
+
+
+def _status(status: int, reason: str, message: str) -> Response:
+    body = {
+        "apiVersion": "v1",
+        "kind": "Status",
+        "status": "Failure",
+        "reason": reason,
+        "message": message,
+        "code": status,
+    }
+    return Response(status, json.dumps(body).encode())
+
+
+def _not_found(plural: str, name: str) -> Response:
+    return _status(404, "NotFound", f'{plural} "{name}" not found')
+
+
+def _matcher(namespace: str | None, query: dict) -> Callable[[str | None, dict], bool]:
+    name = query.get("fieldSelector", "").partition("metadata.name=")[2] or None
+    labels = dict(
+        term.split("=", 1) for term in query.get("labelSelector", "").split(",") if "=" in term
+    )
+
+    def match(ns: str | None, obj: dict) -> bool:
+        metadata = obj["metadata"]
+        return (
+            (namespace is None or ns == namespace)
+            and (name is None or metadata["name"] == name)
+            and all((metadata.get("labels") or {}).get(k) == v for k, v in labels.items())
+        )
+
+    return match
+
+
+def _handler(cluster: FakeCluster) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            self._respond()
+
+        def do_POST(self) -> None:
+            self._respond()
+
+        def do_PATCH(self) -> None:
+            self._respond()
+
+        def do_DELETE(self) -> None:
+            self._respond()
+
+        def _respond(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            response = cluster.handle(self.command, self.path, self.rfile.read(length))
+            self.send_response(response.status)
+            self.send_header("Content-Type", response.content_type)
+            if isinstance(response.body, bytes):
+                self.send_header("Content-Length", str(len(response.body)))
+                self.end_headers()
+                self.wfile.write(response.body)
+                return
+
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for line in response.body:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except OSError:
+                # The client went away.
+                pass
+            finally:
+                if response.close is not None:
+                    response.close()
+            self.close_connection = True
+
+    return Handler
@@ -0,0 +1,77 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import pytest
+from kubernetes.client import CoreV1Api, V1ConfigMap, V1Container, V1Namespace, V1ObjectMeta
+from kubernetes.client.exceptions import ApiException
+from kubernetes.watch import Watch
+
+from .fake_api import FakeApiServer
+from .pod import Pod
+
+
+@pytest.fixture
+def server():
+    with FakeApiServer() as server:
+        yield server
+
+
+@pytest.fixture
+def api(server):
+    client = server.api_client()
+    yield CoreV1Api(client)
+    client.close()
+
+
+def config_map(name: str, **labels) -> V1ConfigMap:
+    return V1ConfigMap(metadata=V1ObjectMeta(name=name, labels=labels), data={"a": "1"})
+
+
+def test_crud_and_selectors(server, api):
+    api.create_namespace(V1Namespace(metadata=V1ObjectMeta(name="ns")))
+    assert api.read_namespaced_service_account("default", "ns").metadata.name == "default"
+
+    api.create_namespaced_config_map("ns", config_map("one", app="x"))
+    api.create_namespaced_config_map("ns", config_map("two", app="y"))
+    with pytest.raises(ApiException) as exc:
+        api.create_namespaced_config_map("ns", config_map("one"))
+    assert exc.value.status == 409
+
+    names = lambda items: sorted(item.metadata.name for item in items)  # noqa: E731
+    assert names(api.list_namespaced_config_map("ns").items) == ["one", "two"]
+    assert names(api.list_namespaced_config_map("ns", label_selector="app=y").items) == ["two"]
+    assert names(
+        api.list_namespaced_config_map("ns", field_selector="metadata.name=one").items
+    ) == ["one"]
+
+    api.delete_namespace("ns")
+    with pytest.raises(ApiException) as exc:
+        api.read_namespaced_config_map("one", "ns")
+    assert exc.value.status == 404
+    assert server.calls["create", "configmaps"] == 3
+
+
+def test_watch_resumes_from_resource_version(api):
+    api.create_namespaced_config_map("ns", config_map("one"))
+    version = api.list_namespaced_config_map("ns").metadata.resource_version
+    api.create_namespaced_config_map("ns", config_map("two"))
+    api.delete_namespaced_config_map("one", "ns")
+
+    events = []
+    watch = Watch()
+    for event in watch.stream(
+        api.list_namespaced_config_map, "ns", resource_version=version, timeout_seconds=5
+    ):
+        events.append((event["type"], event["object"].metadata.name))
+        if len(events) == 2:
+            watch.stop()
+    assert events == [("ADDED", "two"), ("DELETED", "one")]
+
+
+def test_pods_become_ready(api):
+    pod = Pod("web", "ns", client=api.api_client).with_container(
+        V1Container(name="app", image="busybox"), service=False
+    )
+    with pod:
+        assert pod.manifest.status.phase == "Running"
+    assert api.list_namespace().items == []
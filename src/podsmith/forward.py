@@ -0,0 +1,260 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import selectors
+import socket
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from kubernetes.client import ApiClient
+from kubernetes.stream.ws_client import PortForward, portforward_call
+
+ForwardKey = tuple[str, str, str, int]
+# Bytes read at a time, and buffered for a socket at most before reading from its peer is paused.
+CHUNK_SIZE = 65536
+MAX_BUFFERED = 4 * CHUNK_SIZE
+
+
+class PortForwarder:
+    """In-process port forwarding to pods, over the Kubernetes port-forward API.
+
+    Each forwarded pod port listens on an ephemeral local port, and is kept open until the pod is
+    closed with `close_pod`. Every connection accepted on it opens a port-forward stream to the
+    pod, and a single selector thread relays the data of all forwards and their connections. The
+    sockets are non-blocking, so one slow reader only holds up its own connection.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", max_connecting: int = 4) -> None:
+        self.host = host
+        self._lock = threading.Lock()
+        self._listeners: dict[ForwardKey, socket.socket] = {}
+        self._connections: dict[ForwardKey, set[_Connection]] = defaultdict(set)
+        self._selector = selectors.DefaultSelector()
+        self._calls: list[Callable[[], object]] = []
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._selector.register(self._wake_r, selectors.EVENT_READ, self._run_calls)
+        self._connecting = ThreadPoolExecutor(max_connecting, thread_name_prefix="podsmith-forward")
+        self._thread: threading.Thread | None = None
+
+    def forward(self, api_client: ApiClient, namespace: str, pod: str, port: int) -> int:
+        """Local port forwarded to `port` of `pod`."""
+        key = (api_client.configuration.host, namespace, pod, port)
+        with self._lock:
+            if (listener := self._listeners.get(key)) is not None:
+                return listener.getsockname()[1]
+            listener = self._listeners[key] = socket.create_server((self.host, 0))
+            listener.setblocking(False)
+
+        local_port = listener.getsockname()[1]
+        print(f"forwarding {self.host}:{local_port} -> {namespace}/{pod}:{port}")
+        accept = partial(self._accept, key, listener, api_client)
+        self._call_soon(self._selector.register, listener, selectors.EVENT_READ, accept)
+        return local_port
+
+    def close_pod(self, namespace: str, pod: str) -> None:
+        """Close all forwards to `pod`, along with their connections."""
+        with self._lock:
+            keys = [key for key in self._listeners if key[1:3] == (namespace, pod)]
+            listeners = [self._listeners.pop(key) for key in keys]
+            connections = [c for key in keys for c in self._connections.pop(key, ())]
+        for listener in listeners:
+            self._call_soon(self._close_listener, listener)
+        for connection in connections:
+            self._call_soon(connection.close)
+
+    def close(self) -> None:
+        with self._lock:
+            pods = {key[1:3] for key in self._listeners}
+        for namespace, pod in pods:
+            self.close_pod(namespace, pod)
+        self._connecting.shutdown(wait=False)
+
+    def _call_soon(self, fn: Callable, *args) -> None:
+        """Run `fn` on the selector thread, which owns all registrations."""
+        with self._lock:
+            self._calls.append(partial(fn, *args))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="podsmith-port-forward", daemon=True
+                )
+                self._thread.start()
+        self._wake_w.send(b"\0")
+
+    def _run(self) -> None:
+        while True:
+            for key, mask in self._selector.select():
+                try:
+                    key.data(mask)
+                except Exception as e:
+                    print(f"port forward: {e}")
+
+    def _run_calls(self, mask: int) -> None:
+        self._wake_r.recv(4096)
+        with self._lock:
+            calls, self._calls = self._calls, []
+        for call in calls:
+            call()
+
+    def _close_listener(self, listener: socket.socket) -> None:
+        self._selector.unregister(listener)
+        listener.close()
+
+    def _accept(
+        self, key: ForwardKey, listener: socket.socket, api_client: ApiClient, mask: int
+    ) -> None:
+        try:
+            client, _ = listener.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        self._connecting.submit(self._connect, key, client, api_client)
+
+    def _connect(self, key: ForwardKey, client: socket.socket, api_client: ApiClient) -> None:
+        _, namespace, pod, port = key
+        try:
+            stream = self._open_stream(api_client, namespace, pod, port)
+        except Exception as e:
+            print(f"port forward to {namespace}/{pod}:{port} failed: {e}")
+            client.close()
+            return
+
+        connection = _Connection(self, key, client, stream)
+        with self._lock:
+            if key not in self._listeners:
+                # Closed while connecting.
+                connection.stream.close()
+                client.close()
+                return
+            self._connections[key].add(connection)
+        self._call_soon(connection.register)
+
+    def _open_stream(
+        self, api_client: ApiClient, namespace: str, pod: str, port: int
+    ) -> PortForward:
+        # Rather than `kubernetes.stream.portforward`, which temporarily patches the request method
+        # of the (shared) api client.
+        headers: dict[str, str] = {}
+        api_client.update_params_for_auth(headers, [], ["BearerToken"])
+        return portforward_call(
+            api_client.configuration,
+            "GET",
+            f"{api_client.configuration.host}/api/v1/namespaces/{namespace}/pods/{pod}/portforward",
+            headers=headers,
+            query_params=[("ports", str(port))],
+        )
+
+    def _discard(self, connection: _Connection) -> None:
+        with self._lock:
+            self._connections.get(connection.key, set()).discard(connection)
+
+
+class _Connection:
+    """A local client connection, relayed to its port-forward stream.
+
+    Data read from either socket is buffered until the other one is ready to take it. Once either
+    side is done, what is left in the buffers is sent before closing both.
+    """
+
+    def __init__(
+        self, forwarder: PortForwarder, key: ForwardKey, client: socket.socket, stream: PortForward
+    ) -> None:
+        self.forwarder = forwarder
+        self.key = key
+        self.client = client
+        self.stream = stream
+        self.remote = stream.socket(key[3])
+        self.remote.setblocking(False)
+        # Data to send to each socket, and the events each is registered for.
+        self.buffers = {self.client: bytearray(), self.remote: bytearray()}
+        self.events = {self.client: 0, self.remote: 0}
+        self.done = False
+        self.closed = False
+
+    def register(self) -> None:
+        if self.closed:
+            return
+        self._update(self.client)
+        self._update(self.remote)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for sock in (self.client, self.remote):
+            if self.events[sock]:
+                self.forwarder._selector.unregister(sock)
+            sock.close()
+        self.forwarder._discard(self)
+        if error := self.stream.error(self.key[3]):
+            _, namespace, pod, port = self.key
+            print(f"port forward to {namespace}/{pod}:{port}: {error}")
+
+    def _peer(self, sock: socket.socket) -> socket.socket:
+        return self.remote if sock is self.client else self.client
+
+    def _ready(self, sock: socket.socket, mask: int) -> None:
+        if mask & selectors.EVENT_WRITE:
+            self._send(sock)
+        if mask & selectors.EVENT_READ and not self.closed:
+            self._receive(sock)
+        if self.closed:
+            return
+        if self.done and not any(self.buffers.values()):
+            self.close()
+            return
+        self._update(sock)
+        self._update(self._peer(sock))
+
+    def _receive(self, source: socket.socket) -> None:
+        target = self._peer(source)
+        try:
+            data = source.recv(CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.done = True
+            return
+        self.buffers[target] += data
+        self._send(target)
+
+    def _send(self, target: socket.socket) -> None:
+        buffer = self.buffers[target]
+        if not buffer:
+            return
+        try:
+            sent = target.send(buffer)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Nowhere to send the rest.
+            buffer.clear()
+            self.done = True
+            return
+        del buffer[:sent]
+
+    def _update(self, sock: socket.socket) -> None:
+        events = 0
+        if not self.done and len(self.buffers[self._peer(sock)]) < MAX_BUFFERED:
+            events |= selectors.EVENT_READ
+        if self.buffers[sock]:
+            events |= selectors.EVENT_WRITE
+        if events == self.events[sock]:
+            return
+        selector = self.forwarder._selector
+        if not events:
+            selector.unregister(sock)
+        elif not self.events[sock]:
+            selector.register(sock, events, partial(self._ready, sock))
+        else:
+            selector.modify(sock, events, partial(self._ready, sock))
+        self.events[sock] = events
+
+
+FORWARDER = PortForwarder()
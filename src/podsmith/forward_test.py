@@ -0,0 +1,112 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import socket
+import threading
+
+import pytest
+from kubernetes.client import ApiClient, Configuration
+
+from .forward import PortForwarder
+
+
+class EchoStream:
+    """Stands in for a port-forward stream, echoing back upper cased."""
+
+    def __init__(self) -> None:
+        self.local, remote = socket.socketpair()
+        threading.Thread(target=self._echo, args=(remote,), daemon=True).start()
+
+    def _echo(self, sock: socket.socket) -> None:
+        with sock:
+            try:
+                while data := sock.recv(1024):
+                    sock.sendall(data.upper())
+            except OSError:
+                # Closed by the forwarder.
+                pass
+
+    def socket(self, port: int) -> socket.socket:
+        return self.local
+
+    def error(self, port: int) -> None:
+        return None
+
+    def close(self) -> None:
+        self.local.close()
+
+
+class EchoForwarder(PortForwarder):
+    def __init__(self) -> None:
+        super().__init__()
+        self.streams = []
+
+    def _open_stream(self, api_client, namespace, pod, port):
+        self.streams.append((namespace, pod, port))
+        return EchoStream()
+
+
+def api_client() -> ApiClient:
+    configuration = Configuration()
+    configuration.host = "http://kube.test"
+    return ApiClient(configuration)
+
+
+def roundtrip(port: int, message: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(message)
+        return sock.recv(1024)
+
+
+def test_forwards_are_cached_per_pod_port():
+    forwarder = EchoForwarder()
+    client = api_client()
+    port = forwarder.forward(client, "ns", "redis", 6379)
+    assert forwarder.forward(client, "ns", "redis", 6379) == port
+    assert forwarder.forward(client, "ns", "redis", 6380) != port
+    forwarder.close()
+
+
+def test_relays_concurrent_connections():
+    forwarder = EchoForwarder()
+    port = forwarder.forward(api_client(), "ns", "redis", 6379)
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as first:
+        assert roundtrip(port, b"second") == b"SECOND"
+        first.sendall(b"first")
+        assert first.recv(1024) == b"FIRST"
+    assert forwarder.streams == [("ns", "redis", 6379)] * 2
+    forwarder.close()
+
+
+def test_slow_reader_does_not_hold_up_other_connections():
+    forwarder = EchoForwarder()
+    port = forwarder.forward(api_client(), "ns", "redis", 6379)
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as stalled:
+
+        def flood():
+            try:
+                stalled.sendall(b"x" * (16 << 20))
+            except OSError:
+                pass
+
+        # Nothing is read back, so the echoed data fills up all buffers on the way back.
+        flooding = threading.Thread(target=flood, daemon=True)
+        flooding.start()
+        flooding.join(1)
+        assert roundtrip(port, b"ping") == b"PING"
+    forwarder.close()
+
+
+def test_close_pod_stops_listening():
+    forwarder = EchoForwarder()
+    client = api_client()
+    port = forwarder.forward(client, "ns", "redis", 6379)
+    other = forwarder.forward(client, "ns", "mongo", 27017)
+    assert roundtrip(port, b"ping") == b"PING"
+
+    forwarder.close_pod("ns", "redis")
+    assert roundtrip(other, b"ping") == b"PING"
+    # The listener is closed by the selector thread, which has handled the above connection by now.
+    with pytest.raises(ConnectionRefusedError):
+        socket.create_connection(("127.0.0.1", port), timeout=5)
+    forwarder.close()
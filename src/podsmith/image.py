@@ -3,16 +3,38 @@
 # See the LICENSE file for details.
 from __future__ import annotations
 
+import json
 import os
 import subprocess
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Protocol
 
 import docker
 
+CACHE_DIR = Path(os.getenv("PODSMITH_CACHE_DIR", Path.home() / ".cache" / "podsmith"))
+KIND_CLUSTER_LABEL = "io.x-k8s.kind.cluster"
+KIND_NETWORK = "kind"
+REGISTRY_NAME = "kind-registry"
+REGISTRY_PORT = int(os.getenv("PODSMITH_REGISTRY_PORT", "5001"))
+# Kind cluster config, for containerd to look for registry mirrors in /etc/containerd/certs.d.
+KIND_REGISTRY_CONFIG = """\
+kind: Cluster
+apiVersion: kind.x-k8s.io/v1alpha4
+containerdConfigPatches:
+- |-
+  [plugins."io.containerd.grpc.v1.cri".registry]
+    config_path = "/etc/containerd/certs.d"
+"""
+
 
 class ImageLoader(Protocol):
     def load_image(self, image: str) -> None: ...
 
+    def load_images(self, images: Iterable[str]) -> None: ...
+
     @staticmethod
     def default_preloader(cluster_name: str) -> str | None:
         if cluster_name.startswith("kind-"):
@@ -24,6 +46,8 @@ class ImageLoader(Protocol):
         match os.getenv("PODSMITH_PRELOAD_IMAGES", cls.default_preloader(cluster_name)):
             case "kind":
                 return KindImageLoader(cluster_name)
+            case "registry":
+                return RegistryImageLoader(cluster_name)
             case "" | None:
                 return None
             case value:
@@ -31,19 +55,214 @@ class ImageLoader(Protocol):
 
 
 class KindImageLoader:
-    def __init__(self, cluster: str) -> None:
+    """Loads local docker images into the nodes of a kind cluster.
+
+    Images already on every node, by image id, are skipped. The ids loaded are recorded in a cache
+    file per cluster instance, so the next run can skip checking the nodes at all.
+    """
+
+    def __init__(self, cluster: str, cache_dir: Path = CACHE_DIR) -> None:
         self.cluster = cluster.removeprefix("kind-")
-        ctx = docker.ContextAPI.get_current_context()
-        self.docker_client = docker.DockerClient(base_url=ctx.Host)
+        self.cache_file = cache_dir / "kind-images.json"
+        self.docker_client = docker_client()
 
     def load_image(self, image: str) -> None:
-        try:
-            self.docker_client.images.get(image)
-            subprocess.run(
-                ["kind", "load", "docker-image", image, "--name", self.cluster],
-                check=True,
-            )
-        except docker.errors.ImageNotFound:
-            pass
-        else:
+        self.load_images([image])
+
+    def load_images(self, images: Iterable[str]) -> None:
+        local = {}
+        for image in dict.fromkeys(images):
+            try:
+                local[image] = self.docker_client.images.get(image).id
+            except docker.errors.ImageNotFound:
+                pass
+        if not local:
+            return
+
+        nodes = kind_nodes(self.docker_client, self.cluster)
+        cache_key = ",".join([self.cluster, *sorted(node.id for node in nodes)])
+        cache = self._read_cache()
+        loaded = cache.get(cache_key, {})
+        pending = {image: id for image, id in local.items() if loaded.get(image) != id}
+        if pending:
+            with ThreadPoolExecutor(max(len(nodes), 1)) as executor:
+                node_images = list(executor.map(self._node_images, nodes))
+            missing = [
+                image
+                for image, id in pending.items()
+                if not all((normalize_image(image), id) in present for present in node_images)
+            ]
+            if missing:
+                print(f"loading images into {self.cluster}: {', '.join(missing)}")
+                subprocess.run(
+                    ["kind", "load", "docker-image", *missing, "--name", self.cluster],
+                    check=True,
+                )
+            loaded.update(pending)
+            # Only keep the current instance of the cluster.
+            cache = {
+                key: value for key, value in cache.items() if not key.startswith(f"{self.cluster},")
+            }
+            cache[cache_key] = loaded
+            self._write_cache(cache)
+
+        for image in local:
             print(f"image ready on {self.cluster}: {image=}")
+
+    def _node_images(self, node) -> set[tuple[str, str]]:
+        """Tag and id of the images on `node`."""
+        exit_code, output = node.exec_run(["crictl", "images", "-o", "json"])
+        if exit_code != 0:
+            return set()
+        return {
+            (tag, image["id"])
+            for image in json.loads(output).get("images", [])
+            for tag in image.get("repoTags") or []
+        }
+
+    def _read_cache(self) -> dict[str, dict[str, str]]:
+        try:
+            return json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, cache: dict[str, dict[str, str]]) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(cache, indent=2))
+        tmp.replace(self.cache_file)
+
+
+class RegistryImageLoader:
+    """Pushes local docker images to a registry, that the nodes of a kind cluster pull through.
+
+    The registry runs as a docker container on the kind network, and is kept running between runs.
+    Each node's containerd is configured to use it as a mirror for the registries of the images
+    pushed, falling back to the upstream registry for anything else. As only changed layers are
+    pushed, and the nodes pull what they need themselves, this is much cheaper than loading whole
+    images into every node.
+
+    Note that a node does not pull an image it already has, unless the pod's image pull policy says
+    so, which is the case for `:latest` images by default.
+    """
+
+    def __init__(self, cluster: str, name: str = REGISTRY_NAME, port: int = REGISTRY_PORT) -> None:
+        self.cluster = cluster.removeprefix("kind-")
+        self.name = name
+        self.port = port
+        self.docker_client = docker_client()
+        self._lock = threading.Lock()
+        self._started = False
+        self._mirrored: set[str] = set()
+
+    def start(self) -> None:
+        """Run the registry, unless already running, and connect it to the kind network."""
+        with self._lock:
+            if self._started:
+                return
+            try:
+                registry = self.docker_client.containers.get(self.name)
+            except docker.errors.NotFound:
+                print(f"starting image registry {self.name} on localhost:{self.port}")
+                registry = self.docker_client.containers.run(
+                    "registry:2",
+                    name=self.name,
+                    detach=True,
+                    restart_policy={"Name": "always"},
+                    ports={"5000/tcp": ("127.0.0.1", self.port)},
+                )
+            if registry.status != "running":
+                registry.start()
+            registry.reload()
+            if KIND_NETWORK not in registry.attrs["NetworkSettings"]["Networks"]:
+                self.docker_client.networks.get(KIND_NETWORK).connect(registry)
+            self._started = True
+
+    def load_image(self, image: str) -> None:
+        self.load_images([image])
+
+    def load_images(self, images: Iterable[str]) -> None:
+        local = []
+        for image in dict.fromkeys(images):
+            if "@" in image:
+                # Pinned by digest, so there's no tag to push it by.
+                continue
+            try:
+                self.docker_client.images.get(image)
+            except docker.errors.ImageNotFound:
+                continue
+            local.append(image)
+        if not local:
+            return
+
+        self.start()
+        self._configure_mirrors({normalize_image(image).split("/", 1)[0] for image in local})
+        with ThreadPoolExecutor(min(len(local), 4)) as executor:
+            for image in executor.map(self._push, local):
+                print(f"image ready on {self.cluster}: {image=}")
+
+    def _push(self, image: str) -> str:
+        domain, path = normalize_image(image).split("/", 1)
+        repository, _, tag = path.rpartition(":")
+        target = f"localhost:{self.port}/{domain}/{repository}"
+        self.docker_client.images.get(image).tag(target, tag)
+        for status in self.docker_client.images.push(target, tag, stream=True, decode=True):
+            if "error" in status:
+                raise RuntimeError(f"pushing {image} to {self.name} failed: {status['error']}")
+        return image
+
+    def _configure_mirrors(self, domains: set[str]) -> None:
+        """Have containerd on every node pull images from `domains` through the registry."""
+        with self._lock:
+            domains -= self._mirrored
+            if not domains:
+                return
+            nodes = kind_nodes(self.docker_client, self.cluster)
+            for domain in domains:
+                server = (
+                    "https://registry-1.docker.io" if domain == "docker.io" else f"https://{domain}"
+                )
+                hosts = (
+                    f'server = "{server}"\n\n'
+                    f'[host."http://{self.name}:5000/v2/{domain}"]\n'
+                    '  capabilities = ["pull", "resolve"]\n'
+                    "  override_path = true\n"
+                )
+                for node in nodes:
+                    exit_code, output = node.exec_run(
+                        [
+                            "sh",
+                            "-c",
+                            'mkdir -p "$1" && printf %s "$2" > "$1/hosts.toml"',
+                            "sh",
+                            f"/etc/containerd/certs.d/{domain}",
+                            hosts,
+                        ]
+                    )
+                    if exit_code != 0:
+                        raise RuntimeError(
+                            f"configuring registry mirror on {node.name} failed: {output.decode()}"
+                        )
+            self._mirrored |= domains
+
+
+def docker_client() -> docker.DockerClient:
+    ctx = docker.ContextAPI.get_current_context()
+    return docker.DockerClient(base_url=ctx.Host)
+
+
+def kind_nodes(client: docker.DockerClient, cluster: str) -> list:
+    """Node containers of kind `cluster`."""
+    return client.containers.list(filters={"label": f"{KIND_CLUSTER_LABEL}={cluster}"})
+
+
+def normalize_image(image: str) -> str:
+    """Fully qualified image reference, as listed by containerd."""
+    name, _, digest = image.partition("@")
+    if "/" not in name:
+        name = f"docker.io/library/{name}"
+    elif not any(c in (domain := name.split("/", 1)[0]) for c in ".:") and domain != "localhost":
+        name = f"docker.io/{name}"
+    if not digest and ":" not in name.rsplit("/", 1)[-1]:
+        name += ":latest"
+    return f"{name}@{digest}" if digest else name
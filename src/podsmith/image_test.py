@@ -0,0 +1,279 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import json
+import subprocess
+from collections.abc import Iterator
+from types import SimpleNamespace
+
+import docker
+import pytest
+from kubernetes.client import V1Container
+
+from . import image
+from .image import (
+    KIND_CLUSTER_LABEL,
+    KIND_NETWORK,
+    KindImageLoader,
+    RegistryImageLoader,
+    normalize_image,
+)
+from .pod import Pod
+
+
+class FakeImage:
+    def __init__(self, id: str, tags: list[tuple[str, str]]) -> None:
+        self.id = id
+        self.tags = tags
+
+    def tag(self, repository: str, tag: str) -> None:
+        self.tags.append((repository, tag))
+
+
+class FakeNode:
+    """Node container of a kind cluster, with the images containerd has, by tag and id."""
+
+    def __init__(self, name: str, images: dict[str, str] | None = None) -> None:
+        self.id = f"{name}-id"
+        self.name = name
+        self.images = dict(images or {})
+        self.commands: list[list[str]] = []
+
+    def exec_run(self, cmd: list[str]) -> tuple[int, bytes]:
+        self.commands.append(cmd)
+        if cmd[0] == "sh":
+            return 0, b""
+        images = [{"id": id, "repoTags": [tag]} for tag, id in self.images.items()]
+        return 0, json.dumps({"images": images}).encode()
+
+
+class FakeImages:
+    def __init__(self, images: dict[str, str]) -> None:
+        self.images = images
+        self.tags: list[tuple[str, str]] = []
+        self.pushed: list[tuple[str, str]] = []
+        self.push_error: str | None = None
+
+    def get(self, name: str) -> FakeImage:
+        if name not in self.images:
+            raise docker.errors.ImageNotFound(name)
+        return FakeImage(self.images[name], self.tags)
+
+    def push(self, repository: str, tag: str, stream: bool, decode: bool) -> Iterator[dict]:
+        self.pushed.append((repository, tag))
+        yield {"status": "Pushing"}
+        if self.push_error is not None:
+            yield {"error": self.push_error}
+
+
+class FakeRegistry:
+    def __init__(self, status: str, networks: list[str]) -> None:
+        self.status = status
+        self.attrs = {"NetworkSettings": {"Networks": dict.fromkeys(networks, {})}}
+
+    def start(self) -> None:
+        self.status = "running"
+
+    def reload(self) -> None:
+        pass
+
+
+class FakeContainers:
+    def __init__(self, nodes: list[FakeNode]) -> None:
+        self.nodes = nodes
+        self.filters: list[dict] = []
+        self.registry: FakeRegistry | None = None
+        self.runs: list[tuple[str, dict]] = []
+
+    def list(self, filters: dict) -> list[FakeNode]:
+        self.filters.append(filters)
+        return self.nodes
+
+    def get(self, name: str) -> FakeRegistry:
+        if self.registry is None:
+            raise docker.errors.NotFound(name)
+        return self.registry
+
+    def run(self, image: str, **kwargs) -> FakeRegistry:
+        self.runs.append((image, kwargs))
+        self.registry = FakeRegistry("created", ["bridge"])
+        return self.registry
+
+
+class FakeNetwork:
+    def __init__(self) -> None:
+        self.connected: list[FakeRegistry] = []
+
+    def connect(self, container: FakeRegistry) -> None:
+        self.connected.append(container)
+        container.attrs["NetworkSettings"]["Networks"][KIND_NETWORK] = {}
+
+
+class FakeDocker:
+    """Just enough of `docker.DockerClient`, with local images by name and id."""
+
+    def __init__(self, images: dict[str, str], nodes: list[FakeNode]) -> None:
+        self.images = FakeImages(images)
+        self.containers = FakeContainers(nodes)
+        self.kind_network = FakeNetwork()
+        self.networks = SimpleNamespace(get={KIND_NETWORK: self.kind_network}.__getitem__)
+
+
+@pytest.fixture
+def kind_loads(monkeypatch) -> list[list[str]]:
+    loads = []
+
+    def run(args, **kwargs):
+        loads.append(args)
+        return subprocess.CompletedProcess(args, 0)
+
+    monkeypatch.setattr(image.subprocess, "run", run)
+    return loads
+
+
+def kind_loader(monkeypatch, tmp_path, client: FakeDocker) -> KindImageLoader:
+    monkeypatch.setattr(image, "docker_client", lambda: client)
+    return KindImageLoader("kind-test", cache_dir=tmp_path)
+
+
+def registry_loader(monkeypatch, client: FakeDocker) -> RegistryImageLoader:
+    monkeypatch.setattr(image, "docker_client", lambda: client)
+    return RegistryImageLoader("kind-test", port=5999)
+
+
+def hosts_toml(node: FakeNode) -> dict[str, str]:
+    """The hosts.toml written on `node`, by registry domain."""
+    return {
+        cmd[4].removeprefix("/etc/containerd/certs.d/"): cmd[5]
+        for cmd in node.commands
+        if cmd[0] == "sh"
+    }
+
+
+@pytest.mark.parametrize(
+    "image, expected",
+    [
+        ("redis", "docker.io/library/redis:latest"),
+        ("redis:7", "docker.io/library/redis:7"),
+        ("bitnami/redis", "docker.io/bitnami/redis:latest"),
+        ("ghcr.io/org/app:1.2", "ghcr.io/org/app:1.2"),
+        ("localhost:5001/app", "localhost:5001/app:latest"),
+        ("mongo@sha256:abc", "docker.io/library/mongo@sha256:abc"),
+    ],
+)
+def test_normalize_image(image, expected):
+    assert normalize_image(image) == expected
+
+
+def test_kind_loads_images_of_all_pods_at_once(monkeypatch, tmp_path, kind_loads):
+    nodes = [FakeNode("test-control-plane"), FakeNode("test-worker")]
+    client = FakeDocker({"redis": "sha256:r", "busybox": "sha256:b"}, nodes)
+    pods = [
+        Pod("a", "test").with_container(V1Container(name="app", image="redis"), service=False),
+        Pod("b", "test").with_container(V1Container(name="app", image="redis"), service=False),
+        Pod("c", "test").with_container(V1Container(name="app", image="busybox"), service=False),
+        Pod("d", "test").with_container(V1Container(name="app", image="missing"), service=False),
+    ]
+    kind_loader(monkeypatch, tmp_path, client).load_images(
+        name for pod in pods for name in pod.images
+    )
+    assert kind_loads == [["kind", "load", "docker-image", "redis", "busybox", "--name", "test"]]
+    assert client.containers.filters == [{"label": f"{KIND_CLUSTER_LABEL}=test"}]
+
+
+def test_kind_skips_images_on_every_node(monkeypatch, tmp_path, kind_loads):
+    redis = {"docker.io/library/redis:latest": "sha256:r"}
+    nodes = [
+        FakeNode("test-control-plane", {**redis, "docker.io/library/busybox:latest": "sha256:b"}),
+        FakeNode("test-worker", redis),
+    ]
+    client = FakeDocker({"redis": "sha256:r", "busybox": "sha256:b", "mongo": "sha256:m"}, nodes)
+    kind_loader(monkeypatch, tmp_path, client).load_images(["redis", "busybox", "mongo"])
+    # Busybox is missing from one node, and mongo from all of them.
+    assert kind_loads == [["kind", "load", "docker-image", "busybox", "mongo", "--name", "test"]]
+
+
+def test_kind_loads_changed_image_again(monkeypatch, tmp_path, kind_loads):
+    nodes = [FakeNode("test-control-plane", {"docker.io/library/redis:latest": "sha256:old"})]
+    client = FakeDocker({"redis": "sha256:new"}, nodes)
+    kind_loader(monkeypatch, tmp_path, client).load_images(["redis"])
+    assert kind_loads == [["kind", "load", "docker-image", "redis", "--name", "test"]]
+
+
+def test_kind_cache_skips_checking_nodes(monkeypatch, tmp_path, kind_loads):
+    node = FakeNode("test-control-plane")
+    client = FakeDocker({"redis": "sha256:r"}, [node])
+    kind_loader(monkeypatch, tmp_path, client).load_images(["redis"])
+    assert len(kind_loads) == 1 and len(node.commands) == 1
+    cache = json.loads((tmp_path / "kind-images.json").read_text())
+    assert cache == {"test,test-control-plane-id": {"redis": "sha256:r"}}
+
+    # Loaded by the previous run, so not even the nodes are asked.
+    kind_loader(monkeypatch, tmp_path, client).load_images(["redis"])
+    assert len(kind_loads) == 1 and len(node.commands) == 1
+
+    # A new instance of the cluster has other nodes.
+    client.containers.nodes = [FakeNode("test-control-plane-2")]
+    kind_loader(monkeypatch, tmp_path, client).load_images(["redis"])
+    assert len(kind_loads) == 2
+    cache = json.loads((tmp_path / "kind-images.json").read_text())
+    assert list(cache) == ["test,test-control-plane-2-id"]
+
+
+def test_registry_started_once_on_kind_network(monkeypatch):
+    client = FakeDocker({"redis": "sha256:r"}, [FakeNode("test-control-plane")])
+    loader = registry_loader(monkeypatch, client)
+    loader.start()
+    loader.start()
+    assert [image for image, _ in client.containers.runs] == ["registry:2"]
+    assert client.containers.runs[0][1]["ports"] == {"5000/tcp": ("127.0.0.1", 5999)}
+    assert client.containers.registry.status == "running"
+    assert client.kind_network.connected == [client.containers.registry]
+
+
+def test_registry_reused_from_previous_run(monkeypatch):
+    client = FakeDocker({}, [])
+    client.containers.registry = registry = FakeRegistry("exited", ["bridge", KIND_NETWORK])
+    registry_loader(monkeypatch, client).start()
+    assert client.containers.runs == []
+    assert registry.status == "running"
+    assert client.kind_network.connected == []
+
+
+def test_registry_mirrors_configured_per_node(monkeypatch):
+    nodes = [FakeNode("test-control-plane"), FakeNode("test-worker")]
+    client = FakeDocker({"redis": "sha256:r", "ghcr.io/org/app:1.2": "sha256:a"}, nodes)
+    loader = registry_loader(monkeypatch, client)
+    loader.load_images(["redis", "ghcr.io/org/app:1.2"])
+    for node in nodes:
+        hosts = hosts_toml(node)
+        assert sorted(hosts) == ["docker.io", "ghcr.io"]
+        assert hosts["docker.io"].startswith('server = "https://registry-1.docker.io"')
+        assert '[host."http://kind-registry:5000/v2/ghcr.io"]' in hosts["ghcr.io"]
+        assert "override_path = true" in hosts["ghcr.io"]
+
+    # Only once per domain.
+    loader.load_images(["redis"])
+    assert all(len(hosts_toml(node)) == 2 for node in nodes)
+    assert all(len(node.commands) == 2 for node in nodes)
+
+
+def test_registry_pushes_retagged_images(monkeypatch):
+    client = FakeDocker(
+        {"redis": "sha256:r", "ghcr.io/org/app:1.2": "sha256:a"}, [FakeNode("test-control-plane")]
+    )
+    registry_loader(monkeypatch, client).load_images(
+        ["redis", "ghcr.io/org/app:1.2", "redis", "missing", "mongo@sha256:abc"]
+    )
+    expected = [
+        ("localhost:5999/docker.io/library/redis", "latest"),
+        ("localhost:5999/ghcr.io/org/app", "1.2"),
+    ]
+    assert sorted(client.images.tags) == sorted(client.images.pushed) == expected
+
+
+def test_registry_push_error(monkeypatch):
+    client = FakeDocker({"redis": "sha256:r"}, [FakeNode("test-control-plane")])
+    client.images.push_error = "denied"
+    with pytest.raises(RuntimeError, match="pushing redis to kind-registry failed: denied"):
+        registry_loader(monkeypatch, client).load_images(["redis"])
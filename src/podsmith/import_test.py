@@ -0,0 +1,44 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("docker", "kubernetes", "testcontainers")
+# Generous, importing the kubernetes client alone takes several times this.
+PLUGIN_IMPORT_BUDGET_MS = 100
+
+
+def python(*args: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True, env=env
+    )
+
+
+def imported_after(statement: str) -> set[str]:
+    code = f"import sys\n{statement}\nprint(' '.join(sys.modules))"
+    return {name.split(".")[0] for name in python("-c", code).stdout.split()}
+
+
+@pytest.mark.parametrize("statement", ["import podsmith", "import podsmith.pytest_plugin"])
+def test_import_is_lazy(statement):
+    assert not imported_after(statement) & set(HEAVY_MODULES)
+
+
+def test_pod_does_not_import_docker():
+    assert not imported_after("from podsmith import Pod") & {"docker", "testcontainers"}
+
+
+def test_plugin_import_time():
+    result = python("-X", "importtime", "-c", "import pytest; import podsmith.pytest_plugin")
+    # Lines of "import time: <self us> | <cumulative us> | <module>"
+    times = {
+        name.strip(): int(cumulative)
+        for _, cumulative, name in (line.split("|") for line in result.stderr.splitlines())
+        if cumulative.strip().isdigit()
+    }
+    assert times["podsmith.pytest_plugin"] / 1000 < PLUGIN_IMPORT_BUDGET_MS
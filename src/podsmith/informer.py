@@ -0,0 +1,230 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from functools import partial
+
+from kubernetes.client import CoreV1Api, V1Pod
+from kubernetes.client.exceptions import ApiException
+from kubernetes.watch import Watch
+
+# Server side timeout for each watch request, after which the watch is resumed.
+WATCH_TIMEOUT = 300
+Predicate = Callable[[V1Pod | None], bool]
+
+
+class _Waiter:
+    def __init__(self, predicate: Predicate, notify: Callable[[], object] | None = None) -> None:
+        self.predicate = predicate
+        self.notify = notify
+        self.done = threading.Event()
+        self.pod: V1Pod | None = None
+        self.error: BaseException | None = None
+
+    def check(self, pod: V1Pod | None) -> None:
+        try:
+            if not self.predicate(pod):
+                return
+            self.pod = pod
+        except Exception as e:
+            self.error = e
+        self.done.set()
+        if self.notify is not None:
+            self.notify()
+
+
+class PodInformer:
+    """Single watch on all pods in a namespace, with a local cache of their last known state.
+
+    Waiters register a predicate for a pod by name, which is called with the cached pod (or None
+    when there is no such pod) and again on every change to it, until it returns true. A predicate
+    may also raise, to fail the wait.
+
+    The watch is started on the first wait and runs until `stop()`. When the watch expires (410
+    Gone) the pods are listed anew and the watch resumes from there.
+    """
+
+    def __init__(self, api: CoreV1Api, namespace: str) -> None:
+        self.api = api
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._pods: dict[str, V1Pod] = {}
+        self._waiters: dict[str, list[_Waiter]] = defaultdict(list)
+        self._synced = threading.Event()
+        self._resource_version: str | None = None
+        self._thread: threading.Thread | None = None
+        self._watch: Watch | None = None
+        self._stopped = False
+
+    def get(self, name: str) -> V1Pod | None:
+        """Last known state of pod `name`."""
+        with self._lock:
+            return self._pods.get(name)
+
+    def wait_for(
+        self, name: str, predicate: Predicate, timeout: float | None = None
+    ) -> V1Pod | None:
+        """Wait for `predicate` to hold for pod `name`.
+
+        Returns the pod, or None if `timeout` seconds passed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._start()
+        if not self._synced.wait(timeout):
+            return None
+
+        waiter = self._add_waiter(name, _Waiter(predicate))
+        try:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not waiter.done.wait(remaining):
+                return None
+        finally:
+            self._remove_waiter(name, waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.pod
+
+    async def wait_for_async(
+        self, name: str, predicate: Predicate, timeout: float | None = None
+    ) -> V1Pod | None:
+        """Same as `wait_for`, without tying up a thread while waiting.
+
+        The informer thread wakes up the waiting task once done, so any number of pods may be
+        waited on from a single event loop.
+        """
+        loop = asyncio.get_running_loop()
+        finished = asyncio.Event()
+        # Until synced, the waiter is checked once the pods have been listed.
+        waiter = self._add_waiter(
+            name, _Waiter(predicate, partial(loop.call_soon_threadsafe, finished.set))
+        )
+        self._start()
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._remove_waiter(name, waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.pod
+
+    def stop(self) -> None:
+        self._stopped = True
+        if self._watch is not None:
+            self._watch.stop()
+
+    def _add_waiter(self, name: str, waiter: _Waiter) -> _Waiter:
+        with self._lock:
+            if self._synced.is_set():
+                waiter.check(self._pods.get(name))
+            if not waiter.done.is_set():
+                self._waiters[name].append(waiter)
+        return waiter
+
+    def _remove_waiter(self, name: str, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter in (waiters := self._waiters.get(name, [])):
+                waiters.remove(waiter)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"podsmith-informer-{self.namespace}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        delay = 0.0
+        while not self._stopped:
+            try:
+                if self._resource_version is None:
+                    self._list()
+                self._stream()
+                delay = 0.0
+            except ApiException as e:
+                if e.status == 410:
+                    # Our resource version is too old, start over from a fresh list.
+                    self._resource_version = None
+                    continue
+                print(f"pod informer for {self.namespace}: {e.status} {e.reason}, retrying...")
+                delay = min(2 * delay or 0.5, 10)
+            except Exception as e:
+                print(f"pod informer for {self.namespace}: {e}, retrying...")
+                delay = min(2 * delay or 0.5, 10)
+            time.sleep(delay)
+
+    def _list(self) -> None:
+        pods = self.api.list_namespaced_pod(self.namespace)
+        with self._lock:
+            previous = self._pods
+            self._pods = {pod.metadata.name: pod for pod in pods.items}
+            self._resource_version = pods.metadata.resource_version
+            # Including pods waited on before the informer was synced.
+            for name in previous.keys() | self._pods.keys() | self._waiters.keys():
+                self._dispatch(name)
+            self._synced.set()
+
+    def _stream(self) -> None:
+        self._watch = w = Watch()
+        for event in w.stream(
+            self.api.list_namespaced_pod,
+            self.namespace,
+            resource_version=self._resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=WATCH_TIMEOUT,
+        ):
+            if event["type"] == "BOOKMARK":
+                self._resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+                continue
+
+            pod = event["object"]
+            name = pod.metadata.name
+            with self._lock:
+                if event["type"] == "DELETED":
+                    self._pods.pop(name, None)
+                else:
+                    self._pods[name] = pod
+                self._resource_version = pod.metadata.resource_version
+                self._dispatch(name)
+            if self._stopped:
+                w.stop()
+
+    def _dispatch(self, name: str) -> None:
+        if waiters := self._waiters.get(name):
+            pod = self._pods.get(name)
+            for waiter in waiters:
+                if not waiter.done.is_set():
+                    waiter.check(pod)
+
+
+class InformerRegistry:
+    """Pod informers, one per cluster and namespace."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._informers: dict[tuple[str, str], PodInformer] = {}
+
+    def get(self, api: CoreV1Api, namespace: str) -> PodInformer:
+        key = (api.api_client.configuration.host, namespace)
+        with self._lock:
+            if (informer := self._informers.get(key)) is None:
+                informer = self._informers[key] = PodInformer(api, namespace)
+            return informer
+
+    def discard(self, cluster: str, namespace: str) -> None:
+        """Stop the informer for `namespace`, if any."""
+        with self._lock:
+            informer = self._informers.pop((cluster, namespace), None)
+        if informer is not None:
+            informer.stop()
+
+
+INFORMERS = InformerRegistry()
@@ -0,0 +1,155 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from kubernetes.client import (
+    ApiClient,
+    V1ListMeta,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodCondition,
+    V1PodList,
+    V1PodStatus,
+)
+
+from .informer import PodInformer
+
+
+def pod(name: str, rv: int, ready: bool = False) -> V1Pod:
+    conditions = [V1PodCondition(type="Ready", status="True")] if ready else []
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, resource_version=str(rv)),
+        status=V1PodStatus(phase="Running" if ready else "Pending", conditions=conditions),
+    )
+
+
+class FakeResponse:
+    def __init__(self, events: list[dict]) -> None:
+        self.events = events
+
+    def stream(self, amt=None, decode_content=False):
+        for event in self.events:
+            yield json.dumps(event).encode() + b"\n"
+        # Let the watch idle a bit, as a real one would.
+        time.sleep(0.05)
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakePodApi:
+    """Pod listing and watching from canned responses."""
+
+    def __init__(self, lists: list[V1PodList], watches: list[list[dict]]) -> None:
+        self.lists = lists
+        self.watches = watches
+        self.calls = []
+        self.serializer = ApiClient()
+
+    def list_namespaced_pod(self, namespace, **kwargs):
+        """:return: V1PodList"""
+        if kwargs.get("watch"):
+            self.calls.append(("watch", kwargs.get("resource_version")))
+            events = self.watches.pop(0) if self.watches else []
+            return FakeResponse(events)
+        self.calls.append(("list", None))
+        return self.lists.pop(0) if len(self.lists) > 1 else self.lists[0]
+
+    def event(self, type: str, obj: V1Pod) -> dict:
+        return {"type": type, "object": self.serializer.sanitize_for_serialization(obj)}
+
+
+def is_ready(pod: V1Pod | None) -> bool:
+    return pod is not None and any(c.type == "Ready" for c in pod.status.conditions or [])
+
+
+def pod_list(*pods: V1Pod, rv: int) -> V1PodList:
+    return V1PodList(items=list(pods), metadata=V1ListMeta(resource_version=str(rv)))
+
+
+def test_waiters_share_one_watch():
+    api = FakePodApi([pod_list(pod("a", 1), rv=2)], [])
+    api.watches.append(
+        [api.event("ADDED", pod("b", 3)), api.event("MODIFIED", pod("a", 4, ready=True))]
+    )
+    api.watches.append([api.event("MODIFIED", pod("b", 5, ready=True))])
+    informer = PodInformer(api, "test")
+    results = {}
+
+    def wait(name):
+        results[name] = informer.wait_for(name, is_ready, timeout=5)
+
+    threads = [threading.Thread(target=wait, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    informer.stop()
+
+    assert results["a"].metadata.resource_version == "4"
+    assert results["b"].metadata.resource_version == "5"
+    assert api.calls[:3] == [("list", None), ("watch", "2"), ("watch", "4")]
+
+
+def test_relists_on_gone():
+    gone = {"type": "ERROR", "object": {"code": 410, "reason": "Gone", "message": "too old"}}
+    api = FakePodApi(
+        [pod_list(pod("a", 1), rv=1), pod_list(pod("a", 7, ready=True), rv=7)], [[gone]]
+    )
+    informer = PodInformer(api, "test")
+    found = informer.wait_for("a", is_ready, timeout=5)
+    informer.stop()
+
+    assert found.metadata.resource_version == "7"
+    assert api.calls[:3] == [("list", None), ("watch", "1"), ("list", None)]
+
+
+def test_wait_times_out():
+    api = FakePodApi([pod_list(pod("a", 1), rv=1)], [])
+    informer = PodInformer(api, "test")
+    assert informer.wait_for("a", is_ready, timeout=0.2) is None
+    informer.stop()
+
+
+def test_predicate_error_fails_wait():
+    api = FakePodApi([pod_list(pod("a", 1), rv=1)], [])
+    informer = PodInformer(api, "test")
+
+    def broken(pod):
+        raise RuntimeError("bad pod")
+
+    with pytest.raises(RuntimeError, match="bad pod"):
+        informer.wait_for("a", broken, timeout=1)
+    informer.stop()
+
+
+def test_async_waiters_share_one_watch():
+    api = FakePodApi([pod_list(pod("a", 1), rv=2)], [])
+    api.watches.append(
+        [api.event("ADDED", pod("b", 3)), api.event("MODIFIED", pod("a", 4, ready=True))]
+    )
+    api.watches.append([api.event("MODIFIED", pod("b", 5, ready=True))])
+    informer = PodInformer(api, "test")
+
+    async def wait():
+        return await asyncio.gather(
+            informer.wait_for_async("a", is_ready, timeout=5),
+            informer.wait_for_async("b", is_ready, timeout=5),
+            informer.wait_for_async("c", is_ready, timeout=0.2),
+        )
+
+    a, b, c = asyncio.run(wait())
+    informer.stop()
+
+    assert a.metadata.resource_version == "4"
+    assert b.metadata.resource_version == "5"
+    assert c is None
+    assert api.calls[:3] == [("list", None), ("watch", "2"), ("watch", "4")]
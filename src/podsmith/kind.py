@@ -0,0 +1,205 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import hashlib
+import os
+import subprocess
+import time
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+
+import backoff
+from kubernetes import config
+from kubernetes.client import CoreV1Api, V1ConfigMap, V1ObjectMeta
+from kubernetes.client.exceptions import ApiException
+from urllib3.exceptions import MaxRetryError
+
+from .clients import get_api
+from .manifest import FIELD_MANAGER, MANAGED_BY_LABEL, READY_NAMESPACES, REUSE_EXISTING
+from .shared import SharedResources
+
+CLUSTER_NAME = "podsmith-dev"
+# Keep the kind cluster after the test run, and reuse it for the next one.
+KEEP_CLUSTER = os.getenv("PODSMITH_KEEP_CLUSTER", "") not in ("", "0", "false")
+# Config map recording the kind config a cluster was created with.
+CONFIG_HASH_NAMESPACE = "kube-system"
+CONFIG_HASH_NAME = "podsmith-cluster"
+
+
+class KindCluster:
+    """A kind cluster for testing, optionally kept between runs.
+
+    With `keep`, an existing cluster is reused as long as it was created with the same kind config,
+    otherwise it is recreated. Namespaces left behind by podsmith in a reused cluster are deleted
+    up front, unless resources are being reused as well (`PODSMITH_REUSE`).
+
+    With `shared`, the cluster is shared by several processes, e.g. the workers of a pytest-xdist
+    run. The first process to start creates or reuses it, as above, and the others use it as is. It
+    is deleted by the last process to stop, unless kept.
+    """
+
+    def __init__(
+        self,
+        name: str = CLUSTER_NAME,
+        kind_config: str | None = None,
+        keep: bool = KEEP_CLUSTER,
+        shared: SharedResources | None = None,
+    ) -> None:
+        self.name = name
+        self.kind_config = kind_config
+        self.keep = keep
+        self.shared = shared
+        self.reused = False
+        self._started = False
+
+    @property
+    def config_hash(self) -> str:
+        return hashlib.sha256((self.kind_config or "").encode()).hexdigest()[:16]
+
+    def exists(self) -> bool:
+        result = subprocess.run(
+            ["kind", "get", "clusters"], capture_output=True, text=True, check=True
+        )
+        return self.name in result.stdout.split()
+
+    def start(self, kubeconfig_file: Path) -> None:
+        """Create the cluster, or reuse it when kept, and wait until the API is responsive.
+
+        Sets KUBECONFIG for the current process, so any subprocesses spawned will use this cluster
+        by default as well.
+        """
+        with self._locked():
+            if self.shared is not None and self.shared.users():
+                # Brought up by another process already.
+                self._export_kubeconfig(kubeconfig_file)
+                self.reused = True
+                self._load_kubeconfig(kubeconfig_file)
+            else:
+                self._bring_up(kubeconfig_file)
+            if self.shared is not None:
+                self.shared.acquire()
+            self._started = True
+
+    def _bring_up(self, kubeconfig_file: Path) -> None:
+        if self.keep and self.exists():
+            self._export_kubeconfig(kubeconfig_file)
+            if self._stored_config_hash(kubeconfig_file) == self.config_hash:
+                print(f"reusing kind cluster {self.name}")
+                self.reused = True
+            else:
+                print(f"kind cluster {self.name} has a different config, recreating it...")
+                self.delete()
+
+        if not self.reused:
+            create = ["kind", "create", "cluster", "--name", self.name]
+            create += ["--kubeconfig", str(kubeconfig_file)]
+            if self.kind_config:
+                config_file = kubeconfig_file.with_name("kind.yaml")
+                config_file.write_text(self.kind_config)
+                create += ["--config", str(config_file)]
+            subprocess.run(create, check=True)
+
+        self._load_kubeconfig(kubeconfig_file)
+        if self.reused:
+            if not REUSE_EXISTING:
+                self.sweep_namespaces()
+        elif self.keep:
+            self._store_config_hash()
+
+    def _load_kubeconfig(self, kubeconfig_file: Path) -> None:
+        os.environ["KUBECONFIG"] = str(kubeconfig_file)
+        config.load_kube_config(config_file=str(kubeconfig_file))
+        self.wait_until_ready()
+
+    def stop(self) -> None:
+        """Delete the cluster, unless kept or still used by other processes."""
+        with self._locked():
+            if self.shared is not None:
+                started, self._started = self._started, False
+                users = self.shared.release() if started else self.shared.users()
+                if users:
+                    return
+            if not self.keep:
+                self.delete()
+
+    def delete(self) -> None:
+        subprocess.run(["kind", "delete", "cluster", "--name", self.name], check=True)
+
+    def wait_until_ready(self, timeout: float = 120) -> None:
+        """Wait until the API is responsive and all nodes are ready."""
+        v1 = get_api(CoreV1Api)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if self._nodes_ready(v1):
+                    return
+            except (ApiException, MaxRetryError):
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Kubernetes cluster did not become ready in time")
+            time.sleep(0.5)
+
+    @staticmethod
+    def _nodes_ready(v1: CoreV1Api) -> bool:
+        nodes = v1.list_node().items
+        return bool(nodes) and all(
+            any(
+                c.type == "Ready" and c.status == "True"
+                for c in (node.status and node.status.conditions) or ()
+            )
+            for node in nodes
+        )
+
+    def sweep_namespaces(self, timeout: float = 120) -> None:
+        """Delete all namespaces created by podsmith, waiting for them to be gone."""
+        v1 = get_api(CoreV1Api)
+        selector = f"{MANAGED_BY_LABEL}={FIELD_MANAGER}"
+        namespaces = [ns.metadata.name for ns in v1.list_namespace(label_selector=selector).items]
+        if not namespaces:
+            return
+
+        print(f"deleting leftover namespaces: {', '.join(namespaces)}")
+        for namespace in namespaces:
+            try:
+                v1.delete_namespace(namespace)
+            except ApiException as e:
+                if e.status != 404:
+                    raise
+        READY_NAMESPACES.clear()
+
+        @backoff.on_predicate(backoff.fibo, max_value=2, max_time=timeout)
+        def deleted() -> bool:
+            return not v1.list_namespace(label_selector=selector).items
+
+        if not deleted():
+            raise TimeoutError(f"leftover namespaces still not deleted after {timeout} seconds")
+
+    def _locked(self) -> AbstractContextManager:
+        return self.shared.lock() if self.shared is not None else nullcontext()
+
+    def _export_kubeconfig(self, kubeconfig_file: Path) -> None:
+        subprocess.run(
+            ["kind", "export", "kubeconfig", "--name", self.name],
+            env={**os.environ, "KUBECONFIG": str(kubeconfig_file)},
+            capture_output=True,
+            check=True,
+        )
+
+    def _stored_config_hash(self, kubeconfig_file: Path) -> str | None:
+        try:
+            config.load_kube_config(config_file=str(kubeconfig_file))
+            self.wait_until_ready()
+            config_map = get_api(CoreV1Api).read_namespaced_config_map(
+                CONFIG_HASH_NAME, CONFIG_HASH_NAMESPACE
+            )
+        except (ApiException, RuntimeError):
+            return None
+        return (config_map.data or {}).get("config-hash")
+
+    def _store_config_hash(self) -> None:
+        config_map = V1ConfigMap(
+            metadata=V1ObjectMeta(name=CONFIG_HASH_NAME), data={"config-hash": self.config_hash}
+        )
+        get_api(CoreV1Api).create_namespaced_config_map(CONFIG_HASH_NAMESPACE, config_map)
@@ -0,0 +1,149 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import subprocess
+
+import pytest
+
+from . import kind
+from .kind import CONFIG_HASH_NAME, CONFIG_HASH_NAMESPACE, KindCluster
+from .manifest import FIELD_MANAGER, MANAGED_BY_LABEL
+from .memory import MemoryBackend
+from .shared import SharedResources
+
+
+class FakeKind:
+    """Stands in for the `kind` command, keeping track of the clusters created."""
+
+    def __init__(self, backend: MemoryBackend) -> None:
+        self.backend = backend
+        self.clusters: set[str] = set()
+        self.commands: list[str] = []
+
+    def run(self, args, **kwargs) -> subprocess.CompletedProcess:
+        command = args[1]
+        self.commands.append(command)
+        match command:
+            case "create":
+                self.clusters.add(args[4])
+            case "delete":
+                self.clusters.discard(args[4])
+                metadata = {"name": CONFIG_HASH_NAME}
+                self.backend.cluster.put(
+                    "configmaps", CONFIG_HASH_NAMESPACE, {"metadata": metadata}, "DELETED"
+                )
+        return subprocess.CompletedProcess(args, 0, stdout="\n".join(self.clusters))
+
+
+@pytest.fixture
+def backend(memory_backend):
+    """The memory backend, with a ready node as a new kind cluster has."""
+    memory_backend.cluster.put(
+        "nodes", None, node("podsmith-dev-control-plane", ready=True), "ADDED"
+    )
+    return memory_backend
+
+
+@pytest.fixture
+def fake_kind(monkeypatch, backend):
+    fake_kind = FakeKind(backend)
+    monkeypatch.setattr(kind.subprocess, "run", fake_kind.run)
+    monkeypatch.setattr(kind.config, "load_kube_config", lambda **kwargs: None)
+    return fake_kind
+
+
+def node(name: str, ready: bool) -> dict:
+    condition = {"type": "Ready", "status": str(ready)}
+    return {"metadata": {"name": name}, "status": {"conditions": [condition]}}
+
+
+def leftover_namespace(backend, name: str) -> None:
+    namespace = {"metadata": {"name": name, "labels": {MANAGED_BY_LABEL: FIELD_MANAGER}}}
+    backend.cluster.put("namespaces", None, namespace, "ADDED")
+
+
+def stored_config_hash(backend, config_hash: str) -> None:
+    config_map = {
+        "metadata": {"name": CONFIG_HASH_NAME, "namespace": CONFIG_HASH_NAMESPACE},
+        "data": {"config-hash": config_hash},
+    }
+    backend.cluster.put("configmaps", CONFIG_HASH_NAMESPACE, config_map, "ADDED")
+
+
+def namespaces(backend) -> list[str]:
+    return [ns["metadata"]["name"] for ns in backend.cluster.objects("namespaces")]
+
+
+def test_config_hash():
+    assert KindCluster().config_hash == KindCluster(kind_config="").config_hash
+    assert KindCluster(kind_config="a").config_hash == KindCluster(kind_config="a").config_hash
+    assert KindCluster(kind_config="a").config_hash != KindCluster(kind_config="b").config_hash
+
+
+def test_reuse_kept_cluster(fake_kind, backend, tmp_path):
+    fake_kind.clusters.add("podsmith-dev")
+    cluster = KindCluster(kind_config="a", keep=True)
+    stored_config_hash(backend, cluster.config_hash)
+    leftover_namespace(backend, "leftover")
+
+    cluster.start(tmp_path / "kubeconfig.yaml")
+    assert cluster.reused
+    assert "create" not in fake_kind.commands
+    assert namespaces(backend) == []
+    cluster.stop()
+    assert fake_kind.clusters == {"podsmith-dev"}
+
+
+def test_recreate_kept_cluster_with_other_config(fake_kind, backend, tmp_path):
+    fake_kind.clusters.add("podsmith-dev")
+    stored_config_hash(backend, KindCluster(kind_config="a").config_hash)
+    cluster = KindCluster(kind_config="b", keep=True)
+
+    cluster.start(tmp_path / "kubeconfig.yaml")
+    assert not cluster.reused
+    assert fake_kind.commands[-2:] == ["delete", "create"]
+    config_map = backend.cluster.get("configmaps", CONFIG_HASH_NAMESPACE, CONFIG_HASH_NAME)
+    assert config_map["data"] == {"config-hash": cluster.config_hash}
+
+
+def test_shared_cluster_deleted_by_last_process(fake_kind, backend, tmp_path):
+    first = KindCluster(shared=SharedResources(tmp_path, "kind"), keep=False)
+    second = KindCluster(shared=SharedResources(tmp_path, "kind"), keep=False)
+
+    first.start(tmp_path / "first.yaml")
+    second.start(tmp_path / "second.yaml")
+    assert fake_kind.commands.count("create") == 1
+    assert second.reused
+
+    first.stop()
+    assert fake_kind.clusters == {"podsmith-dev"}
+    second.stop()
+    assert fake_kind.clusters == set()
+
+
+def test_shared_kept_cluster_swept_by_first_process(fake_kind, backend, tmp_path):
+    fake_kind.clusters.add("podsmith-dev")
+    first = KindCluster(shared=SharedResources(tmp_path, "kind"), keep=True)
+    second = KindCluster(shared=SharedResources(tmp_path, "kind"), keep=True)
+    stored_config_hash(backend, first.config_hash)
+    leftover_namespace(backend, "leftover")
+
+    first.start(tmp_path / "first.yaml")
+    assert namespaces(backend) == []
+    # Namespace of the first worker, that the second must leave alone.
+    leftover_namespace(backend, "podsmith-gw0")
+    second.start(tmp_path / "second.yaml")
+    assert namespaces(backend) == ["podsmith-gw0"]
+
+    second.stop()
+    first.stop()
+    assert "delete" not in fake_kind.commands
+
+
+def test_wait_until_ready_waits_for_nodes(backend):
+    backend.cluster.put("nodes", None, node("podsmith-dev-worker", ready=False))
+    with pytest.raises(RuntimeError, match="did not become ready"):
+        KindCluster().wait_until_ready(timeout=0.1)
+
+    backend.cluster.put("nodes", None, node("podsmith-dev-worker", ready=True))
+    KindCluster().wait_until_ready(timeout=0.1)
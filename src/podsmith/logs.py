@@ -0,0 +1,373 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from kubernetes.client import CoreV1Api
+from kubernetes.client.exceptions import ApiException
+from urllib3.exceptions import HTTPError
+
+if TYPE_CHECKING:
+    from .manifest import Manifest
+    from .pod import Pod
+
+# Matches are looked for within this many characters of recent log output.
+DEFAULT_WINDOW = 8 * 1024
+# Size at which a captured log file is rotated, and the number of rotated files kept per test.
+DEFAULT_MAX_BYTES = int(os.getenv("PODSMITH_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+DEFAULT_BACKUP_COUNT = 1
+LogPatterns = str | re.Pattern | Iterable[str | re.Pattern] | Mapping[str | re.Pattern, int]
+
+
+def compile_patterns(patterns: LogPatterns, count: int = 1) -> dict[re.Pattern, int]:
+    """Map of compiled pattern to the number of matches to wait for."""
+    if isinstance(patterns, (str, re.Pattern)):
+        patterns = {patterns: count}
+    elif not isinstance(patterns, Mapping):
+        patterns = dict.fromkeys(patterns, count)
+    return {re.compile(pattern, re.MULTILINE): n for pattern, n in patterns.items()}
+
+
+class LogMatcher:
+    """Incremental regex matching over a sliding window of log output.
+
+    Text is fed as it arrives, and searched from where the previous match of each pattern ended but
+    no further back than `window` characters. Matches must fit in `window` characters, in return
+    the cost of each feed is bounded regardless of how much has been logged.
+    """
+
+    def __init__(self, patterns: Mapping[re.Pattern, int], window: int = DEFAULT_WINDOW) -> None:
+        self.patterns = dict(patterns)
+        self.matches: dict[re.Pattern, list[re.Match]] = {pattern: [] for pattern in patterns}
+        self.window = window
+        self._text = ""
+        # Position of `_text` in the log, and where to continue searching for each pattern.
+        self._offset = 0
+        self._searched = 0
+        self._resume = dict.fromkeys(patterns, 0)
+
+    @property
+    def done(self) -> bool:
+        return all(len(self.matches[p]) >= n for p, n in self.patterns.items())
+
+    def missing(self) -> list[re.Pattern]:
+        return [p for p, n in self.patterns.items() if len(self.matches[p]) < n]
+
+    def feed(self, text: str) -> bool:
+        """Search `text` along with the log so far, returns True once all patterns are matched.
+
+        Only whole lines are searched, any trailing partial line is held back until it is complete.
+        """
+        self._text += text
+        end = self._text.rfind("\n") + 1
+        # Text before this has been searched already, with no match.
+        searched = self._searched - self._offset - self.window
+        for pattern, count in self.patterns.items():
+            found = self.matches[pattern]
+            while len(found) < count:
+                start = max(self._resume[pattern] - self._offset, searched, 0)
+                if (match := pattern.search(self._text, start, end)) is None:
+                    break
+                found.append(match)
+                # Don't match the same (empty) string again.
+                self._resume[pattern] = self._offset + max(match.end(), match.start() + 1)
+        self._searched = self._offset + end
+
+        if len(self._text) > 2 * self.window:
+            drop = min(len(self._text) - self.window, end)
+            self._text = self._text[drop:]
+            self._offset += drop
+        return self.done
+
+
+def follow_log(
+    api: CoreV1Api,
+    namespace: str,
+    name: str,
+    container: str | None = None,
+    *,
+    since_seconds: int | None = None,
+    timeout: float | None = None,
+    max_delay: float = 5,
+    stop: threading.Event | None = None,
+) -> Iterator[str]:
+    """Text of a container log as it is written, in blocks of whole lines.
+
+    The log is followed until `timeout` seconds have passed or `stop` is set, reconnecting as needed
+    when the stream ends, e.g. when the container restarts. Log lines are timestamped by the server,
+    so reconnecting resumes right after the last line seen rather than from the start of the log.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    stop = stop or threading.Event()
+    # Timestamp of the last line seen, and how many lines had that timestamp.
+    last_seen: str | None = None
+    seen_at_last = 0
+    delay = 0.0
+
+    while not stop.is_set() and (
+        deadline is None or (remaining := deadline - time.monotonic()) > 0
+    ):
+        if last_seen is not None:
+            since_seconds = _seconds_since(last_seen)
+        try:
+            response = api.read_namespaced_pod_log(
+                name=name,
+                namespace=namespace,
+                container=container,
+                follow=True,
+                timestamps=True,
+                since_seconds=since_seconds,
+                _preload_content=False,
+                _request_timeout=None if deadline is None else (min(remaining, 10), remaining),
+            )
+        except ApiException as e:
+            # 400 Bad Request while the container is still starting.
+            if e.status != 400:
+                raise
+        else:
+            # The server resends the lines since a whole second, skip those already seen.
+            resuming, replayed = last_seen is not None, seen_at_last
+            try:
+                for lines in _lines(response):
+                    block = []
+                    for line in lines:
+                        timestamp, _, text = line.partition(" ")
+                        timestamp = _normalize(timestamp)
+                        if resuming:
+                            if timestamp < last_seen:
+                                continue
+                            if timestamp == last_seen and replayed:
+                                replayed -= 1
+                                continue
+                            resuming = False
+                        if timestamp == last_seen:
+                            seen_at_last += 1
+                        else:
+                            last_seen, seen_at_last = timestamp, 1
+                        block.append(text)
+                    if block:
+                        delay = 0.0
+                        yield "\n".join(block) + "\n"
+                    if stop.is_set() or deadline is not None and time.monotonic() > deadline:
+                        return
+            except HTTPError:
+                # Read timeout, or connection lost.
+                pass
+            finally:
+                response.close()
+                response.release_conn()
+
+        delay = min(2 * delay or 0.1, max_delay)
+        if deadline is not None:
+            delay = min(delay, max(deadline - time.monotonic(), 0))
+        stop.wait(delay)
+
+
+def _lines(response) -> Iterator[list[str]]:
+    pending = b""
+    for chunk in response.stream(amt=None, decode_content=False):
+        *lines, pending = (pending + chunk).split(b"\n")
+        yield [line.decode(errors="replace") for line in lines]
+    if pending:
+        yield [pending.decode(errors="replace")]
+
+
+def _normalize(timestamp: str) -> str:
+    # Trailing zeros are left out of the fraction, so pad it for the timestamps to sort correctly.
+    seconds, _, fraction = timestamp.rstrip("Z").partition(".")
+    return f"{seconds}.{fraction:0<9}"
+
+
+def _seconds_since(timestamp: str) -> int:
+    seconds = datetime.fromisoformat(timestamp.partition(".")[0]).replace(tzinfo=timezone.utc)
+    return max(math.ceil(datetime.now(timezone.utc).timestamp() - seconds.timestamp()) + 1, 1)
+
+
+class LogCollector:
+    """Captures the logs of all pods loaded in a session to files, in the background.
+
+    Each container log is followed by a thread of its own, written to
+    `<directory>/<test>/<namespace>.<pod>.<container>.log` for the test currently running (see
+    `start_test`). Files are rotated once they reach `max_bytes`, keeping `backup_count` rotated
+    files per test. Only the tail of the files is ever read back.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.test = _safe_name(None)
+        self._lock = threading.Lock()
+        self._sinks: dict[tuple[str, str, str], _LogSink] = {}
+        self._stop = threading.Event()
+
+    def start_test(self, name: str | None) -> None:
+        """Capture logs to the files of test `name` from now on."""
+        self.test = _safe_name(name)
+
+    def attach(self, resource: Manifest) -> None:
+        """Capture the container logs of `resource`, if it is a pod, as soon as it is created.
+
+        That is, before waiting for the pod to get ready, so the logs of a pod that fails to are
+        captured as well.
+        """
+        if resource.kind == "Pod":
+            pod: Pod = resource
+            pod.log_collector = self
+
+    def watch(self, resource: Manifest) -> None:
+        """Start capturing the container logs of `resource`, if it is a pod."""
+        if resource.kind != "Pod":
+            return
+        pod: Pod = resource
+        pod.log_collector = self
+        for container in pod.manifest.spec.containers:
+            key = (pod.namespace, pod.name, container.name)
+            with self._lock:
+                if key in self._sinks or self._stop.is_set():
+                    continue
+                sink = self._sinks[key] = _LogSink(self, ".".join(key))
+            threading.Thread(
+                target=self._follow,
+                args=(pod, container.name, sink),
+                name=f"podsmith-logs-{pod.name}-{container.name}",
+                daemon=True,
+            ).start()
+
+    def tail(self, pod: Pod, container: str | None, lines: int) -> str | None:
+        """Last `lines` of a captured container log, or None if it is not being captured."""
+        container = container or pod.manifest.spec.containers[0].name
+        with self._lock:
+            sink = self._sinks.get((pod.namespace, pod.name, container))
+        return None if sink is None else sink.tail(lines)
+
+    def test_tails(self, name: str | None, lines: int) -> Iterator[tuple[str, str]]:
+        """Label and tail of each container log captured during test `name`."""
+        test = _safe_name(name)
+        with self._lock:
+            sinks = list(self._sinks.values())
+        for sink in sinks:
+            if (tail := sink.tail(lines, test)) is not None:
+                yield sink.label, tail
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            sinks = list(self._sinks.values())
+        for sink in sinks:
+            sink.close()
+
+    def _follow(self, pod: Pod, container: str, sink: _LogSink) -> None:
+        try:
+            for text in follow_log(
+                pod.core_api, pod.namespace, pod.name, container, stop=self._stop
+            ):
+                sink.write(text)
+        except ApiException as e:
+            # The pod is gone.
+            if e.status != 404:
+                print(f"{pod}: capturing logs of {container!r} failed: {e.status} {e.reason}")
+        except Exception as e:
+            print(f"{pod}: capturing logs of {container!r} failed: {e}")
+        finally:
+            sink.close()
+
+
+class _LogSink:
+    """Rotating log files for one container."""
+
+    def __init__(self, collector: LogCollector, label: str) -> None:
+        self.collector = collector
+        self.label = label
+        self.files: list[Path] = []
+        self._lock = threading.Lock()
+        self._file = None
+        self._test: str | None = None
+        self._size = 0
+        self._index: dict[str, int] = {}
+        self._closed = False
+
+    def write(self, text: str) -> None:
+        data = text.encode()
+        with self._lock:
+            if self._closed:
+                return
+            test = self.collector.test
+            if self._file is None or test != self._test or self._size >= self.collector.max_bytes:
+                self._open(test)
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+
+    def tail(self, lines: int, test: str | None = None) -> str | None:
+        with self._lock:
+            files = [f for f in self.files if test is None or f.parent.name == test]
+        if not files:
+            return None
+        chunks: list[bytes] = []
+        for path in reversed(files):
+            lines -= _read_tail(path, lines, chunks)
+            if lines <= 0:
+                break
+        return b"".join(reversed(chunks)).decode(errors="replace").strip()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self, test: str) -> None:
+        if self._file is not None:
+            self._file.close()
+        directory = self.collector.directory / test
+        directory.mkdir(parents=True, exist_ok=True)
+        same_test = [f for f in self.files if f.parent == directory]
+        index = self._index[test] = self._index.get(test, -1) + 1
+        path = directory / (f"{self.label}.log" if not index else f"{self.label}.{index}.log")
+        self._file = path.open("ab")
+        self._test = test
+        self._size = 0
+        self.files.append(path)
+        for old in (same_test + [path])[: -self.collector.backup_count - 1]:
+            old.unlink(missing_ok=True)
+            self.files.remove(old)
+
+
+def _read_tail(path: Path, lines: int, chunks: list[bytes], block_size: int = 8192) -> int:
+    """Read up to `lines` from the end of `path` into `chunks`, returns the number of lines read."""
+    try:
+        with path.open("rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            data = b""
+            while end > 0 and data.count(b"\n") <= lines:
+                start = max(end - block_size, 0)
+                f.seek(start)
+                data = f.read(end - start) + data
+                end = start
+    except FileNotFoundError:
+        return 0
+    tail = data.rstrip(b"\n").split(b"\n")[-lines:] if data.strip() else []
+    if tail:
+        chunks.append(b"\n".join(tail) + b"\n")
+    return len(tail)
+
+
+def _safe_name(name: str | None) -> str:
+    return re.sub(r"[^\w.-]+", "_", name or "session").strip("_")
@@ -0,0 +1,132 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import re
+
+from kubernetes.client import V1Container, V1ContainerPort
+
+from .logs import LogCollector, LogMatcher, _LogSink, compile_patterns, follow_log
+from .pod import Pod
+from .session import Session
+
+
+def test_compile_patterns():
+    assert compile_patterns("a") == {re.compile("a", re.MULTILINE): 1}
+    assert compile_patterns(["a", "b"], count=2) == {
+        re.compile("a", re.MULTILINE): 2,
+        re.compile("b", re.MULTILINE): 2,
+    }
+    assert compile_patterns({"a": 3}) == {re.compile("a", re.MULTILINE): 3}
+
+
+def test_matcher_counts_matches_across_feeds():
+    ready, port = compile_patterns(["ready", r"^port (\d+)$"])
+    matcher = LogMatcher({ready: 2, port: 1})
+    assert not matcher.feed("starting\nready\n")
+    assert not matcher.feed("port 80")
+    assert not matcher.feed("80\n")
+    assert matcher.missing() == [ready]
+    assert matcher.feed("ready\n")
+    assert [m.start() for m in matcher.matches[ready]] == [9, 25]
+    assert matcher.matches[port][0].group(1) == "8080"
+
+
+def test_matcher_window_bounds_search():
+    (pattern,) = [re.compile(r"start.*end", re.DOTALL)]
+    matcher = LogMatcher({pattern: 1}, window=16)
+    matcher.feed("start\n")
+    matcher.feed("x" * 100 + "\n")
+    assert not matcher.feed("end\n")
+    assert matcher.feed("start end\n")
+
+
+class FakeLogResponse:
+    def __init__(self, *chunks: bytes) -> None:
+        self.chunks = chunks
+
+    def stream(self, amt=None, decode_content=False):
+        yield from self.chunks
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeLogApi:
+    def __init__(self, *responses: FakeLogResponse) -> None:
+        self.responses = list(responses)
+        self.requests = []
+
+    def read_namespaced_pod_log(self, **kwargs):
+        self.requests.append(kwargs)
+        return self.responses.pop(0) if self.responses else FakeLogResponse()
+
+
+def test_follow_log_resumes_after_last_line():
+    api = FakeLogApi(
+        FakeLogResponse(b"2026-01-01T00:00:00.1Z one\n2026-01-01T00:00:00.", b"12Z two\n"),
+        # After reconnecting, the server sends some of the same lines again.
+        FakeLogResponse(b"2026-01-01T00:00:00.12Z two\n2026-01-01T00:00:01Z three\n"),
+    )
+    text = "".join(follow_log(api, "ns", "pod", timeout=0.5))
+
+    assert text == "one\ntwo\nthree\n"
+    assert api.requests[0]["since_seconds"] is None
+    assert api.requests[0]["follow"] and api.requests[0]["timestamps"]
+    assert api.requests[1]["since_seconds"] > 0
+
+
+def test_follow_log_keeps_lines_with_the_same_timestamp():
+    api = FakeLogApi(
+        FakeLogResponse(b"2026-01-01T00:00:00.1Z one\n2026-01-01T00:00:00.1Z two\n"),
+        FakeLogResponse(
+            b"2026-01-01T00:00:00.1Z one\n2026-01-01T00:00:00.1Z two\n"
+            b"2026-01-01T00:00:00.1Z three\n2026-01-01T00:00:00.1Z three\n"
+        ),
+    )
+    text = "".join(follow_log(api, "ns", "pod", timeout=0.5))
+
+    assert text == "one\ntwo\nthree\nthree\n"
+
+
+def test_log_sink_rotates_per_test_and_size(tmp_path):
+    collector = LogCollector(tmp_path, max_bytes=20, backup_count=1)
+    sink = _LogSink(collector, "ns.pod.app")
+    collector.start_test("test_logs.py::test_one")
+    for i in range(6):
+        sink.write(f"one {i:03}\n" * 2)
+    collector.start_test("test_logs.py::test_two")
+    sink.write("two\n")
+    sink.close()
+
+    one = tmp_path / "test_logs.py_test_one"
+    assert sorted(p.name for p in one.iterdir()) == ["ns.pod.app.1.log", "ns.pod.app.2.log"]
+    assert (tmp_path / "test_logs.py_test_two" / "ns.pod.app.log").read_text() == "two\n"
+    assert sink.tail(3) == "one 005\none 005\ntwo"
+    expected = "".join(f"one {i:03}\n" * 2 for i in range(2, 6)).strip()
+    assert sink.tail(10, "test_logs.py_test_one") == expected
+
+
+def test_collector_captures_logs_from_pod_creation(memory_backend, tmp_path, monkeypatch):
+    watched = []
+    watch = LogCollector.watch
+
+    def recording_watch(self, resource):
+        watched.append((resource.name, resource.manifest.status.phase))
+        watch(self, resource)
+
+    monkeypatch.setattr(LogCollector, "watch", recording_watch)
+    collector = LogCollector(tmp_path)
+    pod = Pod("web", "logs-test").with_container(
+        V1Container(name="app", image="nginx", ports=[V1ContainerPort(container_port=80)])
+    )
+    try:
+        with Session(log_collector=collector) as session:
+            session.load(pod)
+            assert pod.manifest.status.phase == "Running"
+    finally:
+        collector.close()
+    # Before the pod was ready.
+    assert watched == [("web", "Pending")]
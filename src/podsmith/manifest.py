@@ -3,17 +3,38 @@
 # See the LICENSE file for details.
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import os
 import random
 import string
-import time
+import threading
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextvars import ContextVar
 from copy import deepcopy
+from datetime import date
 from typing import Generic, TypeVar
 
-from kubernetes.client import ApiClient, CoreV1Api, V1Namespace, V1ObjectMeta
+import backoff
+from kubernetes.client import (
+    ApiClient,
+    AppsV1Api,
+    Configuration,
+    CoreV1Api,
+    RbacAuthorizationV1Api,
+    V1Namespace,
+    V1ObjectMeta,
+)
 from kubernetes.client.exceptions import ApiException
+from kubernetes.watch import Watch
 from typing_extensions import Self
 
+from .clients import get_api
+from .informer import INFORMERS
+from .tracing import TRACER
+
 
 def random_text(length) -> str:
     return "".join(random.choices(string.ascii_lowercase + string.digits, k=length))
@@ -33,11 +54,101 @@ def set_default_namespace(namespace: str) -> None:
     DEFAULT_NAMESPACE = namespace
 
 
+def api_path(api_version: str, plural: str, namespace: str | None = None) -> str:
+    """API path of a resource collection, e.g. `/apis/apps/v1/namespaces/test/daemonsets`."""
+    path = f"/api/{api_version}" if "/" not in api_version else f"/apis/{api_version}"
+    if namespace:
+        path += f"/namespaces/{namespace}"
+    return f"{path}/{plural}"
+
+
+def copy_model(value: T) -> T:
+    """Deep copy of an API object, sharing the client configuration held by each model.
+
+    Every API model holds a `Configuration` of its own, which is most of the cost of copying
+    manifests with `deepcopy`. The configuration isn't part of the manifest, so is safe to share.
+    """
+    if value is None or isinstance(value, (str, int, float, bytes, date)):
+        return value
+    if isinstance(value, list):
+        return [copy_model(item) for item in value]
+    if isinstance(value, dict):
+        return {key: copy_model(item) for key, item in value.items()}
+    if hasattr(type(value), "openapi_types"):
+        copy = object.__new__(type(value))
+        copy.__dict__.update(
+            (key, item if key == "local_vars_configuration" else copy_model(item))
+            for key, item in value.__dict__.items()
+        )
+        return copy
+    return deepcopy(value)
+
+
+class NamespaceCache:
+    """Thread safe record of namespaces known to be ready, per cluster."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ready: dict[str, set[str]] = defaultdict(set)
+        self._pending: dict[tuple[str, str], threading.Lock] = {}
+
+    def is_ready(self, cluster: str, namespace: str) -> bool:
+        with self._lock:
+            return namespace in self._ready[cluster]
+
+    def lock(self, cluster: str, namespace: str) -> threading.Lock:
+        """Lock to hold while checking and setting up `namespace`."""
+        with self._lock:
+            return self._pending.setdefault((cluster, namespace), threading.Lock())
+
+    def add(self, cluster: str, namespace: str) -> None:
+        with self._lock:
+            self._ready[cluster].add(namespace)
+
+    def discard(self, cluster: str, namespace: str) -> None:
+        with self._lock:
+            self._ready[cluster].discard(namespace)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ready.clear()
+
+
 DEFAULT_NAMESPACE = "podsmith-test"
+FIELD_MANAGER = "podsmith"
+# Set to FIELD_MANAGER on namespaces created by podsmith, to find any left behind.
+MANAGED_BY_LABEL = "app.kubernetes.io/managed-by"
+SPEC_HASH_ANNOTATION = "podsmith/spec-hash"
+# Metadata set by the API server, that doesn't carry over to another cluster.
+SERVER_METADATA = (
+    "creationTimestamp",
+    "deletionGracePeriodSeconds",
+    "deletionTimestamp",
+    "generation",
+    "managedFields",
+    "ownerReferences",
+    "resourceVersion",
+    "selfLink",
+    "uid",
+)
+# Adopt live resources with a matching spec hash rather than creating them, and keep them around.
+REUSE_EXISTING = os.getenv("PODSMITH_REUSE", "") not in ("", "0", "false")
+READY_NAMESPACES = NamespaceCache()
+# When set, namespaces are collected here on `Manifest.destroy` rather than deleted right away.
+deferred_namespaces: ContextVar[list[Manifest] | None] = ContextVar(
+    "deferred_namespaces", default=None
+)
+# Shared by the API objects built by podsmith, as creating a `Configuration` for each is most of
+# the cost of building them. It only holds client side validation settings for models.
+MODEL_CONFIGURATION = Configuration()
 T = TypeVar("T")
 
 
 class Manifest(ABC, Generic[T]):
+    api_version: str
+    kind: str
+    plural: str
+
     def __init__(
         self,
         name: str,
@@ -52,7 +163,10 @@ class Manifest(ABC, Generic[T]):
         self.created = False
         self.existing = False
         self.created_namespace = False
+        self.reuse = REUSE_EXISTING
         self._manifest = None
+        # Metadata for the manifest, until there is one.
+        self._new_metadata: V1ObjectMeta | None = None
         self._name = name
         self._namespace = namespace or get_default_namespace()
         self._metadata = metadata
@@ -63,6 +177,18 @@ class Manifest(ABC, Generic[T]):
     def __repr__(self) -> str:
         return f"<{type(self).__name__} {self.namespace}/{self.name}>"
 
+    @property
+    def core_api(self) -> CoreV1Api:
+        return get_api(CoreV1Api, self.client)
+
+    @property
+    def rbac_api(self) -> RbacAuthorizationV1Api:
+        return get_api(RbacAuthorizationV1Api, self.client)
+
+    @property
+    def apps_api(self) -> AppsV1Api:
+        return get_api(AppsV1Api, self.client)
+
     @property
     def live(self) -> bool:
         return self.created or self.existing
@@ -80,6 +206,8 @@ class Manifest(ABC, Generic[T]):
         self._name = value
         if self._manifest is not None:
             self._manifest.metadata.name = value
+        elif self._new_metadata is not None:
+            self._new_metadata.name = value
 
     @property
     def namespace(self) -> str:
@@ -94,17 +222,21 @@ class Manifest(ABC, Generic[T]):
         self._namespace = value
         if self._manifest is not None:
             self._manifest.metadata.namespace = value
+        elif self._new_metadata is not None:
+            self._new_metadata.namespace = value
 
     @property
     def metadata(self) -> V1ObjectMeta:
         if self._manifest:
             return self._manifest.metadata
-        else:
-            return V1ObjectMeta(
+        if self._new_metadata is None:
+            self._new_metadata = V1ObjectMeta(
                 namespace=self.namespace,
                 name=self.name,
+                local_vars_configuration=MODEL_CONFIGURATION,
                 **self._metadata,
             )
+        return self._new_metadata
 
     @property
     def manifest(self) -> T:
@@ -115,7 +247,7 @@ class Manifest(ABC, Generic[T]):
     @manifest.setter
     def manifest(self, value: T) -> None:
         assert not self.live
-        self._manifest = deepcopy(value)
+        self._manifest = copy_model(value)
         self._manifest.metadata.name = self._name
         self._manifest.metadata.namespace = self._namespace
 
@@ -125,21 +257,103 @@ class Manifest(ABC, Generic[T]):
         return self
 
     def create(self) -> Self:
-        api = CoreV1Api(self.client)
-        self.ensure_namespace(api)
-        print(f"creating {self}...")
-        self._manifest = self._create()
-        self.created = True
-        return self
+        with TRACER.span("create", self):
+            self.ensure_namespace(self.core_api)
+            spec_hash = self._stamp()
+            if self.reuse:
+                with TRACER.span("adopt", self):
+                    if self._adopt(spec_hash):
+                        return self
+            print(f"creating {self}...")
+            with TRACER.span("request", self):
+                self._manifest = self._create()
+            self.created = True
+            return self
+
+    def apply(self) -> Self:
+        """Server-side apply this resource, creating or updating it as needed."""
+        with TRACER.span("apply", self):
+            self.ensure_namespace(self.core_api)
+            self._stamp()
+            print(f"applying {self}...")
+            with TRACER.span("request", self):
+                self._manifest = self._apply()
+            self.created = True
+            return self
 
     def destroy(self):
+        if self.reuse and self.created:
+            # Leave it for the next run to adopt.
+            print(f"keeping {self}...")
+            self.created = self.created_namespace = False
+            self.existing = True
         if self.created:
             print(f"deleting {self}...")
-            self._delete()
+            try:
+                with TRACER.span("delete", self):
+                    self._delete()
+            except ApiException as e:
+                # Already gone, e.g. along with its namespace.
+                if e.status != 404:
+                    raise
             self.created = False
         if self.created_namespace:
-            print(f"deleting namespace {self.namespace}...")
-            CoreV1Api(self.client).delete_namespace(self.namespace)
+            if (deferred := deferred_namespaces.get()) is not None:
+                deferred.append(self)
+                self.created_namespace = False
+            else:
+                self.destroy_namespace()
+
+    def _stamp(self) -> str:
+        """Record the spec hash as an annotation on the manifest."""
+        spec_hash = self.spec_hash()
+        metadata = self.manifest.metadata
+        # New dict, as the annotations may be shared with `self._metadata`.
+        metadata.annotations = {**(metadata.annotations or {}), SPEC_HASH_ANNOTATION: spec_hash}
+        return spec_hash
+
+    def _adopt(self, spec_hash: str) -> bool:
+        """Use the live resource as is if it has the same spec, or delete it if it does not."""
+        try:
+            live = self._get_manifest()
+        except ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+
+        if (live.metadata.annotations or {}).get(SPEC_HASH_ANNOTATION) == spec_hash:
+            print(f"reusing {self}...")
+            self._manifest = live
+            self.existing = True
+            return True
+
+        print(f"replacing {self}, spec has changed...")
+        self._delete()
+        self._wait_deleted()
+        return False
+
+    def _wait_deleted(self, max_time: float = 120) -> None:
+        @backoff.on_predicate(backoff.fibo, max_value=2, max_time=max_time)
+        def deleted() -> bool:
+            try:
+                self._get_manifest()
+            except ApiException as e:
+                if e.status == 404:
+                    return True
+                raise
+            return False
+
+        if not deleted():
+            raise TimeoutError(f"{self}: still not deleted after {max_time} seconds")
+
+    def destroy_namespace(self) -> None:
+        print(f"deleting namespace {self.namespace}...")
+        api = self.core_api
+        READY_NAMESPACES.discard(api.api_client.configuration.host, self.namespace)
+        INFORMERS.discard(api.api_client.configuration.host, self.namespace)
+        with TRACER.span("delete-namespace", f"Namespace {self.namespace}"):
+            api.delete_namespace(self.namespace)
+        self.created_namespace = False
 
     def __enter__(self):
         try:
@@ -151,34 +365,115 @@ class Manifest(ABC, Generic[T]):
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         self.destroy()
 
+    async def refresh_async(self) -> Self:
+        return await asyncio.to_thread(self.refresh)
+
+    async def create_async(self) -> Self:
+        return await asyncio.to_thread(self.create)
+
+    async def apply_async(self) -> Self:
+        return await asyncio.to_thread(self.apply)
+
+    async def destroy_async(self) -> None:
+        await asyncio.to_thread(self.destroy)
+
+    async def __aenter__(self):
+        try:
+            return await self.create_async()
+        except:
+            await self.destroy_async()
+            raise
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await asyncio.to_thread(self.__exit__, exc_type, exc_val, exc_tb)
+
     def ensure_namespace(self, api: CoreV1Api) -> None:
         namespace = self.namespace
         if not namespace:
             return
 
-        # Ensure namespace exists
-        try:
-            api.read_namespace(namespace)
-        except ApiException as e:
-            if e.status == 404:
-                print(f"→ Creating namespace: {namespace}")
-                api.create_namespace(V1Namespace(metadata=V1ObjectMeta(name=namespace)))
-                self.created_namespace = True
-            else:
-                raise
+        cluster = api.api_client.configuration.host
+        if READY_NAMESPACES.is_ready(cluster, namespace):
+            return
+
+        with (
+            TRACER.span("namespace", f"Namespace {namespace}"),
+            READY_NAMESPACES.lock(cluster, namespace),
+        ):
+            if READY_NAMESPACES.is_ready(cluster, namespace):
+                return
 
-        # Wait for default service account
-        for _ in range(10):
+            # Ensure namespace exists
             try:
-                api.read_namespaced_service_account("default", namespace)
-                break
+                api.read_namespace(namespace)
             except ApiException as e:
                 if e.status == 404:
-                    time.sleep(1)
+                    print(f"→ Creating namespace: {namespace}")
+                    metadata = V1ObjectMeta(
+                        name=namespace, labels={MANAGED_BY_LABEL: FIELD_MANAGER}
+                    )
+                    api.create_namespace(V1Namespace(metadata=metadata))
+                    self.created_namespace = True
                 else:
                     raise
-        else:
-            raise TimeoutError(f"Default service account not available in namespace '{namespace}'")
+
+            # Wait for default service account
+            with TRACER.span("service-account", f"Namespace {namespace}"):
+                w = Watch()
+                for event in w.stream(
+                    api.list_namespaced_service_account,
+                    namespace,
+                    field_selector="metadata.name=default",
+                    timeout_seconds=10,
+                ):
+                    if event["type"] in ("ADDED", "MODIFIED"):
+                        w.stop()
+                        break
+                else:
+                    raise TimeoutError(
+                        f"Default service account not available in namespace '{namespace}'"
+                    )
+
+            READY_NAMESPACES.add(cluster, namespace)
+
+    def depends_on(self, other: Manifest) -> bool:
+        """Whether `other` must be created before this resource, when provisioned together."""
+        return False
+
+    def provisioned_resources(self) -> list[Manifest]:
+        """This resource along with those provisioned with it, in creation order."""
+        return [self]
+
+    def to_dict(self) -> dict:
+        """The manifest as plain data, without status and metadata set by the API server."""
+        body = self.core_api.api_client.sanitize_for_serialization(self.manifest)
+        body.update(apiVersion=self.api_version, kind=self.kind)
+        body.pop("status", None)
+        for field in SERVER_METADATA:
+            body["metadata"].pop(field, None)
+        return body
+
+    def spec_hash(self) -> str:
+        """Hash of the resource definition, leaving out metadata and status."""
+        body = self.core_api.api_client.sanitize_for_serialization(self.manifest)
+        body.pop("metadata", None)
+        body.pop("status", None)
+        return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+
+    def with_namespace(self, namespace: str) -> Self:
+        """Move the resource to `namespace`, along with any resources it owns."""
+        self.namespace = namespace
+        return self
+
+    def with_reuse(self, reuse: bool = True) -> Self:
+        """Adopt a live resource with a matching spec hash, rather than creating it anew.
+
+        A live resource with a different spec hash is replaced. Resources are left in place on
+        `destroy`, for the next run to adopt, along with any namespace created for them.
+        """
+        assert not self.live
+        self.reuse = reuse
+        return self
 
     def with_spec(self, **kwargs) -> Self:
         assert not self.live
@@ -186,6 +481,25 @@ class Manifest(ABC, Generic[T]):
             setattr(self.manifest.spec, attr, value)
         return self
 
+    def _path(self) -> str:
+        """API path of the collection this resource belongs to."""
+        return api_path(self.api_version, self.plural, self.namespace)
+
+    def _apply(self) -> T:
+        return self.core_api.api_client.call_api(
+            f"{self._path()}/{self.name}",
+            "PATCH",
+            query_params=[("fieldManager", FIELD_MANAGER), ("force", "true")],
+            header_params={
+                "Accept": "application/json",
+                "Content-Type": "application/apply-patch+yaml",
+            },
+            body=self.to_dict(),
+            response_type=type(self.manifest).__name__,
+            auth_settings=["BearerToken"],
+            _return_http_data_only=True,
+        )
+
     @abstractmethod
     def _create(self) -> T:
         """Create the resource in the cluster."""
@@ -0,0 +1,160 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from copy import deepcopy
+from datetime import datetime, timezone
+
+import pytest
+from kubernetes.client import CoreV1Api, V1ConfigMap, V1Container
+from kubernetes.client.exceptions import ApiException
+
+from .fake_api import FakeApiServer
+from .manifest import READY_NAMESPACES, SPEC_HASH_ANNOTATION, ClusterManifest, copy_model
+from .pod import Pod
+from .session import Session
+
+
+class StoredConfigMap(ClusterManifest[V1ConfigMap]):
+    """Config map kept in a plain dict, in place of a cluster."""
+
+    kind = "ConfigMap"
+
+    def __init__(self, name: str, store: dict, calls: list, **data) -> None:
+        super().__init__(name)
+        self.store = store
+        self.calls = calls
+        self.data = data
+
+    def _new_manifest(self) -> V1ConfigMap:
+        return V1ConfigMap(metadata=self.metadata, data=self.data)
+
+    def _get_manifest(self) -> V1ConfigMap:
+        self.calls.append(("get", self.name))
+        if self.name not in self.store:
+            raise ApiException(status=404)
+        return deepcopy(self.store[self.name])
+
+    def _create(self) -> V1ConfigMap:
+        self.calls.append(("create", self.name))
+        self.store[self.name] = deepcopy(self.manifest)
+        return self.manifest
+
+    def _delete(self) -> None:
+        self.calls.append(("delete", self.name))
+        del self.store[self.name]
+
+
+def test_create_stamps_spec_hash():
+    store, calls = {}, []
+    with StoredConfigMap("cfg", store, calls, key="value") as cfg:
+        annotations = store["cfg"].metadata.annotations
+        assert annotations[SPEC_HASH_ANNOTATION] == cfg.spec_hash()
+        assert calls == [("create", "cfg")]
+    assert store == {}
+
+
+def test_reuse_adopts_matching_resource():
+    store, calls = {}, []
+    StoredConfigMap("cfg", store, calls, key="value").create()
+    calls.clear()
+
+    with Session(reuse=True) as session:
+        (cfg,) = session.load(StoredConfigMap("cfg", store, calls, key="value"))
+        assert cfg.existing and not cfg.created
+    assert calls == [("get", "cfg")]
+    assert "cfg" in store
+
+
+def test_reuse_replaces_changed_resource():
+    store, calls = {}, []
+    StoredConfigMap("cfg", store, calls, key="value").create()
+    calls.clear()
+
+    with StoredConfigMap("cfg", store, calls, key="other").with_reuse() as cfg:
+        assert cfg.created and not cfg.existing
+        assert store["cfg"].data == {"key": "other"}
+    assert calls == [
+        ("get", "cfg"),
+        ("delete", "cfg"),
+        ("get", "cfg"),
+        ("create", "cfg"),
+    ]
+    assert store["cfg"].data == {"key": "other"}
+
+
+def test_spec_hash_ignores_metadata():
+    store, calls = {}, []
+    a = StoredConfigMap("a", store, calls, key="value")
+    b = StoredConfigMap("b", store, calls, key="value")
+    b.manifest.metadata.labels = {"x": "y"}
+    c = StoredConfigMap("c", store, calls, key="other")
+    assert a.spec_hash() == b.spec_hash() != c.spec_hash()
+
+
+def test_copy_model_shares_only_configuration():
+    pod = Pod("web", "ns").with_container(V1Container(name="app", image="nginx"), service=False)
+    pod.manifest.metadata.creation_timestamp = datetime.now(timezone.utc)
+    copy = copy_model(pod.manifest)
+    assert copy == pod.manifest == deepcopy(pod.manifest)
+    assert copy.local_vars_configuration is pod.manifest.local_vars_configuration
+    copy.metadata.labels["extra"] = "label"
+    copy.spec.containers[0].image = "busybox"
+    assert "extra" not in pod.manifest.metadata.labels
+    assert pod.manifest.spec.containers[0].image == "nginx"
+
+
+def test_metadata_is_kept_until_manifest_is_built():
+    store, calls = {}, []
+    cfg = StoredConfigMap("a", store, calls)
+    metadata = cfg.metadata
+    assert cfg.metadata is metadata
+    cfg.name = "b"
+    assert metadata.name == "b"
+    assert cfg.manifest.metadata is metadata
+
+
+@pytest.fixture
+def servers():
+    READY_NAMESPACES.clear()
+    with FakeApiServer() as first, FakeApiServer() as second:
+        yield first, second
+    READY_NAMESPACES.clear()
+
+
+def test_ensure_namespace_is_cached_per_host(servers):
+    first, second = servers
+    first_api, second_api = CoreV1Api(first.api_client()), CoreV1Api(second.api_client())
+    pod = Pod("web", "cached")
+
+    pod.ensure_namespace(first_api)
+    assert pod.created_namespace
+    assert first.calls["get", "namespaces"] == first.calls["create", "namespaces"] == 1
+    assert READY_NAMESPACES.is_ready(first.url, "cached")
+    assert not READY_NAMESPACES.is_ready(second.url, "cached")
+
+    # Hit, no requests at all.
+    calls = first.calls.copy()
+    Pod("other", "cached").ensure_namespace(first_api)
+    assert first.calls == calls
+
+    # Miss for the same namespace on another host.
+    other = Pod("web", "cached")
+    other.ensure_namespace(second_api)
+    assert other.created_namespace
+    assert second.calls["create", "namespaces"] == 1
+
+
+def test_destroy_namespace_drops_it_from_cache(servers, monkeypatch):
+    first, second = servers
+    first_api, second_api = CoreV1Api(first.api_client()), CoreV1Api(second.api_client())
+    pod = Pod("web", "dropped")
+    pod.ensure_namespace(first_api)
+    pod.ensure_namespace(second_api)
+
+    monkeypatch.setattr(Pod, "core_api", property(lambda self: first_api))
+    pod.destroy_namespace()
+    assert not READY_NAMESPACES.is_ready(first.url, "dropped")
+    assert READY_NAMESPACES.is_ready(second.url, "dropped")
+
+    pod.ensure_namespace(first_api)
+    assert first.calls["create", "namespaces"] == 2
@@ -0,0 +1,95 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+from collections.abc import Iterator
+from http import HTTPStatus
+from urllib.parse import urlencode, urlsplit
+
+from kubernetes.client import ApiClient, Configuration
+
+from .fake_api import FakeCluster, Response
+
+MEMORY_HOST = "http://podsmith.memory"
+
+
+class MemoryBackend:
+    """Runs podsmith against a `FakeCluster` in this process, rather than a real cluster.
+
+    The API clients of this backend hand their requests straight to the fake cluster, so all
+    resources and watches work as usual, without any network round trips. Pods become ready on
+    their own, going through the usual phases and conditions, and services get a cluster IP. Pods
+    don't actually run though, so there are no logs and no ports to forward to.
+
+    This is for checking the wiring of fixtures, session scopes and RBAC in milliseconds.
+    """
+
+    def __init__(self, cluster: FakeCluster | None = None) -> None:
+        self.cluster = cluster or FakeCluster()
+
+    def api_client(self) -> ApiClient:
+        configuration = Configuration()
+        configuration.host = MEMORY_HOST
+        client = ApiClient(configuration)
+        client.rest_client.pool_manager = MemoryPoolManager(self.cluster)
+        return client
+
+    def close(self) -> None:
+        self.cluster.close()
+
+
+class MemoryPoolManager:
+    """Stands in for the urllib3 pool manager of an API client, see `MemoryBackend`."""
+
+    def __init__(self, cluster: FakeCluster) -> None:
+        self.cluster = cluster
+
+    def request(
+        self, method: str, url: str, fields=None, body=None, preload_content=True, **kwargs
+    ) -> MemoryResponse:
+        parts = urlsplit(url)
+        path = parts.path
+        if query := "&".join(filter(None, (parts.query, urlencode(fields or [])))):
+            path += f"?{query}"
+        if isinstance(body, str):
+            body = body.encode()
+        return MemoryResponse(self.cluster.handle(method, path, body))
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryResponse:
+    """Just enough of `urllib3.HTTPResponse` for the kubernetes client."""
+
+    def __init__(self, response: Response) -> None:
+        self.response = response
+        self.status = response.status
+        self.reason = HTTPStatus(response.status).phrase
+        self.headers = {"Content-Type": response.content_type}
+
+    @property
+    def data(self) -> bytes:
+        if isinstance(self.response.body, bytes):
+            return self.response.body
+        return b"".join(self.response.body)
+
+    def stream(self, amt=None, decode_content=None) -> Iterator[bytes]:
+        if isinstance(self.response.body, bytes):
+            yield self.response.body
+        else:
+            yield from self.response.body
+
+    def getheaders(self) -> dict[str, str]:
+        return self.headers
+
+    def getheader(self, name: str, default: str | None = None) -> str | None:
+        return self.headers.get(name, default)
+
+    def release_conn(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.response.close is not None:
+            self.response.close()
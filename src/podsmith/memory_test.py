@@ -0,0 +1,54 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import time
+
+import pytest
+from kubernetes.client import CoreV1Api, V1Container, V1ContainerPort
+
+from .clients import create_backend
+from .config_map import ConfigMap
+from .memory import MemoryBackend
+from .pod import Pod
+from .session import Session
+
+
+def test_create_backend():
+    assert create_backend("cluster") is None
+    assert isinstance(create_backend("memory"), MemoryBackend)
+    with pytest.raises(ValueError):
+        create_backend("kind")
+
+
+def test_session_against_memory_backend(memory_backend):
+    pod = Pod("web", "memory-test").with_container(
+        V1Container(
+            name="app", image="nginx", ports=[V1ContainerPort(container_port=80, name="http")]
+        )
+    )
+    pod.with_auth_rule(api_groups=[""], resources=["pods"], verbs=["get"])
+    started = time.perf_counter()
+    with Session() as session:
+        session.load(pod, ConfigMap("settings", "memory-test").with_data({"key": "value"}))
+        assert pod.manifest.status.phase == "Running"
+        assert {c.type for c in pod.manifest.status.conditions} == {
+            "PodScheduled",
+            "Initialized",
+            "ContainersReady",
+            "Ready",
+        }
+        assert pod.services["http"].manifest.spec.cluster_ip
+        assert memory_backend.cluster.get("configmaps", "memory-test", "settings")["data"] == {
+            "key": "value"
+        }
+    assert time.perf_counter() - started < 5
+    assert memory_backend.cluster.objects("namespaces") == []
+    assert memory_backend.cluster.calls["create", "pods"] == 1
+
+
+def test_watch_stops_with_backend():
+    backend = MemoryBackend()
+    api = CoreV1Api(backend.api_client())
+    response = api.list_namespaced_pod("ns", watch=True, _preload_content=False)
+    backend.close()
+    assert list(response.stream()) == []
@@ -3,17 +3,21 @@
 # See the LICENSE file for details.
 from __future__ import annotations
 
+import asyncio
+import os
 import re
-import socket
-import subprocess
-from contextlib import contextmanager
+import time
+import warnings
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
 from functools import partial
+from typing import TYPE_CHECKING
+from weakref import WeakSet
 
-import backoff
 from kubernetes.client import (
     ApiClient,
-    CoreV1Api,
+    CoreV1Event,
     V1Container,
     V1ContainerPort,
     V1EnvVar,
@@ -24,19 +28,76 @@ from kubernetes.client import (
     V1PodSpec,
     V1ServicePort,
 )
-from kubernetes.watch import Watch
-from testcontainers.core.container import DockerContainer
 from typing_extensions import Self
 
-from .image import ImageLoader
-from .manifest import Manifest
+from .config_map import ConfigMap
+from .forward import FORWARDER
+from .informer import INFORMERS, Predicate
+from .logs import (
+    DEFAULT_WINDOW,
+    LogCollector,
+    LogMatcher,
+    LogPatterns,
+    compile_patterns,
+    follow_log,
+)
+from .manifest import MODEL_CONFIGURATION, Manifest
 from .role import ClusterRole, Role, RoleBase
 from .role_binding import ClusterRoleBinding, RoleBinding, RoleBindingBase
 from .service import APP_LABEL, Service
 from .service_account import ServiceAccount
+from .tracing import TRACER, current_span
+
+if TYPE_CHECKING:
+    from testcontainers.core.container import DockerContainer
+
+    from .image import ImageLoader
+
+# Reasons for a pod, its scheduling or containers, that it won't recover from by itself.
+TERMINAL_REASONS = frozenset(
+    {
+        "CrashLoopBackOff",
+        "CreateContainerConfigError",
+        "CreateContainerError",
+        "DeadlineExceeded",
+        "ErrImageNeverPull",
+        "ErrImagePull",
+        "Evicted",
+        "ImagePullBackOff",
+        "InvalidImageName",
+        "OOMKilled",
+        "RunContainerError",
+        "Unschedulable",
+    }
+)
+# Terminal reasons to keep waiting on anyway, e.g. `ErrImagePull` while images are still pushed.
+# Pods are `Unschedulable` for a while when the nodes of a new cluster are not yet ready, or while
+# waiting for a volume to bind, so by default that only fails on timeout.
+RETRYABLE_REASONS = frozenset(
+    reason
+    for reason in os.getenv("PODSMITH_RETRYABLE_REASONS", "Unschedulable").split(",")
+    if reason
+)
+
+
+# All pods declared so far, e.g. at module level in test modules, for finding the images to pre-pull.
+DECLARED_PODS: WeakSet[Pod] = WeakSet()
+
+
+class PodFailedError(RuntimeError):
+    """The pod ended up in a state it won't get ready from."""
+
+    def __init__(self, reason: str, message: str, diagnostics: str | None = None) -> None:
+        super().__init__(message if diagnostics is None else f"{message}\n{diagnostics}")
+        self.reason = reason
+        self.diagnostics = diagnostics
 
 
 class Pod(Manifest[V1Pod]):
+    api_version = "v1"
+    kind = "Pod"
+    plural = "pods"
+
     @dataclass
     class Rbac:
         role: RoleBase
@@ -66,15 +127,33 @@ class Pod(Manifest[V1Pod]):
             self.role.create()
             self.binding.create()
 
+        def move(self, pod: Pod, old_namespace: str) -> None:
+            """Follow `pod`, that has been moved from `old_namespace`."""
+            if self.role.namespace is None:
+                # Cluster wide, but named after the pod's namespace.
+                self.role.name = self.role.name.replace(old_namespace, pod.namespace, 1)
+                self.binding.name = self.binding.name.replace(old_namespace, pod.namespace, 1)
+            else:
+                self.role.with_namespace(pod.namespace)
+                self.binding.with_namespace(pod.namespace)
+            if self.binding._manifest is not None:
+                self.binding.manifest.role_ref.name = self.role.name
+            for subject in self.binding.subjects:
+                if subject.kind == "ServiceAccount" and subject.namespace == old_namespace:
+                    subject.namespace = pod.namespace
+
         def destroy(self) -> None:
             self.binding.destroy()
             self.role.destroy()
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
+        DECLARED_PODS.add(self)
         self.wait_for_condition = "Ready"
         self.timeout = 60
+        self.retryable_reasons = RETRYABLE_REASONS
         self.services = {}
+        self.log_collector: LogCollector | None = None
         self._service_account = None
         self._rbac = None
         self._cluster_rbac = None
@@ -109,87 +188,226 @@ class Pod(Manifest[V1Pod]):
         self.metadata.labels.setdefault(APP_LABEL, self.name)
         return V1Pod(
             metadata=self.metadata,
-            spec=V1PodSpec(containers=[]),
+            spec=V1PodSpec(containers=[], local_vars_configuration=MODEL_CONFIGURATION),
+            local_vars_configuration=MODEL_CONFIGURATION,
         )
 
     def _get_manifest(self) -> V1Pod:
-        return CoreV1Api(self.client).read_namespaced_pod(self.name, self.namespace)
+        return self.core_api.read_namespaced_pod(self.name, self.namespace)
 
     def _create(self) -> V1Pod:
-        return CoreV1Api(self.client).create_namespaced_pod(self.namespace, self.manifest)
+        return self.core_api.create_namespaced_pod(self.namespace, self.manifest)
 
     def _delete(self) -> None:
-        CoreV1Api(self.client).delete_namespaced_pod(namespace=self.namespace, name=self.name)
+        self.core_api.delete_namespaced_pod(namespace=self.namespace, name=self.name)
 
     def create(self) -> Self:
-        self.create_auth()
-        super().create()
-        namespace = self.namespace
-        api = CoreV1Api(self.client)
-        w = Watch()
-        stream = w.stream(
-            api.list_namespaced_pod,
-            namespace=namespace,
-            field_selector=f"metadata.name={self.name}",
-            resource_version=self.manifest.metadata.resource_version,
-            timeout_seconds=self.timeout,
+        with TRACER.span("provision", self):
+            self.create_auth()
+            super().create()
+            self._capture_logs()
+            try:
+                self.wait_until_ready()
+            except Exception:
+                # Don't leave a broken pod behind to be adopted.
+                self.reuse = False
+                self.destroy()
+                raise
+
+            self._provision_services()
+            return self.refresh()
+
+    def apply(self) -> Self:
+        with TRACER.span("provision", self):
+            self.create_auth(apply=True)
+            super().apply()
+            self._capture_logs()
+            self.wait_until_ready()
+            self._provision_services(apply=True)
+            return self.refresh()
+
+    async def create_async(self) -> Self:
+        with TRACER.span("provision", self):
+            await asyncio.to_thread(self.create_auth)
+            await asyncio.to_thread(super().create)
+            self._capture_logs()
+            try:
+                await self.wait_until_ready_async()
+            except Exception:
+                self.reuse = False
+                await asyncio.to_thread(self.destroy)
+                raise
+
+            await asyncio.to_thread(self._provision_services)
+            return await self.refresh_async()
+
+    async def apply_async(self) -> Self:
+        with TRACER.span("provision", self):
+            await asyncio.to_thread(self.create_auth, apply=True)
+            await asyncio.to_thread(super().apply)
+            self._capture_logs()
+            await self.wait_until_ready_async()
+            await asyncio.to_thread(self._provision_services, apply=True)
+            return await self.refresh_async()
+
+    def _capture_logs(self) -> None:
+        if self.log_collector is not None:
+            self.log_collector.watch(self)
+
+    def wait_until_ready(self) -> None:
+        """Wait for the pod to reach `wait_for_condition`.
+
+        Raises `PodFailedError` as soon as the pod is in a state it won't recover from by itself
+        (see `TERMINAL_REASONS`), unless that state is in `retryable_reasons`. Raises `TimeoutError`
+        if the pod isn't ready within `timeout` seconds. Either error includes the pod conditions,
+        events and container logs.
+        """
+        if self._is_ready():
+            return
+
+        try:
+            with TRACER.span("ready", self, condition=self.wait_for_condition):
+                if self.wait_until_condition(self.wait_for_condition, self.timeout):
+                    return
+        except PodFailedError as e:
+            raise self._not_ready(e) from None
+        raise self._not_ready()
+
+    async def wait_until_ready_async(self) -> None:
+        """Same as `wait_until_ready`, without tying up a thread while waiting."""
+        if self._is_ready():
+            return
+
+        try:
+            with TRACER.span("ready", self, condition=self.wait_for_condition):
+                if await self.wait_until_condition_async(self.wait_for_condition, self.timeout):
+                    return
+        except PodFailedError as e:
+            raise await asyncio.to_thread(self._not_ready, e) from None
+        raise await asyncio.to_thread(self._not_ready)
+
+    def _is_ready(self) -> bool:
+        status = self.manifest.status
+        return bool(status) and any(
+            c.type == self.wait_for_condition and c.status == "True"
+            for c in status.conditions or []
         )
 
-        if self.wait_until_condition(stream, self.wait_for_condition):
-            w.stop()
-            for svc in self.services.values():
-                svc.create()
-        else:
+    def _not_ready(self, error: PodFailedError | None = None) -> Exception:
+        if error is not None:
+            return PodFailedError(
+                error.reason, f"{self.namespace}/{self.name}: {error}", self.diagnostics()
+            )
+        return TimeoutError(
+            f"{self.namespace}/{self.name}: timeout waiting for pod to become "
+            f"{self.wait_for_condition}\n{self.diagnostics()}"
+        )
+
+    def diagnostics(self) -> str:
+        """Current pod phase, conditions, events and the tail of the container logs."""
+        pod_status = self.refresh().manifest.status
+
+        # Collect conditions
+        cond_lines = []
+        for cond in sorted(
+            pod_status.conditions or [],
+            key=lambda c: c.last_transition_time or "",
+        ):
+            cond_lines.append(
+                f"- {cond.type} = {cond.status} @ {cond.last_transition_time} "
+                f"(reason: {cond.reason}, message: {cond.message})"
+            )
+
+        # Collect events
+        try:
+            event_lines = [
+                f"- {event.type} {event.reason}: {event.message} (x{event.count or 1})"
+                for event in self.get_events()
+            ]
+        except Exception as e:
+            event_lines = [f"- unavailable: {e}"]
+
+        # Collect logs from all containers (if possible)
+        log_lines = []
+        for container in self.manifest.spec.containers:
             try:
-                pod_status = self.refresh().manifest.status
-                pod_name = self.name
-
-                # Collect conditions
-                cond_lines = []
-                for cond in sorted(
-                    pod_status.conditions or [],
-                    key=lambda c: c.last_transition_time or "",
-                ):
-                    cond_lines.append(
-                        f"- {cond.type} = {cond.status} @ {cond.last_transition_time} "
-                        f"(reason: {cond.reason}, message: {cond.message})"
-                    )
-
-                # Collect logs from all containers (if possible)
-                log_lines = []
-                for container in self.manifest.spec.containers:
-                    try:
-                        logs = self.get_logs(container.name, tail_lines=20)
-                        log_lines.append(f"--- Logs from container '{container.name}' ---\n{logs}")
-                    except Exception as e:
-                        log_lines.append(
-                            f"--- Logs from container '{container.name}' unavailable: {e} ---"
-                        )
-
-                raise TimeoutError(
-                    f"{namespace}/{pod_name}: timeout waiting for pod to become {self.wait_for_condition}\n"
-                    f"Pod phase: {pod_status.phase}\n"
-                    f"Conditions:\n" + "\n".join(cond_lines) + "\n\n" + "\n\n".join(log_lines)
-                )
-            finally:
-                self.destroy()
-                # no return
+                logs = self.get_logs(container.name, tail_lines=20)
+                log_lines.append(f"--- Logs from container '{container.name}' ---\n{logs}")
+            except Exception as e:
+                log_lines.append(f"--- Logs from container '{container.name}' unavailable: {e} ---")
+
+        return (
+            f"Pod phase: {pod_status.phase}\n"
+            "Conditions:\n" + "\n".join(cond_lines) + "\n"
+            "Events:\n" + "\n".join(event_lines) + "\n\n" + "\n\n".join(log_lines)
+        )
 
-        return self.refresh()
+    def get_events(self) -> list[CoreV1Event]:
+        """Events for this pod, oldest first."""
+        events = self.core_api.list_namespaced_event(
+            self.namespace,
+            field_selector=f"involvedObject.kind=Pod,involvedObject.name={self.name}",
+        ).items
+        return sorted(
+            events, key=lambda e: e.last_timestamp or e.event_time or e.metadata.creation_timestamp
+        )
 
     def destroy(self):
+        FORWARDER.close_pod(self.namespace, self.name)
         for svc in self.services.values():
             svc.destroy()
         super().destroy()
         self.destroy_auth()
 
-    def create_auth(self) -> None:
-        if self._service_account is not None:
-            self.service_account.create()
-        if self._rbac is not None:
-            self.rbac.create()
-        if self._cluster_rbac is not None:
-            self.cluster_rbac.create()
+    def depends_on(self, other: Manifest) -> bool:
+        account = self.manifest.spec.service_account_name
+        if isinstance(other, ServiceAccount):
+            return other.namespace == self.namespace and other.name == account
+        if isinstance(other, RoleBindingBase):
+            return any(
+                subject.kind == ServiceAccount.__name__
+                and subject.name == account
+                and subject.namespace == self.namespace
+                for subject in other.subjects
+            )
+        if isinstance(other, ConfigMap):
+            return other.namespace == self.namespace
+        return super().depends_on(other)
+
+    def _provision_services(self, apply: bool = False) -> None:
+        if not self.services:
+            return
+        with TRACER.span("services", self):
+            for svc in self.services.values():
+                svc.reuse = self.reuse
+                if apply:
+                    svc.apply()
+                else:
+                    svc.create()
+
+    def provisioned_resources(self) -> list[Manifest]:
+        return [*self._auth_resources(), self, *self.services.values()]
+
+    def _auth_resources(self) -> list[Manifest]:
+        resources = [] if self._service_account is None else [self._service_account]
+        for rbac in (self._rbac, self._cluster_rbac):
+            if rbac is not None:
+                resources.extend((rbac.role, rbac.binding))
+        return resources
+
+    def create_auth(self, apply: bool = False) -> None:
+        resources = self._auth_resources()
+        if not resources:
+            return
+        with TRACER.span("rbac", self):
+            # In dependency order, on this thread: these few requests don't merit a pool of their
+            # own, nested within the one of the session creating this pod.
+            for resource in resources:
+                resource.reuse = self.reuse
+                if apply:
+                    resource.apply()
+                else:
+                    resource.create()
 
     def destroy_auth(self) -> None:
         if self._rbac is not None:
@@ -199,26 +417,127 @@ class Pod(Manifest[V1Pod]):
         if self._service_account is not None:
             self.service_account.destroy()
 
-    def wait_until_condition(self, stream, type: str):
-        condition_met = False
-        for event in stream:
-            pod = event["object"]
-            phase = pod.status.phase
-            print(f"→ [{self}] Pod phase: {phase}")
-            conditions = pod.status.conditions or []
-            sorted_conditions = sorted(
-                (c for c in conditions if c.status == "True"),
-                key=lambda c: (c.last_transition_time or "", -len(c.type)),
+    def wait_until_condition(self, type: str, timeout: float | None = None) -> bool:
+        """Wait for the pod condition `type` to become true, using the namespace pod informer.
+
+        When tracing, each condition is recorded as a span from the start of the wait until it was
+        first seen to be true.
+        """
+        informer = INFORMERS.get(self.core_api, self.namespace)
+        with self._recording_conditions() as seen:
+            pod = informer.wait_for(self.name, self._condition_predicate(type, seen), timeout)
+        return self._observed(pod)
+
+    async def wait_until_condition_async(self, type: str, timeout: float | None = None) -> bool:
+        """Same as `wait_until_condition`, without tying up a thread while waiting."""
+        informer = INFORMERS.get(self.core_api, self.namespace)
+        with self._recording_conditions() as seen:
+            pod = await informer.wait_for_async(
+                self.name, self._condition_predicate(type, seen), timeout
             )
-            for cond in sorted_conditions:
-                message = f": {cond.message}" if cond.message else ""
-                print(f"  ✓ {cond.type}{': ' if message else ''}{message}")
-                condition_met |= cond.type == type
+        return self._observed(pod)
 
-            if condition_met:
-                return True
+    @contextmanager
+    def _recording_conditions(self) -> Iterator[dict[str, int]]:
+        started = time.time_ns()
+        seen: dict[str, int] = {}
+        try:
+            yield seen
+        finally:
+            parent = current_span.get()
+            for condition, observed in seen.items():
+                TRACER.record(condition, self, started, observed, parent)
+
+    def _condition_predicate(self, type: str, seen: dict[str, int]) -> Predicate:
+        return partial(self._condition_met, type, self.manifest.metadata.uid, seen)
+
+    def _observed(self, pod: V1Pod | None) -> bool:
+        if pod is None:
+            return False
+        self._manifest = pod
+        return True
+
+    def _condition_met(
+        self, type: str, uid: str | None, seen: dict[str, int], pod: V1Pod | None
+    ) -> bool:
+        # Ignore any previous pod by the same name.
+        if pod is None or (uid is not None and pod.metadata.uid != uid):
+            return False
 
-        return False
+        condition_met = False
+        phase = pod.status.phase
+        print(f"→ [{self}] Pod phase: {phase}")
+        conditions = pod.status.conditions or []
+        sorted_conditions = sorted(
+            (c for c in conditions if c.status == "True"),
+            key=lambda c: (c.last_transition_time or "", -len(c.type)),
+        )
+        for cond in sorted_conditions:
+            seen.setdefault(cond.type, time.time_ns())
+            message = f": {cond.message}" if cond.message else ""
+            print(f"  ✓ {cond.type}{': ' if message else ''}{message}")
+            condition_met |= cond.type == type
+        if not condition_met:
+            self.check_failed(pod)
+        return condition_met
+
+    def check_failed(self, pod: V1Pod) -> None:
+        """Raise `PodFailedError` if `pod` is in a terminal state that is not retryable.
+
+        A pod that is done running, in phase `Failed` or `Succeeded`, never becomes ready and
+        always fails, as does a container that exited with an error and won't be restarted.
+        """
+        failures = []
+        status = pod.status
+        # Containers are restarted unless the policy says otherwise, as it defaults to `Always`.
+        restarted = pod.spec is None or pod.spec.restart_policy != "Never"
+        for cond in status.conditions or []:
+            if cond.type == "PodScheduled" and cond.status == "False":
+                failures.append((cond.reason, cond.message, cond.reason in TERMINAL_REASONS))
+        for container in (status.init_container_statuses or []) + (status.container_statuses or []):
+            # The last state is history, e.g. a container that has since recovered, so only adds
+            # to the current one, such as why a container in `CrashLoopBackOff` keeps crashing.
+            state, last = container.state, container.last_state
+            last_terminated = last and last.terminated
+            for detail in (state and state.waiting, state and state.terminated):
+                if detail is None:
+                    continue
+                exit_code = getattr(detail, "exit_code", None)
+                if not (reason := detail.reason or ("Error" if exit_code else None)):
+                    continue
+                message = f"container {container.name!r}: {detail.message or ''}".rstrip(": ")
+                if exit_code:
+                    message += f", exit code {exit_code}"
+                if last_terminated is not None and last_terminated.reason:
+                    message += f", last terminated with {last_terminated.reason}"
+                terminal = reason in TERMINAL_REASONS or bool(exit_code and not restarted)
+                failures.append((reason, message, terminal))
+
+        if status.phase in ("Failed", "Succeeded"):
+            # Done running, so never to become ready, whatever the reason.
+            reason = status.reason or next(
+                (reason for reason, _, terminal in failures if terminal), status.phase
+            )
+            summary = f"pod {status.phase.lower()}"
+            if reason != status.phase:
+                summary += f" with {reason}"
+            details = "; ".join(filter(None, [status.message, *(m for _, m, _ in failures)]))
+            raise PodFailedError(reason, f"{summary}: {details}".rstrip(": "))
+        for reason, message, terminal in failures:
+            if terminal and reason not in self.retryable_reasons:
+                raise PodFailedError(reason, f"pod failed with {reason}: {message}".rstrip(": "))
+
+    def with_namespace(self, namespace: str) -> Self:
+        old_namespace = self.namespace
+        super().with_namespace(namespace)
+        for service in self.services.values():
+            service.with_namespace(namespace)
+        if self._service_account is not None:
+            self._service_account.with_namespace(namespace)
+        for rbac in (self._rbac, self._cluster_rbac):
+            if rbac is not None:
+                rbac.move(self, old_namespace)
+        return self
 
     def create_services(self, container: V1Container) -> Self:
         for port in container.ports:
@@ -298,18 +617,30 @@ class Pod(Manifest[V1Pod]):
         return V1Container(
             args=container._command,
             command=container._kwargs.get("entrypoint"),
-            env=[V1EnvVar(name=name, value=value) for name, value in container.env.items()],
+            env=[
+                V1EnvVar(name=name, value=value, local_vars_configuration=MODEL_CONFIGURATION)
+                for name, value in container.env.items()
+            ],
             image=container.image,
             name=container._name or f"{self.name}-{len(self.manifest.spec.containers)}",
             ports=[
-                V1ContainerPort(host_port=h_port, **parse_port_mapping(c_port))
+                V1ContainerPort(
+                    host_port=h_port,
+                    local_vars_configuration=MODEL_CONFIGURATION,
+                    **parse_port_mapping(c_port),
+                )
                 for c_port, h_port in container.ports.items()
             ],
             working_dir=container._kwargs.get("working_dir"),
+            local_vars_configuration=MODEL_CONFIGURATION,
         )
 
     def get_logs(self, container: str | None = None, tail_lines: int | None = None) -> str:
-        api = CoreV1Api(self.client)
+        if tail_lines is not None and self.log_collector is not None:
+            # Read from the local capture, when there is one.
+            if (tail := self.log_collector.tail(self, container, tail_lines)) is not None:
+                return tail
+        api = self.core_api
         return api.read_namespaced_pod_log(
             name=self.name,
             namespace=self.namespace,
@@ -317,35 +648,86 @@ class Pod(Manifest[V1Pod]):
             tail_lines=tail_lines,
         ).strip()
 
-    def missing_logs(self, opts):
-        pattern = opts["args"][0]
-        print(f"{self}: missing log pattern {pattern.pattern!r}")
+    def missing_logs(self, patterns: list[re.Pattern]) -> None:
+        for pattern in patterns:
+            print(f"{self}: missing log pattern {pattern.pattern!r}")
 
     def await_logs(
         self,
-        log_pattern: str,
+        log_pattern: LogPatterns,
         container: str | None = None,
         max_time=30,
         max_value=5,
+        *,
+        count: int = 1,
+        since_seconds: int | None = None,
+        window: int = DEFAULT_WINDOW,
         **backoff_opts,
     ):
-        @backoff.on_predicate(
-            backoff.fibo,
-            on_giveup=self.missing_logs,
-            max_time=max_time,
-            max_value=max_value,
-            **backoff_opts,
-        )
-        def check_logs(pattern):
+        """Wait for `log_pattern` to show up in the container log.
+
+        The log is followed as it is written, and this returns as soon as there is a match, or None
+        when there is none within `max_time` seconds. `max_value` caps the delay between reconnects.
+
+        Wait for several patterns at once by passing a list of them, or a mapping of pattern to the
+        number of matches to wait for (`count` for a list). The result is then a dict of pattern to
+        its matches, rather than the `count`-th match.
+
+        Any other `backoff_opts`, from when the log was polled with `backoff`, are deprecated and
+        ignored.
+        """
+        if backoff_opts:
+            warnings.warn(
+                f"await_logs follows the log rather than polling it, ignoring "
+                f"{', '.join(sorted(backoff_opts))}; use max_time and max_value instead",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        patterns = compile_patterns(log_pattern, count)
+        matcher = LogMatcher(patterns, window)
+        for pattern in patterns:
             print(f"{self}: awaiting log pattern {pattern.pattern!r}")
-            return pattern.search(self.get_logs(container), re.MULTILINE)
+        for line in follow_log(
+            self.core_api,
+            self.namespace,
+            self.name,
+            container,
+            since_seconds=since_seconds,
+            timeout=max_time,
+            max_delay=max_value,
+        ):
+            if matcher.feed(line):
+                break
+        else:
+            self.missing_logs(matcher.missing())
+            return None
+
+        if isinstance(log_pattern, (str, re.Pattern)):
+            return matcher.matches[next(iter(patterns))][-1]
+        return {pattern.pattern: matches for pattern, matches in matcher.matches.items()}
+
+    async def await_logs_async(
+        self,
+        log_pattern: LogPatterns,
+        container: str | None = None,
+        max_time=30,
+        max_value=5,
+        **kwargs,
+    ):
+        return await asyncio.to_thread(
+            self.await_logs, log_pattern, container, max_time, max_value, **kwargs
+        )
 
-        return check_logs(re.compile(log_pattern))
+    @property
+    def images(self) -> list[str]:
+        """Images used by the (init) containers of this pod."""
+        spec = self.manifest.spec
+        return [c.image for c in (spec.init_containers or []) + spec.containers if c.image]
 
     def preload_images(self, loader: ImageLoader | None) -> Self:
         if loader is not None:
-            for container in self.manifest.spec.containers:
-                loader.load_image(container.image)
+            with TRACER.span("images", self):
+                loader.load_images(self.images)
         return self
 
     def get_port(self, name: str) -> V1ServicePort:
@@ -364,6 +746,11 @@ class Pod(Manifest[V1Pod]):
         self.cluster_rbac.role.with_rule(**policy)
         return self
 
+    def with_retryable_reasons(self, *reasons: str) -> Self:
+        """Keep waiting for the pod to get ready when failing for any of `reasons`."""
+        self.retryable_reasons = self.retryable_reasons | set(reasons)
+        return self
+
     def with_post_start_command(self, container_name: str, *command: str) -> Self:
         for container in self.manifest.spec.containers:
             if container.name != container_name:
@@ -380,28 +767,31 @@ class Pod(Manifest[V1Pod]):
             )
         return self
 
-    @contextmanager
-    def port_forward(self, service_name: str) -> int:
-        port = self.get_port(service_name).port
-        proc = subprocess.Popen(
-            ["kubectl", "port-forward", "-n", self.namespace, f"service/{service_name}", str(port)]
+    def forward_port(self, service_name: str) -> int:
+        """Local port forwarded to the pod port behind service port `service_name`.
+
+        The forward is set up in process on first use, and kept until the pod is destroyed.
+        """
+        return FORWARDER.forward(
+            self.core_api.api_client, self.namespace, self.name, self.get_target_port(service_name)
         )
-        try:
-            self.await_serverport(port)
-            yield port
-        finally:
-            proc.terminate()
 
-    @staticmethod
-    @backoff.on_predicate(backoff.fibo, max_time=10)
-    def await_serverport(port: int, host: str = "127.0.0.1") -> bool:
-        addr_info_list = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
-        for family, socktype, proto, _canonname, sockaddr in addr_info_list:
-            try:
-                with socket.socket(family, socktype, proto) as sock:
-                    sock.settimeout(1)
-                    if sock.connect_ex(sockaddr) == 0:
-                        return True
-            except Exception:
-                continue
-        return False
+    def get_target_port(self, service_name: str) -> int:
+        """The pod port that service port `service_name` targets."""
+        port = self.get_port(service_name)
+        target = port.port if port.target_port is None else port.target_port
+        if isinstance(target, int) or target.isdigit():
+            return int(target)
+        for container in self.manifest.spec.containers:
+            for container_port in container.ports or []:
+                if container_port.name == target:
+                    return container_port.container_port
+        raise ValueError(f"{self.namespace}/{self.name}: no container port named {target!r}")
+
+    @contextmanager
+    def port_forward(self, service_name: str) -> Iterator[int]:
+        yield self.forward_port(service_name)
+
+    @asynccontextmanager
+    async def port_forward_async(self, service_name: str) -> AsyncIterator[int]:
+        yield self.forward_port(service_name)
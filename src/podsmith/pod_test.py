@@ -2,10 +2,24 @@
 # This software is licensed under the MIT License.
 # See the LICENSE file for details.
 
-from kubernetes.client import V1Container, V1ObjectMeta, V1Pod, V1PodSpec
+import pytest
+from kubernetes.client import (
+    V1Container,
+    V1ContainerPort,
+    V1ContainerState,
+    V1ContainerStateRunning,
+    V1ContainerStateTerminated,
+    V1ContainerStateWaiting,
+    V1ContainerStatus,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodCondition,
+    V1PodSpec,
+    V1PodStatus,
+)
 from testcontainers.mongodb import MongoDbContainer
 
-from .pod import Pod
+from .pod import Pod, PodFailedError
 
 
 def test_kube_pod(podsmith_cluster):
@@ -28,3 +42,193 @@ def test_kube_pod_from_testcontainer(podsmith_cluster):
     mongo = MongoDbContainer("mongo:7.0.12")
     with Pod("mongo", namespace="test2").with_testcontainer(mongo) as pod:
         assert pod.manifest.status.phase == "Running"
+
+
+def container_status(state: V1ContainerState, last_state: V1ContainerState | None = None):
+    return V1ContainerStatus(
+        name="app",
+        image="app",
+        image_id="",
+        ready=False,
+        restart_count=1,
+        state=state,
+        last_state=last_state,
+    )
+
+
+@pytest.mark.parametrize(
+    "status, reason",
+    [
+        (
+            V1PodStatus(
+                phase="Pending",
+                container_statuses=[
+                    container_status(
+                        V1ContainerState(waiting=V1ContainerStateWaiting(reason="ErrImagePull"))
+                    )
+                ],
+            ),
+            "ErrImagePull",
+        ),
+        (
+            V1PodStatus(
+                phase="Running",
+                container_statuses=[
+                    container_status(
+                        V1ContainerState(
+                            waiting=V1ContainerStateWaiting(reason="CrashLoopBackOff")
+                        ),
+                        V1ContainerState(
+                            terminated=V1ContainerStateTerminated(exit_code=137, reason="OOMKilled")
+                        ),
+                    )
+                ],
+            ),
+            "CrashLoopBackOff",
+        ),
+    ],
+)
+def test_check_failed(status, reason):
+    pod = Pod("app", namespace="test")
+    with pytest.raises(PodFailedError) as exc_info:
+        pod.check_failed(V1Pod(status=status))
+    assert exc_info.value.reason == reason
+
+    pod.with_retryable_reasons("ErrImagePull", "CrashLoopBackOff", "OOMKilled")
+    pod.check_failed(V1Pod(status=status))
+
+
+def test_check_failed_reports_last_state_of_crashing_container():
+    status = V1PodStatus(
+        phase="Running",
+        container_statuses=[
+            container_status(
+                V1ContainerState(waiting=V1ContainerStateWaiting(reason="CrashLoopBackOff")),
+                V1ContainerState(
+                    terminated=V1ContainerStateTerminated(exit_code=137, reason="OOMKilled")
+                ),
+            )
+        ],
+    )
+    with pytest.raises(PodFailedError, match="last terminated with OOMKilled"):
+        Pod("app", namespace="test").check_failed(V1Pod(status=status))
+
+
+def test_check_failed_ignores_recovered_container():
+    status = V1PodStatus(
+        phase="Running",
+        container_statuses=[
+            container_status(
+                V1ContainerState(running=V1ContainerStateRunning()),
+                V1ContainerState(
+                    terminated=V1ContainerStateTerminated(exit_code=137, reason="OOMKilled")
+                ),
+            )
+        ],
+    )
+    Pod("app", namespace="test").check_failed(V1Pod(status=status))
+
+
+def test_check_failed_waits_on_unschedulable_by_default():
+    status = V1PodStatus(
+        phase="Pending",
+        conditions=[V1PodCondition(type="PodScheduled", status="False", reason="Unschedulable")],
+    )
+    pod = Pod("app", namespace="test")
+    pod.check_failed(V1Pod(status=status))
+
+    pod.retryable_reasons = frozenset()
+    with pytest.raises(PodFailedError) as exc_info:
+        pod.check_failed(V1Pod(status=status))
+    assert exc_info.value.reason == "Unschedulable"
+
+
+def test_check_failed_ignores_starting_pod():
+    status = V1PodStatus(
+        phase="Pending",
+        container_statuses=[
+            container_status(
+                V1ContainerState(waiting=V1ContainerStateWaiting(reason="ContainerCreating"))
+            )
+        ],
+    )
+    Pod("app", namespace="test").check_failed(V1Pod(status=status))
+
+
+@pytest.mark.parametrize("phase, reason", [("Failed", "Failed"), ("Succeeded", "Succeeded")])
+def test_check_failed_on_finished_pod(phase, reason):
+    pod = Pod("app", namespace="test").with_retryable_reasons("Failed", "Succeeded")
+    with pytest.raises(PodFailedError, match=f"pod {phase.lower()}") as exc_info:
+        pod.check_failed(V1Pod(status=V1PodStatus(phase=phase)))
+    assert exc_info.value.reason == reason
+
+
+def test_check_failed_on_error_exit_without_restart():
+    status = V1PodStatus(
+        phase="Running",
+        container_statuses=[
+            container_status(
+                V1ContainerState(terminated=V1ContainerStateTerminated(exit_code=1, reason="Error"))
+            )
+        ],
+    )
+    never = V1PodSpec(containers=[], restart_policy="Never")
+    with pytest.raises(PodFailedError, match="exit code 1") as exc_info:
+        Pod("app", namespace="test").check_failed(V1Pod(spec=never, status=status))
+    assert exc_info.value.reason == "Error"
+
+    # Restarted, only failing once in `CrashLoopBackOff`.
+    always = V1PodSpec(containers=[], restart_policy="Always")
+    Pod("app", namespace="test").check_failed(V1Pod(spec=always, status=status))
+
+
+def test_check_failed_reports_container_of_failed_pod():
+    status = V1PodStatus(
+        phase="Failed",
+        container_statuses=[
+            container_status(V1ContainerState(terminated=V1ContainerStateTerminated(exit_code=2)))
+        ],
+    )
+    never = V1PodSpec(containers=[], restart_policy="Never")
+    with pytest.raises(PodFailedError, match="pod failed with Error: container 'app'") as exc_info:
+        Pod("app", namespace="test").check_failed(V1Pod(spec=never, status=status))
+    assert exc_info.value.reason == "Error"
+
+
+def test_await_logs_deprecates_backoff_options(memory_backend):
+    with pytest.warns(DeprecationWarning, match="ignoring jitter, max_tries"):
+        assert (
+            Pod("app", namespace="test").await_logs("ready", max_time=0.2, max_tries=3, jitter=None)
+            is None
+        )
+
+
+def test_pod_provisions_auth_and_services_in_order(memory_backend):
+    pod = (
+        Pod("web", "pod-test")
+        .with_container(
+            V1Container(
+                name="app", image="nginx", ports=[V1ContainerPort(container_port=80, name="http")]
+            )
+        )
+        .with_auth_rule(api_groups=[""], resources=["pods"], verbs=["get"])
+        .with_auth_cluster_rule(api_groups=[""], resources=["nodes"], verbs=["list"])
+    )
+    with pod:
+        resources = pod.provisioned_resources()
+        assert [resource.kind for resource in resources] == [
+            "ServiceAccount",
+            "Role",
+            "RoleBinding",
+            "ClusterRole",
+            "ClusterRoleBinding",
+            "Pod",
+            "Service",
+        ]
+        # Created in dependency order, from the uid given by the fake cluster.
+        objects = [
+            memory_backend.cluster.get(resource.plural, resource.namespace, resource.name)
+            for resource in resources
+        ]
+        order = [int(obj["metadata"]["uid"].removeprefix("uid-")) for obj in objects]
+        assert order == sorted(order)
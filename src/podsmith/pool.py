@@ -0,0 +1,220 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from .manifest import copy_model, random_text
+from .pod import Pod
+from .service import APP_LABEL, Service
+
+DEFAULT_POOL_SIZE = int(os.getenv("PODSMITH_WARM_PODS", "2"))
+ResetHook = Callable[[Pod], object]
+
+
+class _Slot:
+    """Replicas of one pod template."""
+
+    def __init__(self, template: Pod) -> None:
+        self.template = template
+        self.cond = threading.Condition()
+        self.ready: deque[Pod] = deque()
+        self.replicas: set[Pod] = set()
+        self.starting = 0
+        self.leased = 0
+        self.error: BaseException | None = None
+        # Set once the namespace and auth resources of the template are set up, or failed to be.
+        self.set_up = threading.Event()
+        self.setup_error: BaseException | None = None
+
+
+class PodPool:
+    """Pre-warmed pods, leased out to tests one at a time.
+
+    Pods are pooled per spec hash, keeping `size` replicas of each pod template around. A leased pod
+    is returned to the pool after running the `reset` hook given to `lease()`. Without a reset hook,
+    or if it fails, the pod is deleted instead and a fresh replica is started in the background.
+
+    Replicas are named after the template with a random suffix, as are any services they have. The
+    services are still looked up by their original name, so `pod.port_forward("redis")` works the
+    same for a leased pod as for the template it was made from.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_workers: int | None = None) -> None:
+        assert size > 0
+        self.size = size
+        self._lock = threading.Lock()
+        self._slots: dict[str, _Slot] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers or 2 * size, thread_name_prefix="podsmith-pool"
+        )
+        self._closed = False
+
+    def __enter__(self) -> PodPool:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @contextmanager
+    def lease(
+        self, template: Pod, reset: ResetHook | None = None, timeout: float | None = None
+    ) -> Iterator[Pod]:
+        """Lease a ready replica of `template` for the duration of the context.
+
+        Waits at most `timeout` seconds for a replica to become available.
+        """
+        slot = self._slot(template)
+        pod = self._take(slot, timeout)
+        try:
+            yield pod
+        finally:
+            self._release(slot, pod, reset)
+
+    def warm(self, *templates: Pod) -> None:
+        """Start replicas for `templates` ahead of the first lease."""
+        for template in templates:
+            self._slot(template)
+
+    def close(self) -> None:
+        """Delete all replicas, along with the auth resources and namespaces of the templates."""
+        with self._lock:
+            self._closed = True
+            slots = list(self._slots.values())
+            self._slots.clear()
+        for slot in slots:
+            slot.set_up.wait()
+        # Let pending replicas finish starting, so nothing is left behind.
+        self._executor.shutdown(wait=True)
+        with ThreadPoolExecutor(2 * self.size, thread_name_prefix="podsmith-pool") as executor:
+            wait([executor.submit(pod.destroy) for slot in slots for pod in slot.replicas])
+        for slot in slots:
+            if slot.setup_error is None:
+                self._tear_down(slot.template)
+
+    def _slot(self, template: Pod) -> _Slot:
+        key = template.spec_hash()
+        with self._lock:
+            assert not self._closed, "pod pool is closed"
+            if (slot := self._slots.get(key)) is None:
+                slot = self._slots[key] = _Slot(template)
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            slot.set_up.wait()
+            if slot.setup_error is not None:
+                raise slot.setup_error
+            return slot
+
+        # Set up outside of the pool lock, so other templates and releases aren't held up by it.
+        try:
+            # The replicas share the namespace and service account of the template.
+            template.ensure_namespace(template.core_api)
+            template.create_auth()
+        except BaseException as e:
+            with self._lock:
+                if self._slots.get(key) is slot:
+                    del self._slots[key]
+            slot.setup_error = e
+            slot.set_up.set()
+            self._tear_down(template)
+            raise
+
+        with self._lock:
+            if not self._closed:
+                for _ in range(self.size):
+                    self._start(slot)
+        slot.set_up.set()
+        return slot
+
+    @staticmethod
+    def _tear_down(template: Pod) -> None:
+        template.destroy_auth()
+        if template.created_namespace:
+            template.destroy_namespace()
+
+    def _start(self, slot: _Slot) -> None:
+        with slot.cond:
+            slot.starting += 1
+            slot.error = None
+        self._executor.submit(self._warm_up, slot, self._replica(slot.template))
+
+    def _warm_up(self, slot: _Slot, pod: Pod) -> None:
+        try:
+            pod.__enter__()
+        except Exception as e:
+            with slot.cond:
+                slot.starting -= 1
+                slot.error = e
+                slot.cond.notify_all()
+            return
+
+        with slot.cond:
+            slot.starting -= 1
+            slot.replicas.add(pod)
+            slot.ready.append(pod)
+            slot.cond.notify()
+
+    def _take(self, slot: _Slot, timeout: float | None) -> Pod:
+        with slot.cond:
+            missing = self.size - len(slot.ready) - slot.starting - slot.leased
+        # Replace replicas that failed to start.
+        for _ in range(missing):
+            self._start(slot)
+
+        with slot.cond:
+            if not slot.cond.wait_for(
+                lambda: slot.ready or (slot.error is not None and not slot.starting), timeout
+            ):
+                raise TimeoutError(f"{slot.template}: no pod available from pool in time")
+            if not slot.ready:
+                raise slot.error
+            slot.leased += 1
+            return slot.ready.popleft()
+
+    def _release(self, slot: _Slot, pod: Pod, reset: ResetHook | None) -> None:
+        if reset is not None:
+            try:
+                reset(pod)
+            except Exception as e:
+                print(f"{pod}: reset failed, replacing pod: {e}")
+            else:
+                with slot.cond:
+                    slot.leased -= 1
+                    slot.ready.append(pod)
+                    slot.cond.notify()
+                return
+
+        with slot.cond:
+            slot.leased -= 1
+            slot.replicas.discard(pod)
+        with self._lock:
+            if self._closed:
+                pod.destroy()
+                return
+            self._executor.submit(pod.destroy)
+            self._start(slot)
+
+    def _replica(self, template: Pod) -> Pod:
+        suffix = random_text(5)
+        pod = Pod.from_pod(template.manifest, client=template.client)
+        pod.name = f"{template.name}-{suffix}"
+        pod.manifest.metadata.labels[APP_LABEL] = pod.name
+        pod.wait_for_condition = template.wait_for_condition
+        pod.timeout = template.timeout
+        pod.reuse = False
+        for key, svc in template.services.items():
+            replica_svc = Service(
+                pod, name=f"{svc.name}-{suffix}", client=svc.client, port_type=svc.port_type
+            )
+            replica_svc.manifest.spec.ports = copy_model(svc.manifest.spec.ports)
+            pod.services[key] = replica_svc
+        return pod
@@ -0,0 +1,127 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import threading
+
+import pytest
+from kubernetes.client import V1Container, V1ContainerPort
+
+from .memory import MemoryBackend
+from .pod import Pod
+from .pool import PodPool
+
+
+def web(namespace: str = "pool-test", image: str = "nginx") -> Pod:
+    return Pod("web", namespace).with_container(
+        V1Container(
+            name="app", image=image, ports=[V1ContainerPort(container_port=80, name="http")]
+        )
+    )
+
+
+def pod_names(backend: MemoryBackend, namespace: str = "pool-test") -> set[str]:
+    return {pod["metadata"]["name"] for pod in backend.cluster.objects("pods", namespace)}
+
+
+def test_lease_ready_replica(memory_backend):
+    with PodPool(size=2) as pool:
+        with pool.lease(web(), timeout=5) as pod:
+            assert pod.name.startswith("web-")
+            assert pod.manifest.status.phase == "Running"
+            assert pod.services["http"].name == f"http-{pod.name.removeprefix('web-')}"
+        assert memory_backend.cluster.calls["create", "namespaces"] == 1
+    assert memory_backend.cluster.objects("pods", "pool-test") == []
+
+
+def test_reset_returns_pod_to_pool(memory_backend):
+    reset = []
+    with PodPool(size=1) as pool:
+        template = web()
+        with pool.lease(template, reset=reset.append, timeout=5) as first:
+            pass
+        with pool.lease(template, reset=reset.append, timeout=5) as second:
+            assert second is first
+    assert reset == [first, first]
+    assert memory_backend.cluster.calls["create", "pods"] == 1
+
+
+def test_replace_pod_in_background(memory_backend):
+    with PodPool(size=1) as pool:
+        template = web()
+        with pool.lease(template, timeout=5) as first:
+            pass
+        with pool.lease(template, timeout=5) as second:
+            assert second.name != first.name
+            assert first.name not in pod_names(memory_backend)
+    # One more replacement for the second lease.
+    assert memory_backend.cluster.calls["create", "pods"] == 3
+
+
+def test_failed_reset_replaces_pod(memory_backend):
+    def reset(pod):
+        raise RuntimeError("dirty")
+
+    with PodPool(size=1) as pool:
+        template = web()
+        with pool.lease(template, reset=reset, timeout=5) as first:
+            pass
+        with pool.lease(template, timeout=5) as second:
+            assert second is not first
+
+
+def test_slot_per_template(memory_backend):
+    with PodPool(size=1) as pool:
+        pool.warm(web(), web(image="redis"), web())
+        with (
+            pool.lease(web(), timeout=5) as nginx,
+            pool.lease(web(image="redis"), timeout=5) as redis,
+        ):
+            assert nginx.manifest.spec.containers[0].image == "nginx"
+            assert redis.manifest.spec.containers[0].image == "redis"
+            assert memory_backend.cluster.calls["create", "pods"] == 2
+
+
+def test_close_deletes_replicas_and_namespace(memory_backend):
+    pool = PodPool(size=2)
+    pool.warm(web().with_auth_rule(api_groups=[""], resources=["pods"], verbs=["get"]))
+    with pool.lease(web(), timeout=5):
+        pass
+    pool.close()
+    assert memory_backend.cluster.objects("pods", "pool-test") == []
+    assert memory_backend.cluster.objects("serviceaccounts", "pool-test") == []
+    assert memory_backend.cluster.objects("namespaces") == []
+    with pytest.raises(AssertionError):
+        pool.warm(web())
+
+
+def test_failed_setup_is_retried(memory_backend, monkeypatch):
+    template = web()
+    monkeypatch.setattr(template, "create_auth", lambda: (_ for _ in ()).throw(OSError("down")))
+    with PodPool(size=1) as pool:
+        with pytest.raises(OSError):
+            pool.warm(template)
+        assert memory_backend.cluster.objects("namespaces") == []
+        monkeypatch.undo()
+        with pool.lease(template, timeout=5) as pod:
+            assert pod.manifest.status.phase == "Running"
+
+
+def test_setup_does_not_block_other_templates(memory_backend, monkeypatch):
+    blocked, release = threading.Event(), threading.Event()
+    slow = web("slow-pool-test")
+    ensure_namespace = slow.ensure_namespace
+
+    def wait_for_release(core_api):
+        blocked.set()
+        release.wait(5)
+        return ensure_namespace(core_api)
+
+    monkeypatch.setattr(slow, "ensure_namespace", wait_for_release)
+    with PodPool(size=1) as pool:
+        warming = threading.Thread(target=pool.warm, args=(slow,))
+        warming.start()
+        assert blocked.wait(5)
+        with pool.lease(web(), timeout=5) as pod:
+            assert pod.manifest.status.phase == "Running"
+        release.set()
+        warming.join()
@@ -0,0 +1,112 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterable
+
+import backoff
+from kubernetes.client import (
+    V1Container,
+    V1ContainerStatus,
+    V1Pod,
+    V1ResourceRequirements,
+    V1Toleration,
+)
+
+from .daemon_set import DaemonSet
+from .manifest import random_text
+from .pod import DECLARED_PODS
+from .tracing import TRACER
+
+PREPULL_NAMESPACE = os.getenv("PODSMITH_PREPULL_NAMESPACE", "podsmith-prepull")
+PREPULL_TIMEOUT = float(os.getenv("PODSMITH_PREPULL_TIMEOUT", "600"))
+PULL_FAILED_REASONS = frozenset(
+    {"ErrImagePull", "ImagePullBackOff", "InvalidImageName", "ErrImageNeverPull"}
+)
+
+
+def declared_images() -> list[str]:
+    """Images used by all pods declared so far."""
+    return list(dict.fromkeys(image for pod in list(DECLARED_PODS) for image in pod.images))
+
+
+def prepull_images(
+    images: Iterable[str],
+    namespace: str = PREPULL_NAMESPACE,
+    timeout: float = PREPULL_TIMEOUT,
+    **kwargs,
+) -> list[str]:
+    """Pull `images` on every node, so pods using them only wait for their containers to start.
+
+    Runs a daemon set with one container per image, which is removed once all of them have been
+    pulled on all nodes. The containers are not expected to do anything useful, so whether they
+    run or fail doesn't matter. This is best effort, images that fail to pull are returned rather
+    than raised for, leaving it to the pods using them to report the error.
+    """
+    images = list(dict.fromkeys(images))
+    if not images:
+        return []
+
+    started = time.monotonic()
+    print(f"pre-pulling {len(images)} images...")
+    daemon_set = DaemonSet(
+        f"podsmith-prepull-{random_text(4)}", namespace, **kwargs
+    ).with_containers(
+        *(
+            V1Container(
+                name=f"pull-{idx}",
+                image=image,
+                image_pull_policy="IfNotPresent",
+                command=["true"],
+                resources=V1ResourceRequirements(requests={"cpu": "1m", "memory": "1Mi"}),
+            )
+            for idx, image in enumerate(images)
+        )
+    )
+    daemon_set.with_pod_spec(
+        tolerations=[V1Toleration(operator="Exists")],
+        termination_grace_period_seconds=0,
+        automount_service_account_token=False,
+    )
+    failed: dict[str, str] = {}
+
+    @backoff.on_predicate(backoff.constant, interval=1, max_time=timeout, jitter=None)
+    def pulled() -> bool:
+        status = daemon_set.refresh().manifest.status
+        pods = daemon_set.get_pods()
+        if status is None or not pods or len(pods) < status.desired_number_scheduled:
+            return False
+        return all(_pulled(pod, failed) for pod in pods)
+
+    daemon_set.create()
+    try:
+        with TRACER.span("prepull", daemon_set, images=len(images)):
+            if not pulled():
+                raise TimeoutError(f"{daemon_set}: images not pulled after {timeout} seconds")
+    finally:
+        # Keep the namespace, so the next run doesn't race with it terminating.
+        daemon_set.created_namespace = False
+        daemon_set.destroy()
+
+    for image, reason in failed.items():
+        print(f"pre-pulling {image} failed: {reason}")
+    print(f"pre-pulled {len(images) - len(failed)} images in {time.monotonic() - started:.1f}s")
+    return list(failed)
+
+
+def _pulled(pod: V1Pod, failed: dict[str, str]) -> bool:
+    """Whether all images of `pod` are pulled, or have failed to pull, recording the failures."""
+    statuses: list[V1ContainerStatus] = pod.status.container_statuses or []
+    if len(statuses) < len(pod.spec.containers):
+        return False
+    done = True
+    for status in statuses:
+        waiting = status.state.waiting if status.state else None
+        if waiting is not None and waiting.reason in PULL_FAILED_REASONS:
+            failed.setdefault(status.image, f"{waiting.reason}: {waiting.message}")
+        elif not status.image_id:
+            done = False
+    return done
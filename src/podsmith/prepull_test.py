@@ -0,0 +1,62 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from kubernetes.client import (
+    V1Container,
+    V1ContainerState,
+    V1ContainerStateWaiting,
+    V1ContainerStatus,
+    V1Pod,
+    V1PodSpec,
+    V1PodStatus,
+)
+
+from .pod import Pod
+from .prepull import _pulled, declared_images
+
+
+def pull_status(image: str, image_id: str = "", reason: str | None = None) -> V1ContainerStatus:
+    waiting = V1ContainerStateWaiting(reason=reason) if reason else None
+    return V1ContainerStatus(
+        name=image,
+        image=image,
+        image_id=image_id,
+        ready=False,
+        restart_count=0,
+        state=V1ContainerState(waiting=waiting),
+    )
+
+
+def prepull_pod(*statuses: V1ContainerStatus) -> V1Pod:
+    containers = [V1Container(name=f"pull-{n}") for n in range(2)]
+    return V1Pod(
+        spec=V1PodSpec(containers=containers),
+        status=V1PodStatus(container_statuses=list(statuses)),
+    )
+
+
+def test_declared_images():
+    first = Pod("first").with_container(V1Container(name="a", image="redis"), service=False)
+    second = Pod("second").with_containers(
+        V1Container(name="a", image="redis"), V1Container(name="b", image="mongo"), service=False
+    )
+    assert {"redis", "mongo"} <= set(declared_images())
+    assert declared_images().count("redis") == 1
+    del first, second
+
+
+def test_pulled():
+    failed = {}
+    assert not _pulled(prepull_pod(pull_status("redis", "sha256:1")), failed)
+    assert not _pulled(
+        prepull_pod(pull_status("redis", "sha256:1"), pull_status("mongo", reason="Pulling")),
+        failed,
+    )
+    assert _pulled(
+        prepull_pod(pull_status("redis", "sha256:1"), pull_status("mongo", "sha256:2")), failed
+    )
+    assert _pulled(
+        prepull_pod(pull_status("redis", "sha256:1"), pull_status("nope", reason="ErrImagePull")),
+        failed,
+    )
+    assert list(failed) == ["nope"]
@@ -1,19 +1,36 @@
 # Copyright (c) 2025 Andreas Stenius
 # This software is licensed under the MIT License.
 # See the LICENSE file for details.
+from __future__ import annotations
+
 import os
-import subprocess
+import shutil
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import pytest
-from kubernetes import client, config
-from kubernetes.client.exceptions import ApiException
-from urllib3.exceptions import MaxRetryError
 
-from .image import ImageLoader
-from .manifest import get_default_namespace
-from .session import Session
+# This module is loaded for every pytest run, so podsmith (and its dependencies, such as the
+# kubernetes client) are only imported once actually used.
+if TYPE_CHECKING:
+    from .image import ImageLoader
+    from .logs import LogCollector
+    from .teardown import TeardownFailure
+
+teardown_failures_key: pytest.StashKey[list[TeardownFailure]] = pytest.StashKey()
+log_collector_key: pytest.StashKey[LogCollector] = pytest.StashKey()
+kind_bootstrap_key: pytest.StashKey[KindBootstrap] = pytest.StashKey()
+shared_namespace_key: pytest.StashKey[str] = pytest.StashKey()
+# Set when running as a pytest-xdist worker, e.g. "gw0".
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+# Use the cluster of this kube config, rather than a temporary kind cluster.
+kubeconfig = os.getenv("KUBECONFIG")
+# Use an in-memory fake cluster, rather than any real one, see `podsmith.memory`.
+memory_backend = os.getenv("PODSMITH_BACKEND") == "memory"
 
 
 def pytest_configure(config):
@@ -21,30 +38,122 @@ def pytest_configure(config):
         "markers",
         "podsmith_scope(scope): Session scope for podsmith session. (Scope value used as pytest fixture scope.)",
     )
+    if log_dir := os.getenv("PODSMITH_LOG_DIR"):
+        from .logs import LogCollector
+
+        config.stash[log_collector_key] = LogCollector(Path(log_dir))
+    if XDIST_WORKER:
+        from .manifest import get_default_namespace, set_default_namespace
+
+        # Keep the resources of each worker apart, unless shared by the global session.
+        shared_namespace = config.stash[shared_namespace_key] = get_default_namespace()
+        set_default_namespace(f"{shared_namespace}-{XDIST_WORKER}")
+
+
+def pytest_unconfigure(config):
+    if (collector := config.stash.get(log_collector_key, None)) is not None:
+        collector.close()
+    if (bootstrap := config.stash.get(kind_bootstrap_key, None)) is not None:
+        bootstrap.stop()
+
+
+def pytest_sessionstart(session):
+    if kubeconfig or memory_backend or is_xdist_controller(session.config):
+        # The xdist workers bring up the cluster they share, see `KindBootstrap`.
+        return
+    if os.getenv("PODSMITH_EAGER_CLUSTER", "") not in ("", "0", "false"):
+        start_kind_cluster(session.config)
+
+
+def is_xdist_controller(config) -> bool:
+    """Whether this is the pytest-xdist process distributing the tests to its workers."""
+    return not hasattr(config, "workerinput") and getattr(config.option, "dist", "no") != "no"
+
+
+def pytest_itemcollected(item):
+    # Overlap bringing up the cluster with collecting the remaining tests, unless the tests may be
+    # deselected or not run at all.
+    option = item.config.option
+    if (
+        kubeconfig
+        or memory_backend
+        or option.collectonly
+        or option.keyword
+        or option.markexpr
+        or option.deselect
+        or "kind_cluster" not in getattr(item, "fixturenames", ())
+    ):
+        return
+    start_kind_cluster(item.config)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    from .tracing import TRACER
+
+    if (collector := item.config.stash.get(log_collector_key, None)) is not None:
+        collector.start_test(item.nodeid)
+    TRACER.test = item.nodeid
+    try:
+        yield
+    finally:
+        TRACER.test = None
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    if not report.failed:
+        return
+    if (collector := item.config.stash.get(log_collector_key, None)) is not None:
+        lines = int(os.getenv("PODSMITH_LOG_TAIL", "50"))
+        for label, tail in collector.test_tails(item.nodeid, lines):
+            report.sections.append((f"podsmith logs {label}", tail))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    from .tracing import TRACE_FILE, TRACE_FORMAT, TRACER, export
+
+    if TRACE_FILE:
+        path = Path(TRACE_FILE)
+        if XDIST_WORKER:
+            path = path.with_stem(f"{path.stem}-{XDIST_WORKER}")
+        export(TRACER.spans, path, TRACE_FORMAT)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    from .tracing import TRACER, summary
+
+    if failures := config.stash.get(teardown_failures_key, None):
+        terminalreporter.section("podsmith teardown failures", red=True)
+        for failure in failures:
+            terminalreporter.line(str(failure))
+    if TRACER.recording and (spans := TRACER.spans):
+        terminalreporter.section("podsmith trace")
+        for line in summary(spans, int(os.getenv("PODSMITH_TRACE_TOP", "10"))):
+            terminalreporter.line(line)
 
 
 @dataclass(frozen=True)
 class ClusterInfo:
     context: str
     cluster: str
-    kubeconfig: str
+    kubeconfig: str | None
     ephemeral: bool
     image_loader: ImageLoader | None
 
 
 def get_current_cluster_info():
-    tpl = '{{index . "current-context"}}|{{index . "contexts" 0 "context" "cluster" }}'
-    result = subprocess.run(
-        ["kubectl", "config", "view", "--minify", "-o=go-template", f"--template={tpl}"],
-        capture_output=True,
-        text=True,
-        check=True,
-    )
-    context, _, cluster = result.stdout.strip().partition("|")
-    return dict(context=context, cluster=cluster)
+    from kubernetes.config import list_kube_config_contexts
+
+    _, context = list_kube_config_contexts(config_file=os.getenv("KUBECONFIG"))
+    return dict(context=context["name"], cluster=context["context"]["cluster"])
 
 
 def make_cluster_info(**info):
+    from .image import ImageLoader
+
     info.update(get_current_cluster_info())
     return ClusterInfo(
         kubeconfig=os.getenv("KUBECONFIG"),
@@ -53,7 +162,20 @@ def make_cluster_info(**info):
     )
 
 
-if kubeconfig := os.getenv("KUBECONFIG"):
+if memory_backend:
+
+    @pytest.fixture(scope="session")
+    def podsmith_cluster():
+        """Use an in-memory fake cluster, as PODSMITH_BACKEND is set to "memory".
+
+        Pods don't actually run, but go through the usual phases to become ready, so this is for
+        checking the wiring of fixtures and resources rather than the services they provide.
+        """
+        return ClusterInfo(
+            context="memory", cluster="memory", kubeconfig=None, ephemeral=True, image_loader=None
+        )
+
+elif kubeconfig:
 
     @pytest.fixture(scope="session")
     def podsmith_cluster():
@@ -61,6 +183,8 @@ if kubeconfig := os.getenv("KUBECONFIG"):
 
         The `podsmith_cluster` fixture relies on the KUBECONFIG env var, unset this to use a temporary cluster using `kind` instead.
         """
+        from kubernetes import config
+
         config.load_kube_config(config_file=kubeconfig)
         yield make_cluster_info(ephemeral=False)
 
@@ -76,46 +200,150 @@ else:
 
 
 @pytest.fixture(scope="session")
-def kind_cluster(tmp_path_factory):
+def kind_cluster(request):
     """Creates a temporary Kubernetes cluster using `kind`.
 
     Sets KUBECONFIG for the current test process, so any subprocesses spawned will use this temporary cluster by default as well.
+
+    The cluster is started in the background as soon as the first test using it is collected (or
+    at session start, with PODSMITH_EAGER_CLUSTER set), so this only waits for it to be ready.
+
+    With PODSMITH_KEEP_CLUSTER set, the cluster is kept after the run and reused by the next one,
+    provided it was created with the same kind config.
     """
-    cluster_name = "podsmith-dev"
-    tmp_dir = tmp_path_factory.mktemp("kube")
-    kubeconfig_file = tmp_dir / "kubeconfig.yaml"
-
-    # Create the kind cluster
-    subprocess.run(
-        ["kind", "create", "cluster", "--name", cluster_name, "--kubeconfig", str(kubeconfig_file)],
-        check=True,
-    )
+    return start_kind_cluster(request.config).result()
 
-    # Set env + load config
-    os.environ["KUBECONFIG"] = str(kubeconfig_file)
-    config.load_kube_config(config_file=str(kubeconfig_file))
 
-    # Wait until API is responsive
-    v1 = client.CoreV1Api()
-    for attempt in range(30):  # ~30 seconds max
+class KindBootstrap:
+    """Brings up a kind cluster in the background, and preloads the images declared so far.
+
+    The workers of a pytest-xdist run, identified by `run_id`, share one cluster.
+    """
+
+    def __init__(self, run_id: str | None = None) -> None:
+        from .image import KIND_REGISTRY_CONFIG
+        from .kind import KindCluster
+        from .shared import SharedResources
+
+        kind_config = None
+        if os.getenv("PODSMITH_PRELOAD_IMAGES") == "registry":
+            # Let containerd pull through the local registry, see `RegistryImageLoader`.
+            kind_config = KIND_REGISTRY_CONFIG
+        shared = None
+        if run_id is not None:
+            shared = SharedResources(Path(tempfile.gettempdir()) / f"podsmith-{run_id}", "kind")
+        self.cluster = KindCluster(kind_config=kind_config, shared=shared)
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix="podsmith-kube-"))
+        executor = ThreadPoolExecutor(1, thread_name_prefix="podsmith-bootstrap")
+        self.future = executor.submit(self._run)
+        executor.shutdown(wait=False)
+
+    def result(self) -> ClusterInfo:
+        return self.future.result()
+
+    def stop(self) -> None:
+        wait([self.future])
         try:
-            v1.list_namespace()
-            break
-        except (ApiException, MaxRetryError):
-            time.sleep(1)
-    else:
-        raise RuntimeError("Kubernetes cluster did not become ready in time")
+            self.cluster.stop()
+        except Exception as e:
+            if self.future.exception() is None:
+                raise
+            # It may never have come up in the first place.
+            print(f"deleting kind cluster {self.cluster.name} failed: {e}")
+        finally:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _run(self) -> ClusterInfo:
+        from .image import RegistryImageLoader
+        from .prepull import declared_images
+
+        started = time.monotonic()
+        self.cluster.start(self.tmp_dir / "kubeconfig.yaml")
+        info = make_cluster_info(ephemeral=not self.cluster.keep)
+        if isinstance(info.image_loader, RegistryImageLoader):
+            info.image_loader.start()
+        if info.image_loader is not None:
+            info.image_loader.load_images(declared_images())
+        print(f"kind cluster {self.cluster.name} ready in {time.monotonic() - started:.1f}s")
+        return info
+
+
+def start_kind_cluster(config) -> KindBootstrap:
+    """Start bringing up the kind cluster for this test run, unless already started."""
+    if (bootstrap := config.stash.get(kind_bootstrap_key, None)) is None:
+        run_id = getattr(config, "workerinput", {}).get("testrunuid")
+        bootstrap = config.stash[kind_bootstrap_key] = KindBootstrap(run_id)
+    return bootstrap
 
-    yield make_cluster_info(ephemeral=True)
 
-    # Teardown
-    subprocess.run(["kind", "delete", "cluster", "--name", cluster_name], check=True)
+@pytest.fixture(scope="session")
+def podsmith_images(podsmith_cluster):
+    """Images of all pods declared by the time the first podsmith session starts.
+
+    They are preloaded with the cluster's image loader, if any, and when PODSMITH_PREPULL is set,
+    also pulled on every node up front so pod readiness doesn't include pulling images.
+    """
+    from .prepull import declared_images, prepull_images
+
+    images = declared_images()
+    if podsmith_cluster.image_loader is not None:
+        podsmith_cluster.image_loader.load_images(images)
+    if os.getenv("PODSMITH_PREPULL", "") not in ("", "0", "false") and not memory_backend:
+        prepull_images(images)
+    return images
+
+
+@pytest.fixture(scope="session")
+def podsmith_teardown(request):
+    """Background teardown queue for podsmith sessions, when PODSMITH_BACKGROUND_TEARDOWN is set.
+
+    Tests don't wait for resources to be deleted; the queue is drained at the end of the test run,
+    waiting at most PODSMITH_TEARDOWN_TIMEOUT seconds (default 300). Any failed deletions are
+    reported in the terminal summary.
+    """
+    if os.getenv("PODSMITH_BACKGROUND_TEARDOWN", "") in ("", "0", "false"):
+        yield None
+        return
+
+    from .teardown import TeardownQueue
+
+    queue = TeardownQueue()
+    yield queue
+    failures = queue.drain(timeout=float(os.getenv("PODSMITH_TEARDOWN_TIMEOUT", "300")))
+    request.config.stash[teardown_failures_key] = failures
+
+
+@pytest.fixture(scope="session")
+def podsmith_pod_pool():
+    """Pool of pre-warmed pods, for cheap function scoped pods.
+
+    Keeps PODSMITH_WARM_PODS (default 2) ready pods per pod spec. Lease one with
+    `podsmith_pod_pool.lease(pod, reset=...)`, where the reset hook cleans up the pod before it is
+    returned to the pool.
+    """
+    from .pool import PodPool
+
+    with PodPool() as pool:
+        yield pool
+
+
+@pytest.fixture(scope="session")
+def podsmith_log_collector(request):
+    """Captures the logs of all pods in podsmith sessions, when PODSMITH_LOG_DIR is set.
+
+    Logs are written to per test files in that directory, and the last PODSMITH_LOG_TAIL (default
+    50) lines of each are added to the report of a failing test.
+    """
+    return request.config.stash.get(log_collector_key, None)
 
 
 @pytest.fixture
 def podsmith_namespace():
     """Default namespace to use for podsmith based resources."""
-    return get_default_namespace("podsmith-test")
+    from .manifest import get_default_namespace
+
+    prefix = "podsmith-test" if not XDIST_WORKER else f"podsmith-test-{XDIST_WORKER}"
+    return get_default_namespace(prefix)
 
 
 @pytest.fixture
@@ -161,9 +389,36 @@ def _podsmith_sessions(
 
 def _podsmith_session_fixture_factory(name, scope):
     @pytest.fixture(name=name, scope=scope)
-    def _podsmith_session_fixture():
-        """A podsmith session object."""
-        with Session() as session:
+    def _podsmith_session_fixture(
+        request, podsmith_cluster, podsmith_images, podsmith_teardown, podsmith_log_collector
+    ):
+        """A podsmith session object.
+
+        With pytest-xdist, the global session is shared by all workers, so its resources are only
+        created once. The resources of all other sessions are kept per worker.
+        """
+        from .session import Session
+        from .shared import SharedResources, SharedSession
+
+        kwargs = dict(
+            teardown=podsmith_teardown,
+            log_collector=podsmith_log_collector,
+            image_loader=podsmith_cluster.image_loader,
+        )
+        if scope == "session" and XDIST_WORKER:
+            # The parent of the worker's base temp is common to all workers of this run.
+            tmp_path_factory = request.getfixturevalue("tmp_path_factory")
+            shared = SharedResources(tmp_path_factory.getbasetemp().parent)
+            namespace = request.config.stash[shared_namespace_key]
+            session = SharedSession(
+                shared,
+                namespace=namespace,
+                worker_namespace=f"{namespace}-{XDIST_WORKER}",
+                **kwargs,
+            )
+        else:
+            session = Session(**kwargs)
+        with session:
             yield session
 
     return _podsmith_session_fixture
@@ -1,10 +1,10 @@
 # Copyright (c) 2025 Andreas Stenius
 # This software is licensed under the MIT License.
 # See the LICENSE file for details.
-from kubernetes.client import RbacAuthorizationV1Api, V1ClusterRole, V1PolicyRule, V1Role
+from kubernetes.client import V1ClusterRole, V1PolicyRule, V1Role
 from typing_extensions import Self
 
-from .manifest import ClusterManifest, Manifest
+from .manifest import MODEL_CONFIGURATION, ClusterManifest, Manifest
 
 
 class RoleBase:
@@ -14,35 +14,45 @@ class RoleBase:
 
     def with_rule(self, **policy) -> Self:
         assert not self.live
-        self.rules.append(V1PolicyRule(**policy))
+        self.rules.append(V1PolicyRule(local_vars_configuration=MODEL_CONFIGURATION, **policy))
         return self
 
 
 class ClusterRole(RoleBase, ClusterManifest[V1ClusterRole]):
+    api_version = "rbac.authorization.k8s.io/v1"
+    kind = "ClusterRole"
+    plural = "clusterroles"
+
     def _create(self) -> V1ClusterRole:
-        return RbacAuthorizationV1Api(self.client).create_cluster_role(self.manifest)
+        return self.rbac_api.create_cluster_role(self.manifest)
 
     def _delete(self) -> None:
-        RbacAuthorizationV1Api(self.client).delete_cluster_role(self.name)
+        self.rbac_api.delete_cluster_role(self.name)
 
     def _new_manifest(self) -> V1ClusterRole:
-        return V1ClusterRole(metadata=self.metadata, rules=self.rules)
+        return V1ClusterRole(
+            metadata=self.metadata, rules=self.rules, local_vars_configuration=MODEL_CONFIGURATION
+        )
 
     def _get_manifest(self) -> V1ClusterRole:
-        return RbacAuthorizationV1Api(self.client).read_cluster_role(self.name)
+        return self.rbac_api.read_cluster_role(self.name)
 
 
 class Role(RoleBase, Manifest[V1Role]):
+    api_version = "rbac.authorization.k8s.io/v1"
+    kind = "Role"
+    plural = "roles"
+
     def _create(self) -> V1Role:
-        return RbacAuthorizationV1Api(self.client).create_namespaced_role(
-            self.namespace, self.manifest
-        )
+        return self.rbac_api.create_namespaced_role(self.namespace, self.manifest)
 
     def _delete(self) -> None:
-        RbacAuthorizationV1Api(self.client).delete_namespaced_role(self.name, self.namespace)
+        self.rbac_api.delete_namespaced_role(self.name, self.namespace)
 
     def _new_manifest(self) -> V1Role:
-        return V1Role(metadata=self.metadata, rules=self.rules)
+        return V1Role(
+            metadata=self.metadata, rules=self.rules, local_vars_configuration=MODEL_CONFIGURATION
+        )
 
     def _get_manifest(self) -> V1Role:
-        return RbacAuthorizationV1Api(self.client).read_namespaced_role(self.name, self.namespace)
+        return self.rbac_api.read_namespaced_role(self.name, self.namespace)
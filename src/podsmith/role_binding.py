@@ -2,7 +2,6 @@
 # This software is licensed under the MIT License.
 # See the LICENSE file for details.
 from kubernetes.client import (
-    RbacAuthorizationV1Api,
     RbacV1Subject,
     V1ClusterRoleBinding,
     V1RoleBinding,
@@ -10,7 +9,7 @@ from kubernetes.client import (
 )
 from typing_extensions import Self
 
-from .manifest import ClusterManifest, Manifest
+from .manifest import MODEL_CONFIGURATION, ClusterManifest, Manifest
 from .role import Role
 from .service_account import ServiceAccount
 
@@ -32,17 +31,34 @@ class RoleBindingBase:
                 kind=type(subject).__name__,
                 name=subject.name,
                 namespace=subject.namespace,
+                local_vars_configuration=MODEL_CONFIGURATION,
             )
         )
         return self
 
+    def depends_on(self, other: Manifest) -> bool:
+        return (
+            other is self.role
+            or any(
+                subject.kind == type(other).__name__
+                and subject.name == other.name
+                and subject.namespace == other.namespace
+                for subject in self.subjects
+            )
+            or super().depends_on(other)
+        )
+
 
 class ClusterRoleBinding(RoleBindingBase, ClusterManifest[V1ClusterRoleBinding]):
+    api_version = "rbac.authorization.k8s.io/v1"
+    kind = "ClusterRoleBinding"
+    plural = "clusterrolebindings"
+
     def _create(self) -> V1ClusterRoleBinding:
-        return RbacAuthorizationV1Api(self.client).create_cluster_role_binding(self.manifest)
+        return self.rbac_api.create_cluster_role_binding(self.manifest)
 
     def _delete(self) -> None:
-        RbacAuthorizationV1Api(self.client).delete_cluster_role_binding(self.name)
+        self.rbac_api.delete_cluster_role_binding(self.name)
 
     def _new_manifest(self) -> V1ClusterRoleBinding:
         return V1ClusterRoleBinding(
@@ -51,24 +67,26 @@ class ClusterRoleBinding(RoleBindingBase, ClusterManifest[V1ClusterRoleBinding])
                 api_group="rbac.authorization.k8s.io",
                 kind="ClusterRole",
                 name=self.role.name,
+                local_vars_configuration=MODEL_CONFIGURATION,
             ),
             subjects=self.subjects,
+            local_vars_configuration=MODEL_CONFIGURATION,
         )
 
     def _get_manifest(self) -> V1ClusterRoleBinding:
-        return RbacAuthorizationV1Api(self.client).read_cluster_role_binding(self.name)
+        return self.rbac_api.read_cluster_role_binding(self.name)
 
 
 class RoleBinding(RoleBindingBase, Manifest[V1RoleBinding]):
+    api_version = "rbac.authorization.k8s.io/v1"
+    kind = "RoleBinding"
+    plural = "rolebindings"
+
     def _create(self) -> V1RoleBinding:
-        return RbacAuthorizationV1Api(self.client).create_namespaced_role_binding(
-            self.namespace, self.manifest
-        )
+        return self.rbac_api.create_namespaced_role_binding(self.namespace, self.manifest)
 
     def _delete(self) -> None:
-        RbacAuthorizationV1Api(self.client).delete_namespaced_role_binding(
-            self.name, self.namespace
-        )
+        self.rbac_api.delete_namespaced_role_binding(self.name, self.namespace)
 
     def _new_manifest(self) -> V1RoleBinding:
         return V1RoleBinding(
@@ -77,11 +95,11 @@ class RoleBinding(RoleBindingBase, Manifest[V1RoleBinding]):
                 api_group="rbac.authorization.k8s.io",
                 kind="Role",
                 name=self.role.name,
+                local_vars_configuration=MODEL_CONFIGURATION,
             ),
             subjects=self.subjects,
+            local_vars_configuration=MODEL_CONFIGURATION,
         )
 
     def _get_manifest(self) -> V1RoleBinding:
-        return RbacAuthorizationV1Api(self.client).read_namespaced_role_binding(
-            self.name, self.namespace
-        )
+        return self.rbac_api.read_namespaced_role_binding(self.name, self.namespace)
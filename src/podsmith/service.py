@@ -3,15 +3,19 @@
 # See the LICENSE file for details.
 from enum import Enum
 
-from kubernetes.client import ApiClient, CoreV1Api, V1Pod, V1Service, V1ServicePort, V1ServiceSpec
+from kubernetes.client import ApiClient, V1Pod, V1Service, V1ServicePort, V1ServiceSpec
 from typing_extensions import Self
 
-from .manifest import Manifest
+from .manifest import MODEL_CONFIGURATION, Manifest
 
 APP_LABEL = "app.kubernetes.io/name"
 
 
 class Service(Manifest[V1Service]):
+    api_version = "v1"
+    kind = "Service"
+    plural = "services"
+
     class PortType(str, Enum):
         ExternalName = "ExternalName"
         ClusterIP = "ClusterIP"
@@ -43,19 +47,26 @@ class Service(Manifest[V1Service]):
                 type=self.port_type.value,
                 selector={APP_LABEL: self.pod.metadata.labels[APP_LABEL]},
                 ports=[],
+                local_vars_configuration=MODEL_CONFIGURATION,
             ),
+            local_vars_configuration=MODEL_CONFIGURATION,
         )
 
     def _get_manifest(self) -> V1Service:
-        return CoreV1Api(self.client).read_namespaced_service(self.name, self.namespace)
+        return self.core_api.read_namespaced_service(self.name, self.namespace)
 
     def _create(self) -> V1Service:
-        return CoreV1Api(self.client).create_namespaced_service(self.namespace, self.manifest)
+        return self.core_api.create_namespaced_service(self.namespace, self.manifest)
 
     def _delete(self) -> None:
-        CoreV1Api(self.client).delete_namespaced_service(self.name, self.namespace)
+        self.core_api.delete_namespaced_service(self.name, self.namespace)
+
+    def depends_on(self, other: Manifest) -> bool:
+        return other is self.pod or super().depends_on(other)
 
     def add_port(self, port: int, **kwargs) -> Self:
         assert not self.live
-        self.manifest.spec.ports.append(V1ServicePort(port=port, **kwargs))
+        self.manifest.spec.ports.append(
+            V1ServicePort(port=port, local_vars_configuration=MODEL_CONFIGURATION, **kwargs)
+        )
         return self
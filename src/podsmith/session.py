@@ -3,19 +3,213 @@
 # See the LICENSE file for details.
 from __future__ import annotations
 
+import asyncio
+import threading
 from collections import defaultdict
-from collections.abc import Iterable
-from contextlib import ExitStack
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AsyncExitStack, ExitStack
+from contextvars import copy_context
+from functools import partial
+from typing import TYPE_CHECKING
 
 from typing_extensions import Self
 
+from .logs import LogCollector
 from .manifest import Manifest
+from .snapshot import to_documents
+from .teardown import TeardownQueue
+from .tracing import TRACER
+
+if TYPE_CHECKING:
+    from .image import ImageLoader
+
+DEFAULT_MAX_WORKERS = 8
+Task = tuple[Callable[[], object], set[Hashable]]
+
+
+class Scheduler:
+    """Create resources concurrently, in dependency order.
+
+    Each resource waits for its namespace to be ready and for any other resource in the same batch
+    that it depends on (see `Manifest.depends_on`). Everything else is created in parallel on a
+    bounded pool of worker threads, or as tasks on the running event loop with `run_async`, where
+    only the API requests are made on threads and waiting for pods to be ready takes none.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        self.max_workers = max_workers
+
+    def run(
+        self, resources: Sequence[Manifest], apply: bool = False
+    ) -> tuple[list[Manifest], BaseException | None]:
+        """Enter all resources, or server-side apply them when `apply` is true.
+
+        Returns the resources that were created, in the order given, along with the first error
+        encountered if any. No new resources are started once an error has occurred.
+        """
+        done, error = self._execute(self._plan(resources, apply))
+        return self._finish(resources, done), error
+
+    async def run_async(
+        self,
+        resources: Sequence[Manifest],
+        apply: bool = False,
+        created: Callable[[Manifest], object] | None = None,
+    ) -> tuple[list[Manifest], BaseException | None]:
+        """Same as `run`, without blocking the running event loop.
+
+        `created` is called with each resource as soon as it is created, ahead of the whole batch.
+        """
+
+        def on_done(key: Hashable) -> None:
+            if created is not None and isinstance(key, int):
+                created(resources[key])
+
+        done, error = await self._execute_async(
+            self._plan(resources, apply, asynchronous=True), on_done
+        )
+        return await asyncio.to_thread(self._finish, resources, done), error
+
+    def _plan(
+        self, resources: Sequence[Manifest], apply: bool, asynchronous: bool = False
+    ) -> dict[Hashable, Task]:
+        tasks: dict[Hashable, Task] = {}
+        for resource in resources:
+            if resource.namespace and ("namespace", resource.namespace) not in tasks:
+                # The first resource in each namespace owns it, just as when loaded one at a time.
+                ensure = partial(resource.ensure_namespace, resource.core_api)
+                if asynchronous:
+                    ensure = partial(asyncio.to_thread, ensure)
+                tasks["namespace", resource.namespace] = (ensure, set())
+        for idx, resource in enumerate(resources):
+            deps: set[Hashable] = (
+                {("namespace", resource.namespace)} if resource.namespace else set()
+            )
+            deps.update(
+                dep
+                for dep, other in enumerate(resources)
+                if other is not resource and resource.depends_on(other)
+            )
+            if asynchronous:
+                tasks[idx] = (resource.apply_async if apply else resource.__aenter__, deps)
+            else:
+                tasks[idx] = (resource.apply if apply else resource.__enter__, deps)
+        return tasks
+
+    @staticmethod
+    def _finish(resources: Sequence[Manifest], done: set[Hashable]) -> list[Manifest]:
+        for idx, resource in enumerate(resources):
+            if idx not in done and resource.created_namespace:
+                # Namespace was set up for a resource that never got created.
+                resource.destroy()
+        return [resource for idx, resource in enumerate(resources) if idx in done]
+
+    def _execute(self, tasks: dict[Hashable, Task]) -> tuple[set[Hashable], BaseException | None]:
+        pending = dict(tasks)
+        running: dict[Future, Hashable] = {}
+        done: set[Hashable] = set()
+        errors: list[BaseException] = []
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="podsmith") as pool:
+            while pending or running:
+                if not errors:
+                    for key, (fn, deps) in list(pending.items()):
+                        if deps <= done:
+                            del pending[key]
+                            # Carry over the context, for spans to nest across threads.
+                            running[pool.submit(copy_context().run, fn)] = key
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = running.pop(future)
+                    if (exc := future.exception()) is not None:
+                        errors.append(exc)
+                    else:
+                        done.add(key)
+        return done, self._error(pending, errors)
+
+    async def _execute_async(
+        self, tasks: dict[Hashable, Task], on_done: Callable[[Hashable], None]
+    ) -> tuple[set[Hashable], BaseException | None]:
+        pending = dict(tasks)
+        running: dict[asyncio.Future, Hashable] = {}
+        done: set[Hashable] = set()
+        errors: list[BaseException] = []
+        while pending or running:
+            if not errors:
+                for key, (fn, deps) in list(pending.items()):
+                    if deps <= done:
+                        del pending[key]
+                        running[asyncio.ensure_future(fn())] = key
+            if not running:
+                break
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                if (exc := future.exception()) is not None:
+                    errors.append(exc)
+                else:
+                    done.add(key)
+                    on_done(key)
+        return done, self._error(pending, errors)
+
+    @staticmethod
+    def _error(pending: dict[Hashable, Task], errors: list[BaseException]) -> BaseException | None:
+        if pending and not errors:
+            keys = ", ".join(map(str, pending))
+            return ValueError(f"Dependency cycle between resources: {keys}")
+        return errors[0] if errors else None
+
+
+class ImagePreloader:
+    """Preloads the images of all pods in a batch with one call to the image loader.
+
+    Images are only preloaded once, no matter how many pods use them.
+    """
+
+    def __init__(self, loader: ImageLoader | None) -> None:
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._loaded: set[str] = set()
+
+    def preload(self, resources: Iterable[Manifest]) -> None:
+        if self.loader is None:
+            return
+        with self._lock:
+            images = [
+                image
+                for image in dict.fromkeys(
+                    image
+                    for resource in resources
+                    if resource.kind == "Pod"
+                    for image in resource.images
+                )
+                if image not in self._loaded
+            ]
+            if images:
+                with TRACER.span("images", images=len(images)):
+                    self.loader.load_images(images)
+                self._loaded.update(images)
 
 
 class Session:
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        teardown: TeardownQueue | None = None,
+        reuse: bool | None = None,
+        log_collector: LogCollector | None = None,
+        image_loader: ImageLoader | None = None,
+    ):
         self._stack = ExitStack()
         self._resources = defaultdict(dict)
+        self._scheduler = Scheduler(max_workers)
+        self._teardown = teardown
+        self._reuse = reuse
+        self._logs = log_collector
+        self._images = ImagePreloader(image_loader)
+        self._loaded: list[Manifest] = []
 
     @property
     def default_namespace(self) -> str | None:
@@ -27,31 +221,260 @@ class Session:
         return self._resources[namespace].values()
 
     def load(self, *resources: Manifest) -> tuple[Manifest, ...]:
-        return tuple(map(self.load_resource, resources))
+        if len(resources) <= 1:
+            return tuple(map(self.load_resource, resources))
+
+        loaded, new = self._dedupe(resources)
+        self._images.preload(new)
+        self._await_teardown(new)
+        created, error = self._scheduler.run(new)
+        # Register exit callbacks in load order, so teardown happens in the same order as if the
+        # resources had been loaded one by one.
+        for resource in created:
+            self._resources[resource.namespace][self._key(resource)] = resource
+            self._push(resource)
+        if error is not None:
+            raise error
+        return loaded
+
+    def apply(self, *resources: Manifest, keep: bool = True) -> tuple[Manifest, ...]:
+        """Server-side apply resources as one batch.
+
+        Applying resources that are already up to date is a no-op, so running against an existing
+        environment is cheap. Applied resources are left in place when the session ends, unless
+        `keep` is false.
+        """
+        loaded, new = self._dedupe(resources)
+        self._images.preload(new)
+        self._await_teardown(new)
+        applied, error = self._scheduler.run(new, apply=True)
+        for resource in applied:
+            self._resources[resource.namespace][self._key(resource)] = resource
+            if not keep:
+                self._push(resource)
+        if error is not None:
+            raise error
+        return loaded
+
+    def _dedupe(self, resources: Iterable[Manifest]) -> tuple[tuple[Manifest, ...], list[Manifest]]:
+        loaded: list[Manifest] = []
+        new: dict[tuple[str | None, str], Manifest] = {}
+        for resource in resources:
+            key = self._key(resource)
+            if key in self._resources[resource.namespace]:
+                resource = self._resources[resource.namespace][key]
+            else:
+                resource = new.setdefault((resource.namespace, key), resource)
+                self._prepare(resource)
+            loaded.append(resource)
+        return tuple(loaded), list(new.values())
+
+    def snapshot(self) -> list[dict]:
+        """Manifests of all loaded resources, to pre-provision an environment with.
+
+        See `podsmith.snapshot` for writing them to file and applying them.
+        """
+        return to_documents(
+            resource for resources in self._resources.values() for resource in resources.values()
+        )
 
     def load_resource(self, resource: Manifest) -> Manifest:
-        key = f"{type(resource).__name__}::{resource.name}"
+        key = self._key(resource)
         if key in self._resources[resource.namespace]:
             resource = self._resources[resource.namespace][key]
         else:
             self._resources[resource.namespace][key] = resource
-            resource = self._stack.enter_context(resource)
+            self._prepare(resource)
+            self._images.preload([resource])
+            self._await_teardown([resource])
+            resource = resource.__enter__()
+            self._push(resource)
         return resource
 
+    def _prepare(self, resource: Manifest) -> None:
+        if self._reuse is not None and not resource.live:
+            resource.reuse = self._reuse
+        if self._logs is not None:
+            self._logs.attach(resource)
+
+    def _push(self, resource: Manifest) -> None:
+        if self._teardown is None:
+            self._stack.push(resource)
+        else:
+            self._stack.callback(self._teardown.destroy, resource)
+            self._loaded.append(resource)
+
+    def _await_teardown(self, resources: Iterable[Manifest]) -> None:
+        # Resources from a previous session may still be on their way out.
+        if self._teardown is not None:
+            self._teardown.wait_for(resources)
+
+    @staticmethod
+    def _key(resource: Manifest) -> str:
+        # By kind rather than type, as resources loaded from manifests are all of the same type.
+        return f"{resource.kind}::{resource.namespace}/{resource.name}"
+
     def unload_all(self) -> None:
-        self._stack.close()
+        """Tear down all resources, in the background if the session has a teardown queue."""
+        if self._teardown is None:
+            self._stack.close()
+        else:
+            self._teardown.submit(
+                f"{type(self).__name__} teardown", self._stack.close, self._loaded
+            )
+            self._stack = ExitStack()
+            self._loaded = []
         self._resources.clear()
 
     def pop_all(self) -> Session:
         new_session = type(self)()
         new_session._stack = self._stack
         new_session._resources = self._resources
+        new_session._scheduler = self._scheduler
+        new_session._teardown = self._teardown
+        new_session._reuse = self._reuse
+        new_session._logs = self._logs
+        new_session._images = self._images
+        new_session._loaded = self._loaded
         self._stack = ExitStack()
         self._resources = defaultdict(dict)
+        self._loaded = []
         return new_session
 
     def __enter__(self) -> Self:
         return self
 
     def __exit__(self, *exc_details):
-        return self._stack.__exit__(*exc_details)
+        if self._teardown is None:
+            return self._stack.__exit__(*exc_details)
+        self.unload_all()
+
+
+class AsyncSession:
+    """Asyncio counterpart to `Session`.
+
+    Loading resources does not block the event loop, and separate `load` calls may run concurrently,
+    e.g. using `asyncio.gather`. Pods are waited on to be ready by the event loop itself, so any
+    number of them may be brought up at once. API requests are made on the default executor of the
+    event loop, rather than on `max_workers` threads as with `Session`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        log_collector: LogCollector | None = None,
+        image_loader: ImageLoader | None = None,
+    ):
+        self._stack = AsyncExitStack()
+        self._resources = defaultdict(dict)
+        self._loading: dict[tuple[str | None, str], asyncio.Future] = {}
+        self._scheduler = Scheduler(max_workers)
+        self._logs = log_collector
+        self._images = ImagePreloader(image_loader)
+
+    @property
+    def default_namespace(self) -> str | None:
+        for namespace in self._resources.keys():
+            return namespace
+        return None
+
+    def resources(self, namespace: str | None = None) -> Iterable[Manifest]:
+        return self._resources[namespace].values()
+
+    async def load(self, *resources: Manifest) -> tuple[Manifest, ...]:
+        new: dict[tuple[str | None, str], Manifest] = {}
+        for resource in resources:
+            ident = self._ident(resource)
+            if ident not in self._loading and self._lookup(ident) is None:
+                new.setdefault(ident, resource)
+        if new:
+            # Wait for any resource we depend on, that is being loaded by another task.
+            blockers = {
+                self._loading[ident]
+                for other in resources
+                if (ident := self._ident(other)) in self._loading
+                and any(resource.depends_on(other) for resource in new.values())
+            }
+            loop = asyncio.get_running_loop()
+            loading = {ident: loop.create_future() for ident in new}
+            self._loading.update(loading)
+            if self._logs is not None:
+                for resource in new.values():
+                    self._logs.attach(resource)
+            if (error := await self._load_batch(new, loading, blockers)) is not None:
+                raise error
+
+        loaded = []
+        for resource in resources:
+            ident = self._ident(resource)
+            if (created := self._loading.get(ident)) is not None:
+                # Being loaded by another task.
+                await created
+            if (loaded_resource := self._lookup(ident)) is None:
+                raise RuntimeError(f"{resource} failed to load")
+            loaded.append(loaded_resource)
+        return tuple(loaded)
+
+    async def load_resource(self, resource: Manifest) -> Manifest:
+        return (await self.load(resource))[0]
+
+    def snapshot(self) -> list[dict]:
+        """Manifests of all loaded resources, see `Session.snapshot`."""
+        return to_documents(
+            resource for resources in self._resources.values() for resource in resources.values()
+        )
+
+    async def _load_batch(
+        self,
+        new: dict[tuple[str | None, str], Manifest],
+        loading: dict[tuple[str | None, str], asyncio.Future],
+        blockers: set[asyncio.Future],
+    ) -> BaseException | None:
+        def created(resource: Manifest) -> None:
+            # Available to other tasks right away, rather than once the whole batch is done. Torn
+            # down in reverse order of creation, as batches may finish in any order.
+            ident = self._ident(resource)
+            self._resources[resource.namespace][Session._key(resource)] = resource
+            self._stack.push_async_exit(resource)
+            loading[ident].set_result(resource)
+
+        try:
+            if blockers:
+                await asyncio.wait(blockers)
+            await asyncio.to_thread(self._images.preload, new.values())
+            _, error = await self._scheduler.run_async(list(new.values()), created=created)
+        finally:
+            for ident, future in loading.items():
+                del self._loading[ident]
+                if not future.done():
+                    future.set_result(None)
+        return error
+
+    def _lookup(self, ident: tuple[str | None, str]) -> Manifest | None:
+        namespace, key = ident
+        return self._resources.get(namespace, {}).get(key)
+
+    @staticmethod
+    def _ident(resource: Manifest) -> tuple[str | None, str]:
+        return resource.namespace, Session._key(resource)
+
+    async def unload_all(self) -> None:
+        await self._stack.aclose()
+        self._resources.clear()
+
+    def pop_all(self) -> AsyncSession:
+        new_session = type(self)()
+        new_session._stack = self._stack
+        new_session._resources = self._resources
+        new_session._scheduler = self._scheduler
+        new_session._logs = self._logs
+        new_session._images = self._images
+        self._stack = AsyncExitStack()
+        self._resources = defaultdict(dict)
+        return new_session
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_details):
+        return await self._stack.__aexit__(*exc_details)
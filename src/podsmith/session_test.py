@@ -0,0 +1,404 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import asyncio
+import threading
+import time
+
+import pytest
+from kubernetes.client import V1ConfigMap, V1Container, V1ContainerPort
+
+from .config_map import ConfigMap
+from .informer import PodInformer
+from .manifest import ClusterManifest
+from .memory import MemoryBackend
+from .pod import Pod
+from .role import Role
+from .role_binding import RoleBinding
+from .service_account import ServiceAccount
+from .session import AsyncSession, Session
+from .teardown import TeardownQueue
+
+
+class FakeResource(ClusterManifest[V1ConfigMap]):
+    kind = "ConfigMap"
+
+    def __init__(
+        self,
+        name: str,
+        log: list,
+        *,
+        delay: float = 0.1,
+        fail: bool = False,
+        destroy_gate: threading.Event | None = None,
+        fail_destroy: bool = False,
+    ) -> None:
+        super().__init__(name)
+        self.log = log
+        self.delay = delay
+        self.fail = fail
+        self.destroy_gate = destroy_gate
+        self.fail_destroy = fail_destroy
+        self.deps = []
+
+    def with_dep(self, *deps: ClusterManifest) -> "FakeResource":
+        self.deps.extend(deps)
+        return self
+
+    def depends_on(self, other) -> bool:
+        return other in self.deps
+
+    def create(self) -> "FakeResource":
+        self.log.append(("start", self.name, time.monotonic(), threading.get_ident()))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        self.created = True
+        self.log.append(("ready", self.name, time.monotonic(), threading.get_ident()))
+        return self
+
+    def destroy(self) -> None:
+        if self.created:
+            if self.destroy_gate is not None:
+                self.destroy_gate.wait(5)
+            if self.fail_destroy:
+                raise RuntimeError(f"{self.name} refused to go")
+            self.log.append(("delete", self.name, time.monotonic(), threading.get_ident()))
+            self.created = False
+
+    def _create(self):
+        raise NotImplementedError
+
+    def _delete(self):
+        raise NotImplementedError
+
+    def _new_manifest(self):
+        return V1ConfigMap(metadata=self.metadata)
+
+    def _get_manifest(self):
+        raise NotImplementedError
+
+
+class NamespacedResource(FakeResource):
+    def __init__(self, name: str, namespace: str, log: list) -> None:
+        super().__init__(name, log, delay=0.01)
+        self._in_namespace = namespace
+
+    @property
+    def namespace(self) -> str:
+        return self._in_namespace
+
+    def ensure_namespace(self, api) -> None:
+        pass
+
+
+def web(name: str, namespace: str) -> Pod:
+    return Pod(name, namespace).with_container(
+        V1Container(name="app", image="nginx", ports=[V1ContainerPort(container_port=80)])
+    )
+
+
+def events(log: list, kind: str) -> list[str]:
+    return [name for event, name, *_ in log if event == kind]
+
+
+def timestamp(log: list, kind: str, name: str) -> float:
+    return next(ts for event, n, ts, _ in log if event == kind and n == name)
+
+
+def overlapping(log: list, names: list[str]) -> bool:
+    """Whether all of `names` were started before any of them was ready."""
+    started = max(timestamp(log, "start", name) for name in names)
+    return started < min(timestamp(log, "ready", name) for name in names)
+
+
+def created(backend: MemoryBackend, plural: str, namespace: str, name: str) -> int:
+    """Order of creation, from the uid given by the fake cluster."""
+    uid = backend.cluster.get(plural, namespace, name)["metadata"]["uid"]
+    return int(uid.removeprefix("uid-"))
+
+
+def test_load_creates_independent_resources_concurrently():
+    log = []
+    resources = [FakeResource(f"res-{n}", log, delay=0.3) for n in range(4)]
+    with Session(max_workers=4) as session:
+        assert session.load(*resources) == tuple(resources)
+    assert overlapping(log, [resource.name for resource in resources])
+    assert len({thread for *_, thread in log}) > 1
+
+
+def test_load_honours_dependencies():
+    log = []
+    account = FakeResource("account", log)
+    role = FakeResource("role", log)
+    binding = FakeResource("binding", log).with_dep(account, role)
+    pod = FakeResource("pod", log).with_dep(binding)
+    service = FakeResource("service", log).with_dep(pod)
+    with Session() as session:
+        session.load(service, pod, binding, role, account)
+    assert timestamp(log, "start", "binding") >= timestamp(log, "ready", "account")
+    assert timestamp(log, "start", "binding") >= timestamp(log, "ready", "role")
+    assert timestamp(log, "start", "pod") >= timestamp(log, "ready", "binding")
+    assert timestamp(log, "start", "service") >= timestamp(log, "ready", "pod")
+
+
+def test_teardown_in_reverse_load_order():
+    log = []
+    resources = [FakeResource(f"res-{n}", log, delay=0.1 * (4 - n)) for n in range(4)]
+    with Session() as session:
+        session.load(*resources)
+    assert events(log, "delete") == ["res-3", "res-2", "res-1", "res-0"]
+
+
+def test_load_dedupes_resources():
+    log = []
+    first = FakeResource("same", log)
+    with Session() as session:
+        loaded = session.load(first, FakeResource("same", log), FakeResource("other", log))
+        assert loaded[0] is loaded[1] is first
+        assert session.load(FakeResource("same", log), FakeResource("other", log))[0] is first
+    assert sorted(events(log, "start")) == ["other", "same"]
+
+
+def test_load_keeps_same_name_in_other_namespaces():
+    log = []
+    a = NamespacedResource("same", "ns-a", log)
+    b = NamespacedResource("same", "ns-b", log)
+    with Session() as session:
+        assert session.load(a, b) == (a, b)
+        assert list(session.resources("ns-b")) == [b]
+    assert events(log, "start") == ["same", "same"]
+
+
+class FakePod(FakeResource):
+    kind = "Pod"
+
+    def __init__(self, name: str, log: list, *images: str) -> None:
+        super().__init__(name, log, delay=0)
+        self.images = list(images)
+
+
+class FakeImageLoader:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def load_image(self, image: str) -> None:
+        self.load_images([image])
+
+    def load_images(self, images) -> None:
+        self.calls.append(list(images))
+
+
+def test_load_preloads_images_once():
+    log = []
+    loader = FakeImageLoader()
+    with Session(image_loader=loader) as session:
+        session.load(
+            FakePod("a", log, "redis", "busybox"),
+            FakePod("b", log, "redis"),
+            FakeResource("config", log),
+        )
+        session.load(FakePod("c", log, "redis", "mongo"))
+        session.load(FakePod("d", log, "busybox"))
+    assert loader.calls == [["redis", "busybox"], ["mongo"]]
+
+
+def test_load_failure_skips_dependents_and_tears_down_created():
+    log = []
+    ok = FakeResource("ok", log, delay=0.01)
+    broken = FakeResource("broken", log, fail=True)
+    dependent = FakeResource("dependent", log).with_dep(broken)
+    with Session() as session:
+        with pytest.raises(RuntimeError, match="broken failed"):
+            session.load(ok, broken, dependent)
+        assert list(session.resources()) == [ok]
+    assert "dependent" not in events(log, "start")
+    assert events(log, "delete") == ["ok"]
+
+
+def test_load_dependency_cycle():
+    log = []
+    a = FakeResource("a", log)
+    b = FakeResource("b", log).with_dep(a)
+    a.with_dep(b)
+    with Session() as session:
+        with pytest.raises(ValueError, match="Dependency cycle"):
+            session.load(a, b)
+
+
+def test_async_session_gathers_loads():
+    log = []
+    account = FakeResource("account", log)
+    pods = [FakeResource(f"pod-{n}", log, delay=0.4).with_dep(account) for n in range(4)]
+
+    async def provision():
+        async with AsyncSession() as session:
+            loaded = await asyncio.gather(
+                session.load(account, *pods[:2]), session.load(account, *pods[2:])
+            )
+            assert loaded[0][0] is loaded[1][0] is account
+            assert set(session.resources()) == {account, *pods}
+
+    asyncio.run(provision())
+    # Both loads wait on the same account, then create their pods alongside each other.
+    assert overlapping(log, [pod.name for pod in pods])
+    assert events(log, "start").count("account") == 1
+    assert min(timestamp(log, "start", pod.name) for pod in pods) >= timestamp(
+        log, "ready", "account"
+    )
+    assert events(log, "delete")[-1] == "account"
+
+
+def test_async_session_tears_down_dependents_first():
+    log = []
+    account = FakeResource("account", log)
+    slow = FakeResource("slow", log, delay=0.2).with_dep(account)
+    fast = FakeResource("fast", log, delay=0).with_dep(account)
+
+    async def provision():
+        async with AsyncSession() as session:
+            await asyncio.gather(session.load(account, slow), session.load(account, fast))
+
+    asyncio.run(provision())
+    # The second load is done first, yet depends on the account of the first.
+    assert events(log, "ready") == ["account", "fast", "slow"]
+    assert events(log, "delete") == ["slow", "fast", "account"]
+
+
+def test_async_session_waits_for_pods_without_worker_threads(memory_backend, monkeypatch):
+    waiting = []
+    most_waiting = 0
+    wait_for_async = PodInformer.wait_for_async
+
+    async def counting_wait_for_async(self, *args, **kwargs):
+        nonlocal most_waiting
+        waiting.append(args[0])
+        most_waiting = max(most_waiting, len(waiting))
+        try:
+            return await wait_for_async(self, *args, **kwargs)
+        finally:
+            waiting.remove(args[0])
+
+    monkeypatch.setattr(PodInformer, "wait_for_async", counting_wait_for_async)
+    memory_backend.cluster.pod_ready_delay = 0.2
+    pods = [
+        Pod(f"web-{n}", "async-test").with_container(
+            V1Container(name="app", image="nginx", ports=[V1ContainerPort(container_port=80)])
+        )
+        for n in range(12)
+    ]
+
+    async def provision():
+        async with AsyncSession(max_workers=2) as session:
+            await session.load(*pods)
+            assert all(pod.manifest.status.phase == "Running" for pod in pods)
+
+    asyncio.run(provision())
+    # Not bound by the number of workers, as waiting takes no thread.
+    assert most_waiting > 2
+
+
+def test_load_creates_pod_after_its_account_and_rbac(memory_backend):
+    account = ServiceAccount("runner", "order-test")
+    role = Role("runner", "order-test").with_rule(
+        api_groups=[""], resources=["pods"], verbs=["get"]
+    )
+    binding = RoleBinding("runner", "order-test", role=role).with_subject(account)
+    settings = ConfigMap("settings", "order-test").with_data({"a": "1"})
+    pod = web("web", "order-test")
+    pod.manifest.spec.service_account_name = account.name
+
+    with Session() as session:
+        session.load(pod, binding, role, settings, account)
+        pod_created = created(memory_backend, "pods", "order-test", "web")
+        assert created(memory_backend, "rolebindings", "order-test", "runner") < pod_created
+        assert created(memory_backend, "roles", "order-test", "runner") < created(
+            memory_backend, "rolebindings", "order-test", "runner"
+        )
+        assert created(memory_backend, "serviceaccounts", "order-test", "runner") < created(
+            memory_backend, "rolebindings", "order-test", "runner"
+        )
+        assert created(memory_backend, "configmaps", "order-test", "settings") < pod_created
+    assert memory_backend.cluster.calls["create", "namespaces"] == 1
+
+
+def test_load_creates_shared_namespace_once(memory_backend):
+    pods = [
+        web(f"web-{n}", "shared-test").with_auth_rule(
+            api_groups=[""], resources=["pods"], verbs=["get"]
+        )
+        for n in range(4)
+    ]
+    with Session(max_workers=4) as session:
+        session.load(*pods)
+        for pod in pods:
+            pod_created = created(memory_backend, "pods", "shared-test", pod.name)
+            for resource in pod.provisioned_resources()[:-1]:
+                assert (
+                    created(memory_backend, resource.plural, "shared-test", resource.name)
+                    < pod_created
+                )
+    assert memory_backend.cluster.calls["create", "namespaces"] == 1
+    assert memory_backend.cluster.calls["create", "pods"] == 4
+    assert memory_backend.cluster.objects("namespaces") == []
+
+
+def test_apply_again_is_a_no_op(memory_backend):
+    def resources():
+        return ConfigMap("settings", "apply-test").with_data({"a": "1"}), web("web", "apply-test")
+
+    def versions():
+        return {
+            (plural, obj["metadata"]["name"]): obj["metadata"]["resourceVersion"]
+            for plural in ("configmaps", "pods")
+            for obj in memory_backend.cluster.objects(plural, "apply-test")
+        }
+
+    with Session() as session:
+        session.apply(*resources())
+    applied = versions()
+    assert len(applied) == 2
+
+    with Session() as session:
+        cfg, pod = session.apply(*resources())
+        assert cfg.manifest.data == {"a": "1"}
+        assert pod.manifest.status.phase == "Running"
+    assert versions() == applied
+    assert (
+        memory_backend.cluster.calls["apply", "configmaps"]
+        == memory_backend.cluster.calls["apply", "pods"]
+        == 2
+    )
+    assert (
+        memory_backend.cluster.calls["create", "configmaps"]
+        == memory_backend.cluster.calls["create", "pods"]
+        == 0
+    )
+
+
+def test_apply_without_keep_deletes_resources(memory_backend):
+    with Session() as session:
+        session.apply(ConfigMap("settings", "apply-test").with_data({"a": "1"}), keep=False)
+        assert memory_backend.cluster.get("configmaps", "apply-test", "settings")
+    assert memory_backend.cluster.objects("configmaps", "apply-test") == []
+
+
+def test_background_teardown():
+    log = []
+    queue = TeardownQueue()
+    gate = threading.Event()
+    for n in range(2):
+        with Session(teardown=queue) as session:
+            session.load(
+                FakeResource(f"res-{n}-a", log, destroy_gate=gate),
+                FakeResource(f"res-{n}-b", log, destroy_gate=gate, fail_destroy=n == 1),
+            )
+        # Exiting doesn't wait for the teardown.
+        assert events(log, "delete") == []
+
+    gate.set()
+    failures = queue.drain(timeout=5)
+    assert events(log, "delete") == ["res-0-b", "res-0-a", "res-1-a"]
+    assert [str(failure) for failure in failures] == [
+        "<FakeResource None/res-1-b>: RuntimeError: res-1-b refused to go"
+    ]
@@ -0,0 +1,244 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import fcntl
+import json
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+from kubernetes.client.exceptions import ApiException
+
+from .clients import get_api_client
+from .informer import INFORMERS
+from .manifest import READY_NAMESPACES, Manifest, api_path
+from .session import Session
+
+# What identifies a shared resource, as recorded by `SharedSession`.
+RECORD_FIELDS = ("apiVersion", "kind", "plural", "namespace", "name")
+
+
+class SharedResources:
+    """Lock and reference count shared by processes, e.g. the workers of a pytest-xdist run.
+
+    Both are kept in files in `directory`, which all processes must agree on, along with records of
+    what the users share, for the last one to clean up. The lock may be taken again by the thread
+    holding it, e.g. to add a user while holding it.
+    """
+
+    def __init__(self, directory: Path, name: str = "podsmith") -> None:
+        self.directory = Path(directory)
+        self.lock_file = self.directory / f"{name}.lock"
+        self.count_file = self.directory / f"{name}.users"
+        self.records_file = self.directory / f"{name}.records"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold an exclusive lock across all processes."""
+        with self._thread_lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.lock_file.open("a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def users(self) -> int:
+        """Number of users."""
+        with self.lock():
+            return self._add(0)
+
+    def acquire(self) -> int:
+        """Add a user, returns the number of users."""
+        with self.lock():
+            return self._add(1)
+
+    def release(self) -> int:
+        """Remove a user, returns the number of users left."""
+        with self.lock():
+            return self._add(-1)
+
+    def record(self, *records: dict) -> None:
+        """Add records, in order."""
+        with self.lock(), self.records_file.open("a") as f:
+            for record in records:
+                f.write(f"{json.dumps(record)}\n")
+
+    def pop_records(self) -> list[dict]:
+        """All records added by any process, in the order added without duplicates, removing them."""
+        with self.lock():
+            try:
+                lines = self.records_file.read_text().splitlines()
+            except FileNotFoundError:
+                return []
+            self.records_file.unlink()
+        return [json.loads(line) for line in dict.fromkeys(lines) if line]
+
+    def _add(self, delta: int) -> int:
+        try:
+            count = int(self.count_file.read_text() or 0)
+        except FileNotFoundError:
+            count = 0
+        count = max(count + delta, 0)
+        self.count_file.write_text(str(count))
+        return count
+
+
+class SharedSession(Session):
+    """Session with resources shared by several processes, created once and deleted by the last.
+
+    Resources are loaded holding the shared lock, and adopted if another process already created
+    them (see `Manifest.with_reuse`). They are left in place on exit, except for the last process
+    to exit, which deletes them all regardless of which process loaded them. For this, every
+    resource loaded, along with the resources provisioned with it, such as the services and RBAC of
+    pods, and any namespace created for them, is recorded in the shared directory.
+
+    Resources in `worker_namespace` are moved to `namespace`, for all processes to agree on it.
+
+    Unlike a plain `Session`, a shared session can't hand its resources over with `pop_all()`, as
+    that would leave them out of the reference count.
+    """
+
+    def __init__(
+        self,
+        shared: SharedResources,
+        namespace: str | None = None,
+        worker_namespace: str | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(reuse=True, **kwargs)
+        self._shared = shared
+        self._namespace = namespace
+        self._worker_namespace = worker_namespace
+        self._users: int | None = None
+        self._depth = 0
+        self._recorded: set[tuple[str | None, ...]] = set()
+
+    def load(self, *resources: Manifest) -> tuple[Manifest, ...]:
+        with self._locked():
+            return super().load(*map(self._move, resources))
+
+    def apply(self, *resources: Manifest, keep: bool = True) -> tuple[Manifest, ...]:
+        with self._locked():
+            return super().apply(*map(self._move, resources), keep=keep)
+
+    def load_resource(self, resource: Manifest) -> Manifest:
+        with self._locked():
+            return super().load_resource(self._move(resource))
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if self._users is None:
+            self._users = self._shared.acquire()
+        if self._depth:
+            # `load` goes through `load_resource` for single resources.
+            yield
+            return
+        with self._shared.lock():
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                # Also what got created before failing to load, as it is kept all the same.
+                self._record()
+
+    def _record(self) -> None:
+        records = []
+        for resources in self._resources.values():
+            for loaded in resources.values():
+                for resource in loaded.provisioned_resources():
+                    if resource.created_namespace:
+                        records.append(("v1", "Namespace", "namespaces", None, resource.namespace))
+                    records.append(
+                        (
+                            resource.api_version,
+                            resource.kind,
+                            resource.plural,
+                            resource.namespace,
+                            resource.name,
+                        )
+                    )
+        if new := [record for record in dict.fromkeys(records) if record not in self._recorded]:
+            self._shared.record(*(dict(zip(RECORD_FIELDS, record)) for record in new))
+            self._recorded.update(new)
+
+    def _move(self, resource: Manifest) -> Manifest:
+        if (
+            self._namespace is not None
+            and not resource.live
+            and resource.namespace == self._worker_namespace
+        ):
+            resource.with_namespace(self._namespace)
+        return resource
+
+    def unload_all(self) -> None:
+        records = []
+        if self._users is not None:
+            self._users = None
+            with self._shared.lock():
+                if self._shared.release() == 0:
+                    records = self._shared.pop_records()
+        # Resources are reused, so this leaves them in place.
+        super().unload_all()
+        self._recorded.clear()
+        if records:
+            # Last one out, delete everything, including what others loaded.
+            delete = partial(_delete_recorded, records)
+            if self._teardown is None:
+                delete()
+            else:
+                self._teardown.submit(f"{type(self).__name__} shared resources", delete)
+
+    def pop_all(self) -> SharedSession:
+        raise TypeError("shared sessions can't be popped")
+
+    def __exit__(self, *exc_details):
+        self.unload_all()
+
+
+def _delete_recorded(records: list[dict]) -> None:
+    """Delete recorded resources, dependents first, and then the namespaces."""
+    client = get_api_client()
+    host = client.configuration.host
+    errors = []
+    for record in sorted(reversed(records), key=lambda record: record["kind"] == "Namespace"):
+        kind, namespace, name = record["kind"], record["namespace"], record["name"]
+        if kind == "Namespace":
+            print(f"deleting namespace {name}...")
+            READY_NAMESPACES.discard(host, name)
+            INFORMERS.discard(host, name)
+        else:
+            print(f"deleting <{kind} {namespace}/{name}>...")
+        path = f"{api_path(record['apiVersion'], record['plural'], namespace)}/{name}"
+        try:
+            client.call_api(
+                path,
+                "DELETE",
+                header_params={"Accept": "application/json"},
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+            )
+        except ApiException as e:
+            # Already gone, e.g. along with its namespace.
+            if e.status != 404:
+                errors.append(e)
+    if errors:
+        raise errors[0]
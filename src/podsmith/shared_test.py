@@ -0,0 +1,68 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import multiprocessing
+
+import pytest
+from kubernetes.client import V1Container, V1ContainerPort
+
+from .config_map import ConfigMap
+from .pod import Pod
+from .shared import SharedResources, SharedSession
+
+
+def count_users(directory, n):
+    shared = SharedResources(directory)
+    for _ in range(n):
+        shared.acquire()
+
+
+def test_reference_count_across_processes(tmp_path):
+    processes = [multiprocessing.Process(target=count_users, args=(tmp_path, 25)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert SharedResources(tmp_path).release() == 99
+
+
+def web() -> Pod:
+    pod = Pod("web", "shared-test").with_container(
+        V1Container(
+            name="app", image="nginx", ports=[V1ContainerPort(container_port=80, name="http")]
+        )
+    )
+    pod.with_auth_rule(api_groups=[""], resources=["pods"], verbs=["get"])
+    pod.with_auth_cluster_rule(api_groups=[""], resources=["nodes"], verbs=["list"])
+    return pod
+
+
+def test_last_session_out_deletes_shared_resources(memory_backend, tmp_path):
+    first = SharedSession(SharedResources(tmp_path))
+    second = SharedSession(SharedResources(tmp_path))
+
+    (created,) = first.load(web())
+    first.load(ConfigMap("settings", "shared-test").with_data({"a": "1"}))
+    (adopted,) = second.load(web())
+    assert created.created and adopted.existing
+    assert memory_backend.cluster.calls["create", "pods"] == 1
+
+    # The one that created everything is not the last one out.
+    first.__exit__(None, None, None)
+    assert memory_backend.cluster.get("configmaps", "shared-test", "settings")
+    assert memory_backend.cluster.objects("clusterroles")
+    second.__exit__(None, None, None)
+
+    for plural in ("pods", "services", "serviceaccounts", "roles", "rolebindings", "configmaps"):
+        assert memory_backend.cluster.calls["delete", plural] == 1
+        assert memory_backend.cluster.objects(plural, "shared-test") == []
+    assert memory_backend.cluster.objects("clusterroles") == []
+    assert memory_backend.cluster.objects("clusterrolebindings") == []
+    assert memory_backend.cluster.objects("namespaces") == []
+    assert not SharedResources(tmp_path).records_file.exists()
+
+
+def test_shared_session_can_not_be_popped(tmp_path):
+    with SharedSession(SharedResources(tmp_path)) as session:
+        with pytest.raises(TypeError):
+            session.pop_all()
@@ -0,0 +1,309 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+"""Snapshots of provisioned resources, as manifests to pre-provision test environments with.
+
+A snapshot is a list of plain manifests, without status or anything else set by the API server, so
+they may be applied to any cluster. Either by `kubectl apply -f`, or as one parallel batch with
+`Session.apply(*from_documents(documents))`, which also waits for all pods to be ready.
+
+Take a snapshot of a session with `Session.snapshot()`, or of a namespace with `read_namespace`,
+and see the `podsmith` command for doing both from the command line.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import SimpleNamespace
+
+import kubernetes.client
+import yaml
+from kubernetes.client import ApiClient
+from typing_extensions import Self
+
+from .manifest import FIELD_MANAGER, MANAGED_BY_LABEL, SERVER_METADATA, Manifest, api_path
+
+# Manifests are applied in this order by `kubectl`, with any other kinds last.
+APPLY_ORDER = (
+    "Namespace",
+    "ServiceAccount",
+    "Secret",
+    "ConfigMap",
+    "ClusterRole",
+    "Role",
+    "ClusterRoleBinding",
+    "RoleBinding",
+    "Service",
+    "DaemonSet",
+    "Pod",
+)
+# Kinds to apply before resources of each kind, when in the same namespace or cluster wide.
+DEPENDENCIES = {
+    "ClusterRoleBinding": {"ClusterRole", "ServiceAccount"},
+    "RoleBinding": {"ClusterRole", "Role", "ServiceAccount"},
+    "DaemonSet": {"ConfigMap", "Secret", "ServiceAccount"},
+    "Pod": {"ClusterRoleBinding", "ConfigMap", "RoleBinding", "Secret", "ServiceAccount"},
+}
+# Plural resource name to API version and kind, of what is in a namespace snapshot.
+NAMESPACED_KINDS = {
+    "serviceaccounts": ("v1", "ServiceAccount"),
+    "configmaps": ("v1", "ConfigMap"),
+    "roles": ("rbac.authorization.k8s.io/v1", "Role"),
+    "rolebindings": ("rbac.authorization.k8s.io/v1", "RoleBinding"),
+    "services": ("v1", "Service"),
+    "daemonsets": ("apps/v1", "DaemonSet"),
+    "pods": ("v1", "Pod"),
+}
+# Cluster wide resources of the pods in a namespace snapshot, see `Pod.cluster_rbac`.
+CLUSTER_KINDS = {
+    "clusterroles": ("rbac.authorization.k8s.io/v1", "ClusterRole"),
+    "clusterrolebindings": ("rbac.authorization.k8s.io/v1", "ClusterRoleBinding"),
+}
+# Plural resource name of each kind that may be applied, anything else is rejected.
+PLURALS = {
+    **{kind: plural for plural, (_, kind) in {**NAMESPACED_KINDS, **CLUSTER_KINDS}.items()},
+    "Namespace": "namespaces",
+    "Secret": "secrets",
+    "Endpoints": "endpoints",
+    "PersistentVolumeClaim": "persistentvolumeclaims",
+    "Deployment": "deployments",
+    "StatefulSet": "statefulsets",
+    "ReplicaSet": "replicasets",
+    "Job": "jobs",
+    "CronJob": "cronjobs",
+    "Ingress": "ingresses",
+    "NetworkPolicy": "networkpolicies",
+    "PodDisruptionBudget": "poddisruptionbudgets",
+}
+# Created by Kubernetes in every namespace.
+DEFAULT_RESOURCES = {("ServiceAccount", "default"), ("ConfigMap", "kube-root-ca.crt")}
+# Volume with the service account token, mounted into each pod by Kubernetes.
+TOKEN_VOLUME_PREFIX = "kube-api-access-"
+
+
+def clean(body: dict) -> dict:
+    """Leave out status and fields set by the API server from a manifest, in place."""
+    body.pop("status", None)
+    metadata = body.setdefault("metadata", {})
+    for field in SERVER_METADATA:
+        metadata.pop(field, None)
+    spec = body.get("spec") or {}
+    match body.get("kind"):
+        case "Pod":
+            spec.pop("nodeName", None)
+            if "volumes" in spec:
+                spec["volumes"] = [
+                    volume
+                    for volume in spec["volumes"]
+                    if not volume["name"].startswith(TOKEN_VOLUME_PREFIX)
+                ]
+            for container in spec.get("initContainers", []) + spec.get("containers", []):
+                if "volumeMounts" in container:
+                    container["volumeMounts"] = [
+                        mount
+                        for mount in container["volumeMounts"]
+                        if not mount["name"].startswith(TOKEN_VOLUME_PREFIX)
+                    ]
+        case "Service":
+            spec.pop("clusterIP", None)
+            spec.pop("clusterIPs", None)
+    return body
+
+
+def namespace_document(namespace: str) -> dict:
+    return {
+        "apiVersion": "v1",
+        "kind": "Namespace",
+        "metadata": {"name": namespace, "labels": {MANAGED_BY_LABEL: FIELD_MANAGER}},
+    }
+
+
+def sort_documents(documents: Iterable[dict]) -> list[dict]:
+    """Documents in `APPLY_ORDER`, keeping the order of those of the same kind."""
+    return sorted(documents, key=lambda document: _rank(document["kind"]))
+
+
+def to_documents(resources: Iterable[Manifest]) -> list[dict]:
+    """Snapshot of live `resources` and those provisioned with them, e.g. the services of a pod.
+
+    Each namespace is included, ahead of the resources in it.
+    """
+    documents: dict[tuple[str, str | None, str], dict] = {}
+    for resource in resources:
+        for provisioned in resource.provisioned_resources():
+            key = (provisioned.kind, provisioned.namespace, provisioned.name)
+            if not provisioned.live or key in documents:
+                continue
+            if namespace := provisioned.namespace:
+                documents.setdefault(("Namespace", None, namespace), namespace_document(namespace))
+            documents[key] = clean(provisioned.to_dict())
+    return sort_documents(documents.values())
+
+
+def read_namespace(client: ApiClient, namespace: str) -> list[dict]:
+    """Snapshot of the resources in `namespace`, see `NAMESPACED_KINDS` and `CLUSTER_KINDS`.
+
+    Resources created by Kubernetes, such as the default service account and the pods of a daemon
+    set, are left out.
+    """
+    documents = [namespace_document(namespace)]
+    pods = []
+    for plural, (api_version, kind) in NAMESPACED_KINDS.items():
+        for item in _list(client, api_version, plural, namespace):
+            metadata = item["metadata"]
+            if (kind, metadata["name"]) in DEFAULT_RESOURCES or metadata.get("ownerReferences"):
+                continue
+            if kind == "Pod":
+                pods.append(metadata["name"])
+            documents.append(clean({"apiVersion": api_version, "kind": kind, **item}))
+    documents.extend(_cluster_rbac(client, namespace, pods))
+    return sort_documents(documents)
+
+
+def _cluster_rbac(client: ApiClient, namespace: str, pods: Iterable[str]) -> list[dict]:
+    # Bindings by the names given by `Pod.cluster_rbac`, to a service account in `namespace`.
+    role_version, role_kind = CLUSTER_KINDS["clusterroles"]
+    binding_version, binding_kind = CLUSTER_KINDS["clusterrolebindings"]
+    names = {f"{namespace}-{pod}-cluster-role-binding" for pod in pods}
+    bindings = [
+        item
+        for item in _list(client, binding_version, "clusterrolebindings")
+        if item["metadata"]["name"] in names
+        and any(subject.get("namespace") == namespace for subject in item.get("subjects") or ())
+    ]
+    roles = {binding["roleRef"]["name"] for binding in bindings}
+    documents = [
+        clean({"apiVersion": role_version, "kind": role_kind, **item})
+        for item in _list(client, role_version, "clusterroles")
+        if item["metadata"]["name"] in roles
+    ]
+    documents.extend(
+        clean({"apiVersion": binding_version, "kind": binding_kind, **item}) for item in bindings
+    )
+    return documents
+
+
+def _list(client: ApiClient, api_version: str, plural: str, namespace: str | None = None) -> list:
+    body = client.call_api(
+        api_path(api_version, plural, namespace),
+        "GET",
+        header_params={"Accept": "application/json"},
+        response_type="object",
+        auth_settings=["BearerToken"],
+        _return_http_data_only=True,
+    )
+    return body.get("items") or []
+
+
+def dump(documents: Iterable[dict]) -> str:
+    return yaml.safe_dump_all(documents, sort_keys=False)
+
+
+def write(documents: Iterable[dict], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dump(documents))
+
+
+def load(paths: Sequence[Path]) -> list[dict]:
+    """Documents of the YAML files at `paths`, reading all `*.yaml` and `*.yml` files of folders."""
+    documents = []
+    for path in paths:
+        files = (
+            sorted(file for pattern in ("*.yaml", "*.yml") for file in path.glob(pattern))
+            if path.is_dir()
+            else [path]
+        )
+        for file in files:
+            documents.extend(filter(None, yaml.safe_load_all(file.read_text())))
+    return documents
+
+
+def from_documents(documents: Iterable[dict], *, client: ApiClient | None = None) -> list[Resource]:
+    """Resources for `documents`, to apply with `Session.apply`.
+
+    Namespaces are left out, as each resource sets up its namespace as needed.
+    """
+    return [
+        Resource(document, client=client)
+        for document in documents
+        if document["kind"] != "Namespace"
+    ]
+
+
+class Resource(Manifest[object]):
+    """A resource of any of the kinds in `PLURALS`, as loaded from a manifest.
+
+    Namespaced resources must have their namespace set in the manifest. Pods are waited on to be
+    ready once created or applied, just as with `Pod`.
+    """
+
+    def __init__(self, body: dict, *, client: ApiClient | None = None) -> None:
+        metadata = body["metadata"]
+        super().__init__(metadata["name"], metadata.get("namespace"), client=client)
+        self.api_version = body["apiVersion"]
+        self.kind = body["kind"]
+        model = f"{self.api_version.rpartition('/')[2].capitalize()}{self.kind}"
+        if self.kind not in PLURALS or not hasattr(kubernetes.client, model):
+            raise ValueError(f"Unsupported resource {self.api_version} {self.kind}")
+        self.plural = PLURALS[self.kind]
+        # Cluster wide resources have no namespace.
+        self._namespace = metadata.get("namespace")
+        self.manifest = self.core_api.api_client.deserialize(
+            SimpleNamespace(data=json.dumps(body)), model
+        )
+
+    def create(self) -> Self:
+        super().create()
+        self._wait_until_ready()
+        return self
+
+    def apply(self) -> Self:
+        super().apply()
+        self._wait_until_ready()
+        return self
+
+    def depends_on(self, other: Manifest) -> bool:
+        return (
+            other.kind in DEPENDENCIES.get(self.kind, ())
+            and other.namespace in (None, self.namespace)
+        ) or super().depends_on(other)
+
+    def _wait_until_ready(self) -> None:
+        if self.kind != "Pod":
+            return
+        # Circular import.
+        from .pod import Pod
+
+        pod = Pod.from_pod(self.manifest, client=self.client)
+        pod.existing = True
+        pod.wait_until_ready()
+        self._manifest = pod.manifest
+
+    def _call(self, method: str, path: str, body: dict | None = None, response: bool = True):
+        return self.core_api.api_client.call_api(
+            path,
+            method,
+            header_params={"Accept": "application/json", "Content-Type": "application/json"},
+            body=body,
+            response_type=type(self.manifest).__name__ if response else None,
+            auth_settings=["BearerToken"],
+            _return_http_data_only=True,
+        )
+
+    def _create(self) -> object:
+        return self._call("POST", self._path(), self.to_dict())
+
+    def _delete(self) -> None:
+        self._call("DELETE", f"{self._path()}/{self.name}", response=False)
+
+    def _new_manifest(self) -> object:
+        raise NotImplementedError("Resources are loaded from a manifest.")
+
+    def _get_manifest(self) -> object:
+        return self._call("GET", f"{self._path()}/{self.name}")
+
+
+def _rank(kind: str) -> int:
+    return APPLY_ORDER.index(kind) if kind in APPLY_ORDER else len(APPLY_ORDER)
@@ -0,0 +1,150 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import pytest
+from kubernetes.client import V1Container, V1ContainerPort
+
+from .cli import main
+from .clients import CLIENTS
+from .config_map import ConfigMap
+from .pod import Pod
+from .session import Session
+from .snapshot import Resource, clean, from_documents, load, read_namespace, write
+
+
+def web_pod(namespace: str) -> Pod:
+    pod = Pod("web", namespace).with_container(
+        V1Container(
+            name="app", image="nginx", ports=[V1ContainerPort(container_port=80, name="http")]
+        )
+    )
+    pod.with_auth_rule(api_groups=[""], resources=["pods"], verbs=["get"])
+    return pod
+
+
+def test_clean_strips_server_fields():
+    pod = {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": "web", "uid": "1234", "resourceVersion": "7"},
+        "spec": {
+            "nodeName": "node-1",
+            "containers": [
+                {
+                    "name": "app",
+                    "volumeMounts": [{"name": "data"}, {"name": "kube-api-access-x1y2z"}],
+                }
+            ],
+            "volumes": [{"name": "data"}, {"name": "kube-api-access-x1y2z"}],
+        },
+        "status": {"phase": "Running"},
+    }
+    assert clean(pod) == {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": "web"},
+        "spec": {
+            "containers": [{"name": "app", "volumeMounts": [{"name": "data"}]}],
+            "volumes": [{"name": "data"}],
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "api_version, kind, plural",
+    [
+        ("v1", "Pod", "pods"),
+        ("v1", "Endpoints", "endpoints"),
+        ("networking.k8s.io/v1", "Ingress", "ingresses"),
+        ("networking.k8s.io/v1", "NetworkPolicy", "networkpolicies"),
+    ],
+)
+def test_resource_plural(api_version, kind, plural):
+    body = {"apiVersion": api_version, "kind": kind, "metadata": {"name": "x", "namespace": "ns"}}
+    assert Resource(body).plural == plural
+
+
+def test_resource_rejects_unknown_kind():
+    body = {"apiVersion": "v1", "kind": "Binding", "metadata": {"name": "x", "namespace": "ns"}}
+    with pytest.raises(ValueError, match="Unsupported resource v1 Binding"):
+        Resource(body)
+
+
+def test_read_namespace_only_includes_cluster_rbac_of_its_pods(memory_backend):
+    pods = [
+        web_pod(namespace).with_auth_cluster_rule(
+            api_groups=[""], resources=["nodes"], verbs=["get"]
+        )
+        for namespace in ("test", "test-env")
+    ]
+    with Session() as session:
+        session.load(*pods)
+        documents = read_namespace(CLIENTS.get_client(), "test")
+
+    assert [
+        doc["metadata"]["name"]
+        for doc in documents
+        if doc["kind"] in ("ClusterRole", "ClusterRoleBinding")
+    ] == ["test-web-cluster-role", "test-web-cluster-role-binding"]
+
+
+def test_snapshot_and_apply(memory_backend, tmp_path):
+    with Session() as session:
+        session.load(web_pod("snap"), ConfigMap("settings", "snap").with_data({"key": "value"}))
+        documents = session.snapshot()
+
+    assert [(doc["kind"], doc["metadata"]["name"]) for doc in documents] == [
+        ("Namespace", "snap"),
+        ("ServiceAccount", "web-account"),
+        ("ConfigMap", "settings"),
+        ("Role", "web-role"),
+        ("RoleBinding", "web-role-binding"),
+        ("Service", "http"),
+        ("Pod", "web"),
+    ]
+    assert all("status" not in doc and "uid" not in doc["metadata"] for doc in documents)
+    assert "clusterIP" not in documents[5]["spec"]
+    assert memory_backend.cluster.objects("namespaces") == []
+
+    write(documents, tmp_path / "snap.yaml")
+    resources = from_documents(load([tmp_path]))
+    assert [resource.kind for resource in resources] == [doc["kind"] for doc in documents[1:]]
+    with Session() as session:
+        session.apply(*resources)
+    assert resources[-1].manifest.status.phase == "Running"
+    assert resources[-1].depends_on(resources[0]) and not resources[0].depends_on(resources[-1])
+    assert memory_backend.cluster.get("configmaps", "snap", "settings")["data"] == {"key": "value"}
+    assert memory_backend.cluster.get("services", "snap", "http")["spec"]["clusterIP"]
+
+
+def test_apply_resources_of_the_same_name(memory_backend):
+    documents = [
+        {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": {"name": "redis", "namespace": "same-name"},
+            "spec": {"containers": [{"name": "redis", "image": "redis"}]},
+        },
+        {
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": {"name": "redis", "namespace": "same-name"},
+            "spec": {"ports": [{"port": 6379}], "selector": {"app": "redis"}},
+        },
+    ]
+    with Session() as session:
+        applied = session.apply(*from_documents(documents))
+    assert [resource.kind for resource in applied] == ["Pod", "Service"]
+    assert memory_backend.cluster.get("pods", "same-name", "redis")
+    assert memory_backend.cluster.get("services", "same-name", "redis")
+
+
+def test_cli_snapshot_and_apply(memory_backend, tmp_path, capsys):
+    with Session() as session:
+        session.load(web_pod("cli"))
+        main(["snapshot", "--namespace", "cli", "--output", str(tmp_path)])
+    assert "wrote 6 manifests of namespace cli" in capsys.readouterr().out
+
+    main(["apply", str(tmp_path / "cli.yaml")])
+    assert "applied 5 resources" in capsys.readouterr().out
+    assert memory_backend.cluster.get("pods", "cli", "web")["status"]["phase"] == "Running"
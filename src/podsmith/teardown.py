@@ -0,0 +1,99 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from .manifest import Manifest, deferred_namespaces
+
+
+@dataclass(frozen=True)
+class TeardownFailure:
+    what: str
+    error: BaseException
+
+    def __str__(self) -> str:
+        return f"{self.what}: {type(self.error).__name__}: {self.error}"
+
+
+class TeardownQueue:
+    """Tear down resources in a background thread, in the order submitted.
+
+    Namespaces created along the way are only deleted once the queue is drained, so that later
+    sessions may keep using a namespace while the resources of earlier sessions are being removed.
+    """
+
+    def __init__(self) -> None:
+        self.failures: list[TeardownFailure] = []
+        self._queue: queue.Queue[tuple[str, Callable[[], object]] | None] = queue.Queue()
+        self._namespaces: list[Manifest] = []
+        self._pending: Counter[tuple[str, str | None, str]] = Counter()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="podsmith-teardown", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, what: str, fn: Callable[[], object], resources: Iterable[Manifest] = ()
+    ) -> None:
+        """Queue `fn`, which is expected to `destroy` the given `resources`."""
+        with self._cond:
+            self._pending.update(map(self._key, resources))
+        self._queue.put((what, fn))
+
+    def destroy(self, resource: Manifest) -> None:
+        """Destroy `resource` recording, rather than raising, any error."""
+        try:
+            self._call(str(resource), resource.destroy)
+        finally:
+            with self._cond:
+                key = self._key(resource)
+                if self._pending[key] > 0:
+                    self._pending[key] -= 1
+                self._cond.notify_all()
+
+    def wait_for(self, resources: Iterable[Manifest], timeout: float | None = None) -> None:
+        """Wait for any queued teardown of resources with the same identity as `resources`."""
+        keys = set(map(self._key, resources))
+        with self._cond:
+            if not self._cond.wait_for(lambda: not any(self._pending[k] for k in keys), timeout):
+                raise TimeoutError(f"Still waiting for teardown of {', '.join(map(str, keys))}")
+
+    @staticmethod
+    def _key(resource: Manifest) -> tuple[str, str | None, str]:
+        return type(resource).__name__, resource.namespace, resource.name
+
+    def drain(self, timeout: float | None = None) -> list[TeardownFailure]:
+        """Wait for all queued teardown to complete, then delete the namespaces.
+
+        Returns all failures, including one for any work still pending after `timeout` seconds.
+        """
+        started = time.monotonic()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            pending = self._queue.qsize() + len(self._namespaces)
+            error = TimeoutError(
+                f"{pending} items still pending after {time.monotonic() - started:.1f}s"
+            )
+            self.failures.append(TeardownFailure("teardown queue", error))
+        return list(self.failures)
+
+    def _run(self) -> None:
+        deferred_namespaces.set(self._namespaces)
+        while (item := self._queue.get()) is not None:
+            self._call(*item)
+        while self._namespaces:
+            resource = self._namespaces.pop()
+            self._call(f"namespace {resource.namespace}", resource.destroy_namespace)
+
+    def _call(self, what: str, fn: Callable[[], object]) -> None:
+        try:
+            fn()
+        except Exception as e:
+            self.failures.append(TeardownFailure(what, e))
@@ -0,0 +1,301 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Write the spans of the test run to this file, in TRACE_FORMAT ("json" or "otlp").
+TRACE_FILE = os.getenv("PODSMITH_TRACE_FILE")
+TRACE_FORMAT = os.getenv("PODSMITH_TRACE_FORMAT", "json")
+# Record spans for the test run, see `Tracer`.
+TRACE_ENABLED = bool(TRACE_FILE) or os.getenv("PODSMITH_TRACE", "") not in ("", "0", "false")
+SpanHook = Callable[["Span"], None]
+# Distinguishes the traces of this run from those of other runs of the same tests.
+RUN_ID = f"{random.getrandbits(64):016x}"
+
+
+@dataclass(eq=False)
+class Span:
+    """A timed phase of a resource's lifecycle, such as creating it or waiting for it to be ready.
+
+    Times are in nanoseconds since the epoch. Spans without a resource are for work on behalf of
+    several resources, such as preloading their images.
+    """
+
+    name: str
+    kind: str | None = None
+    resource: str | None = None
+    test: str | None = None
+    start_ns: int = 0
+    end_ns: int = 0
+    parent: Span | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    span_id: str = field(default_factory=lambda: f"{random.getrandbits(64):016x}")
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    @property
+    def label(self) -> str:
+        return " ".join(filter(None, (self.kind, self.resource))) or self.name
+
+    @property
+    def is_root(self) -> bool:
+        """Whether this is the outermost span of its resource."""
+        return self.parent is None or self.parent.label != self.label
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects spans for the lifecycle phases of podsmith resources.
+
+    Spans are recorded when `recording` is set, and passed to each hook as they end. With neither,
+    tracing is a no-op. `test` is the test the spans are attributed to, as set by the pytest plugin.
+    """
+
+    def __init__(self, recording: bool = False) -> None:
+        self.recording = recording
+        self.test: str | None = None
+        self._lock = threading.Lock()
+        self._spans: list[Span] = []
+        self._hooks: list[SpanHook] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.recording or bool(self._hooks)
+
+    @property
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def add_hook(self, hook: SpanHook) -> None:
+        """Call `hook` with each span as it ends, e.g. to forward it to a tracing backend."""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: SpanHook) -> None:
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    @contextmanager
+    def span(self, name: str, resource: Any = None, **attributes) -> Iterator[Span | None]:
+        """Time the enclosed block as phase `name` of `resource`.
+
+        Spans started within the block, also on other threads given the context is carried over,
+        are nested under this one.
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = self._new_span(name, resource, current_span.get(), attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._end(span)
+
+    def record(
+        self,
+        name: str,
+        resource: Any,
+        start_ns: int,
+        end_ns: int,
+        parent: Span | None = None,
+        **attributes,
+    ) -> Span | None:
+        """Record a span timed elsewhere, e.g. by a watch on another thread."""
+        if not self.enabled:
+            return None
+        span = self._new_span(name, resource, parent, attributes)
+        span.start_ns = start_ns
+        span.end_ns = end_ns
+        self._end(span)
+        return span
+
+    def _new_span(self, name: str, resource: Any, parent: Span | None, attributes: dict) -> Span:
+        kind = resource_name = None
+        if isinstance(resource, str):
+            resource_name = resource
+        elif resource is not None:
+            kind = resource.kind
+            resource_name = (
+                f"{resource.namespace}/{resource.name}" if resource.namespace else resource.name
+            )
+        return Span(
+            name,
+            kind=kind,
+            resource=resource_name,
+            test=self.test,
+            start_ns=time.time_ns(),
+            parent=parent,
+            attributes=attributes,
+        )
+
+    def _end(self, span: Span) -> None:
+        with self._lock:
+            if self.recording:
+                self._spans.append(span)
+            hooks = list(self._hooks)
+        for hook in hooks:
+            hook(span)
+
+
+TRACER = Tracer(recording=TRACE_ENABLED)
+
+
+def to_json(spans: Iterable[Span]) -> list[dict]:
+    """Spans as plain dicts, with the parent by span id."""
+    return [
+        {
+            "name": span.name,
+            "kind": span.kind,
+            "resource": span.resource,
+            "test": span.test,
+            "span_id": span.span_id,
+            "parent_id": span.parent.span_id if span.parent is not None else None,
+            "start_ns": span.start_ns,
+            "end_ns": span.end_ns,
+            "duration": span.duration,
+            "attributes": span.attributes,
+            "error": span.error,
+        }
+        for span in spans
+    ]
+
+
+def to_otlp(spans: Iterable[Span], service_name: str = "podsmith") -> dict:
+    """Spans in the OpenTelemetry protocol JSON encoding, with one trace per test.
+
+    The result may be posted as is to an OTLP/HTTP collector's `/v1/traces` endpoint.
+    """
+    otlp_spans = []
+    for span in spans:
+        attributes = dict(span.attributes)
+        attributes.update(
+            {
+                "podsmith.kind": span.kind,
+                "podsmith.resource": span.resource,
+                "podsmith.test": span.test,
+            }
+        )
+        otlp_span = {
+            "traceId": hashlib.md5(f"{RUN_ID}/{span.test}".encode()).hexdigest(),
+            "spanId": span.span_id,
+            "name": " ".join(filter(None, (span.name, span.kind, span.resource))),
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in attributes.items()
+                if value is not None
+            ],
+            # STATUS_CODE_ERROR, or STATUS_CODE_UNSET.
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+        }
+        if span.parent is not None:
+            otlp_span["parentSpanId"] = span.parent.span_id
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]
+                },
+                "scopeSpans": [{"scope": {"name": "podsmith"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def export(spans: Iterable[Span], path: Path, format: str = "json") -> None:
+    """Write spans to `path`, as "json" (see `to_json`) or "otlp" (see `to_otlp`)."""
+    match format:
+        case "json":
+            data: Any = to_json(spans)
+        case "otlp":
+            data = to_otlp(spans)
+        case _:
+            raise ValueError(f"Unsupported trace format: {format!r}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2))
+
+
+def summary(spans: Iterable[Span], top: int = 10) -> list[str]:
+    """Report of the slowest tests, resources and phases, as lines of text.
+
+    Time spent on a test or resource is that of its outermost spans, so nested phases aren't
+    counted twice. Phases are totalled as is, so a phase includes any phases nested within it.
+    """
+    spans = list(spans)
+    tests: dict[str, float] = defaultdict(float)
+    resources: dict[str, float] = defaultdict(float)
+    phases: dict[str, list[float]] = defaultdict(list)
+    for span in spans:
+        if span.parent is None and span.test is not None:
+            tests[span.test] += span.duration
+        if span.resource is not None and span.is_root:
+            resources[span.label] += span.duration
+        phases[span.name].append(span.duration)
+
+    lines = []
+    if tests:
+        lines.append(f"slowest tests, by time in podsmith (top {top}):")
+        lines.extend(_top(tests, top))
+    if resources:
+        lines.append(f"slowest resources (top {top}):")
+        lines.extend(_top(resources, top))
+    if phases:
+        lines.append(f"slowest phases (top {top}):")
+        totals = {name: sum(durations) for name, durations in phases.items()}
+        for name, total in _sorted(totals, top):
+            durations = phases[name]
+            lines.append(f"  {total:8.2f}s  {name} (x{len(durations)}, max {max(durations):.2f}s)")
+    return lines
+
+
+def _top(totals: dict[str, float], top: int) -> list[str]:
+    return [f"  {total:8.2f}s  {label}" for label, total in _sorted(totals, top)]
+
+
+def _sorted(totals: dict[str, float], top: int) -> list[tuple[str, float]]:
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
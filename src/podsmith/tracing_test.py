@@ -0,0 +1,120 @@
+# Copyright (c) 2026 Andreas Stenius
+# This software is licensed under the MIT License.
+# See the LICENSE file for details.
+import json
+import time
+
+import pytest
+from kubernetes.client import V1ConfigMap
+
+from .manifest import ClusterManifest
+from .session import Session
+from .tracing import TRACER, Tracer, export, summary, to_json, to_otlp
+
+
+class TracedResource(ClusterManifest[V1ConfigMap]):
+    kind = "ConfigMap"
+
+    def _create(self):
+        time.sleep(0.05)
+        return self.manifest
+
+    def _delete(self):
+        pass
+
+    def _new_manifest(self):
+        return V1ConfigMap(metadata=self.metadata)
+
+    def _get_manifest(self):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def traced():
+    spans = []
+    TRACER.add_hook(spans.append)
+    yield spans
+    TRACER.remove_hook(spans.append)
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("create", "thing") as span:
+        assert span is None
+    assert tracer.record("Ready", "thing", 0, 1) is None
+    assert tracer.spans == []
+
+
+def test_spans_nest_and_record_errors():
+    tracer = Tracer(recording=True)
+    tracer.test = "test_it"
+    with pytest.raises(RuntimeError):
+        with tracer.span("provision", "pod") as outer:
+            with tracer.span("ready", "pod", condition="Ready") as inner:
+                raise RuntimeError("boom")
+    assert tracer.spans == [inner, outer]
+    assert inner.parent is outer and inner.attributes == {"condition": "Ready"}
+    assert inner.error == outer.error == "RuntimeError: boom"
+    assert outer.test == "test_it" and outer.start_ns <= inner.start_ns <= inner.end_ns
+    assert outer.is_root and not inner.is_root
+
+
+def test_manifest_spans_nest_across_session_threads(traced):
+    resources = [TracedResource(f"res-{n}") for n in range(2)]
+    with TRACER.span("setup") as setup:
+        with Session() as session:
+            session.load(*resources)
+
+    by_name = {}
+    for span in traced:
+        by_name.setdefault(span.name, []).append(span)
+    assert sorted(span.resource for span in by_name["create"]) == ["res-0", "res-1"]
+    assert all(span.parent is setup for span in by_name["create"])
+    assert all(span.parent.name == "create" for span in by_name["request"])
+    assert all(span.duration >= 0.05 for span in by_name["request"])
+    assert sorted(span.resource for span in by_name["delete"]) == ["res-0", "res-1"]
+
+
+def test_export_formats(tmp_path):
+    tracer = Tracer(recording=True)
+    tracer.test = "test_it"
+    with tracer.span("provision", "pod") as parent:
+        tracer.record("PodScheduled", "pod", 1, 2, parent, ready=True)
+
+    spans = to_json(tracer.spans)
+    assert [span["name"] for span in spans] == ["PodScheduled", "provision"]
+    assert spans[0]["parent_id"] == spans[1]["span_id"] and spans[1]["parent_id"] is None
+
+    otlp = to_otlp(tracer.spans)
+    otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp_spans[0]["parentSpanId"] == otlp_spans[1]["spanId"]
+    assert otlp_spans[0]["traceId"] == otlp_spans[1]["traceId"]
+    assert otlp_spans[0]["name"] == "PodScheduled pod"
+    assert {"key": "ready", "value": {"boolValue": True}} in otlp_spans[0]["attributes"]
+    assert otlp_spans[0]["startTimeUnixNano"] == "1"
+
+    export(tracer.spans, tmp_path / "trace.json", "otlp")
+    assert json.loads((tmp_path / "trace.json").read_text()) == otlp
+    with pytest.raises(ValueError):
+        export(tracer.spans, tmp_path / "trace.json", "xml")
+
+
+def test_summary_ranks_tests_resources_and_phases():
+    tracer = Tracer(recording=True)
+    for test, resource, seconds in (
+        ("test_a", "slow", 3),
+        ("test_a", "fast", 1),
+        ("test_b", "x", 2),
+    ):
+        tracer.test = test
+        parent = tracer.record("provision", resource, 0, seconds * 10**9)
+        tracer.record("ready", resource, 0, seconds * 10**9 // 2, parent)
+
+    lines = summary(tracer.spans, top=2)
+    tests = lines.index("slowest tests, by time in podsmith (top 2):")
+    assert [line.split()[-1] for line in lines[tests + 1 : tests + 3]] == ["test_a", "test_b"]
+    resources = lines.index("slowest resources (top 2):")
+    assert [line.split()[-1] for line in lines[resources + 1 : resources + 3]] == ["slow", "x"]
+    phases = lines.index("slowest phases (top 2):")
+    assert lines[phases + 1].split()[:2] == ["6.00s", "provision"]
+    assert lines[phases + 2].split()[:2] == ["3.00s", "ready"]